@@ -0,0 +1,57 @@
+#
+# Timing of create_submodel_kkt_block() in pao.pyomo.plugins.lcp,
+# comparing the 'expression' and 'sparse' builders.
+#
+# Usage:
+#
+#   python bench_lcp.py [n] [nnz_per_row] [builder ...]
+#
+# The default instance has a follower with 20000 variables and 10000
+# constraints.  Note that the 'expression' builder scans the constraint
+# duals for each follower variable, so it is very slow for this instance.
+#
+import sys
+import time
+import numpy as np
+import pyomo.environ as pe
+from pao.pyomo import SubModel
+from pao.pyomo.plugins.lcp import create_submodel_kkt_block
+from bench_resize import random_matrix
+
+
+def create(n, nnz_per_row, seed=0):
+    rng = np.random.default_rng(seed)
+    m = n//2
+    A = random_matrix(rng, m, n, m*nnz_per_row).tocsr()
+    A.sum_duplicates()
+    c = rng.random(n)
+
+    M = pe.ConcreteModel()
+    M.x = pe.Var(range(m), bounds=(0,1))
+    M.o = pe.Objective(expr=sum(M.x[i] for i in range(m)))
+    M.L = SubModel(fixed=[M.x])
+    M.L.y = pe.Var(range(n), within=pe.NonNegativeReals)
+    M.L.o = pe.Objective(expr=sum(c[j]*M.L.y[j] for j in range(n)), sense=pe.maximize)
+    def c_rule(L, i):
+        row = slice(A.indptr[i], A.indptr[i+1])
+        return sum(v*L.y[j] for j, v in zip(A.indices[row], A.data[row])) <= 1 + M.x[i]
+    M.L.c = pe.Constraint(range(m), rule=c_rule)
+    return M
+
+
+def main(n=20000, nnz_per_row=10, *builders):
+    if len(builders) == 0:
+        builders = ['expression', 'sparse']
+    M = create(n, nnz_per_row)
+    # The linear_mpec transformation treats the SubModel as a Block
+    M.reclassify_component_type(M.L, pe.Block)
+    fixed = list(M.x.values())
+    print("builder,n,nnz,seconds")
+    for builder in builders:
+        start = time.time()
+        create_submodel_kkt_block(M, M.L, False, fixed, builder)
+        print("%s,%d,%d,%f" % (builder, n, (n//2)*nnz_per_row, time.time()-start))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]], *sys.argv[3:])
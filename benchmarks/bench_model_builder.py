@@ -0,0 +1,61 @@
+#
+# Timing of the Pyomo model construction in pao.mpr.solvers.pyomo_util,
+# comparing the 'expression' and 'sparse' constraint builders.
+#
+# Usage:
+#
+#   python bench_model_builder.py [n] [nnz_per_row]
+#
+# The default instance has 10000 variables and 10000 constraints in
+# each level.
+#
+import sys
+import time
+import numpy as np
+import pyomo.environ as pe
+from pao.mpr import LinearMultilevelProblem
+from pao.mpr.solvers import pyomo_util
+from bench_resize import random_matrix
+
+
+def create(n, nnz_per_row, seed=0):
+    rng = np.random.default_rng(seed)
+    nnz = n*nnz_per_row
+
+    mpr = LinearMultilevelProblem()
+    U = mpr.add_upper(nxR=n)
+    L = U.add_lower(nxR=n)
+    for X in (U, L):
+        X.x.lower_bounds = np.zeros(n)
+        X.inequalities = True
+        X.b = np.ones(n)
+        X.A[U] = random_matrix(rng, n, n, nnz//2)
+        X.A[L] = random_matrix(rng, n, n, nnz//2)
+    return mpr
+
+
+def build(mpr, builder):
+    U = mpr.U
+    L = mpr.U.LL[0]
+    M = pe.ConcreteModel()
+    M.U = pe.Block()
+    M.L = pe.Block()
+    pyomo_util.add_variables(M.U, U)
+    pyomo_util.add_variables(M.L, L)
+    pyomo_util.add_linear_constraints(M.U, U.A, U, L, U.b, U.inequalities, builder)
+    pyomo_util.add_linear_constraints(M.L, L.A, U, L, L.b, L.inequalities, builder)
+    return M
+
+
+def main(n=10000, nnz_per_row=10):
+    mpr = create(n, nnz_per_row)
+    print("builder,n,nnz,seconds")
+    for builder in ['expression', 'sparse']:
+        start = time.time()
+        build(mpr, builder)
+        nnz = sum(X.A[Y].nnz for X in mpr.levels() for Y in mpr.levels())
+        print("%s,%d,%d,%f" % (builder, n, nnz, time.time()-start))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
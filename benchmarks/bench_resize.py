@@ -0,0 +1,53 @@
+#
+# Timing of LinearLevelRepn.resize() as a function of the number of
+# nonzeros in the constraint matrices that reference the level.
+#
+# Usage:
+#
+#   python bench_resize.py [max_nnz]
+#
+import sys
+import time
+import numpy as np
+import scipy.sparse
+from pao.mpr import LinearMultilevelProblem
+
+
+def random_matrix(rng, nrows, ncols, nnz):
+    rows = rng.integers(0, nrows, size=nnz)
+    cols = rng.integers(0, ncols, size=nnz)
+    return scipy.sparse.csr_matrix((rng.random(nnz), (rows, cols)), shape=(nrows, ncols))
+
+
+def create(ncols, nnz, seed=0):
+    rng = np.random.default_rng(seed)
+    nrows = max(1, ncols//2)
+
+    mpr = LinearMultilevelProblem()
+    U = mpr.add_upper(nxR=ncols)
+    L = U.add_lower(nxR=ncols//2, nxZ=ncols//4, nxB=ncols//4)
+    for X in (U, L):
+        X.b = np.ones(nrows)
+        X.c[U] = rng.random(len(U.x))
+        X.c[L] = rng.random(len(L.x))
+        X.A[U] = random_matrix(rng, nrows, len(U.x), nnz)
+        X.A[L] = random_matrix(rng, nrows, len(L.x), nnz)
+    return mpr
+
+
+def main(max_nnz=10**6):
+    print("ncols,nnz,seconds")
+    nnz = 1000
+    while nnz <= max_nnz:
+        ncols = max(10, nnz//10)
+        mpr = create(ncols, nnz)
+        L = mpr.U.LL[0]
+        actual = sum(X.A[L].nnz for X in mpr.levels())
+        start = time.time()
+        L.resize(nxR=L.x.nxR+10, nxZ=L.x.nxZ, nxB=L.x.nxB)
+        print("%d,%d,%f" % (ncols, actual, time.time()-start))
+        nnz *= 10
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10**6)
@@ -0,0 +1,184 @@
+#
+# Benchmark suite for PAO.
+#
+# This times the conversion of Pyomo models, the linearization of
+# bilinear terms, the conversion to standard form, the construction of
+# the KKT reformulation and (optionally) the solver on
+#
+#   (a) the examples in pao.pyomo.examples and pao.mpr.examples, and
+#   (b) random instances created by the generators in generators.py,
+#       with 10^2 to max_nnz nonzeros.
+#
+# Usage:
+#
+#   python bench_suite.py [--max-nnz N] [--repeat N] [--solve] [--mip-solver NAME] [--time-limit SECONDS] [--output FILE]
+#
+# The timing data is printed in CSV format.  If --output is specified,
+# then the timing data and the PAO version are also written to a JSON file.
+#
+# When the instances are solved, the status of each solve is recorded
+# with the termination condition.  If --time-limit is specified, then
+# the MIP solver stops after that many seconds, and a solve that stops
+# at the time limit has the status maxTimeLimit.
+#
+import sys
+import time
+import json
+import argparse
+import platform
+import datetime
+import pyomo.opt
+import pyomo.environ as pe
+
+import pao
+import pao.mpr
+import pao.pyomo
+from pao.mpr.convert_repn import convert_to_standard_form
+from pao.mpr.solvers.reg import create_model_replacing_LL_with_kkt
+from pao.pyomo.convert import convert_pyomo2MultilevelProblem
+from generators import generators
+
+
+def nnz(mpr):
+    ans = sum(X.A[Y].nnz for X in mpr.levels() for Y in mpr.levels() if X.A[Y] is not None)
+    if type(mpr) is pao.mpr.QuadraticMultilevelProblem:
+        ans += sum(X.Q[i,j].data.nnz for X in mpr.levels() for i,j in X.Q)
+    return ans
+
+
+# The name of the time limit option for each MIP solver.  The appsi
+# solvers also need this option, because their legacy solve() interface
+# resets config.time_limit.
+time_limit_options = {'appsi_highs':'time_limit', 'cbc':'sec', 'cplex':'timelimit', 'glpk':'tmlim', 'gurobi':'TimeLimit'}
+
+
+def create_mip_solver(args):
+    opt = pe.SolverFactory(args.mip_solver)
+    if args.time_limit is not None:
+        opt.options[time_limit_options[args.mip_solver]] = args.time_limit
+    return opt
+
+
+def is_linear_bilevel(mpr):
+    # The KKT reformulation requires a bilevel problem with continuous
+    # lower-level variables
+    for L in mpr.U.LL:
+        if len(L.LL) > 0 or L.x.nxZ > 0 or L.x.nxB > 0:
+            return False
+    return True
+
+
+class Timer(object):
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.records = []
+
+    def measure(self, fn):
+        seconds = []
+        for i in range(self.repeat):
+            start = time.perf_counter()
+            ans = fn()
+            seconds.append(time.perf_counter()-start)
+        return ans, min(seconds)
+
+    def __call__(self, benchmark, instance, size, phase, fn):
+        ans, seconds = self.measure(fn)
+        self.add(benchmark, instance, size, phase, seconds)
+        return ans
+
+    def add(self, benchmark, instance, size, phase, seconds, status=''):
+        self.records.append(dict(benchmark=benchmark, instance=instance, nnz=size, phase=phase, seconds=seconds, status=status))
+        print("%s,%s,%d,%s,%f,%s" % (benchmark, instance, size, phase, seconds, status))
+        sys.stdout.flush()
+
+
+def run_mpr(timer, benchmark, instance, mpr, args):
+    size = nnz(mpr)
+    if type(mpr) is pao.mpr.QuadraticMultilevelProblem:
+        mpr, _ = timer(benchmark, instance, size, 'linearize_bilinear_terms', lambda: pao.mpr.linearize_bilinear_terms(mpr, 1e6))
+    if not is_linear_bilevel(mpr):
+        return
+    repn, _ = timer(benchmark, instance, size, 'convert_to_standard_form', lambda: convert_to_standard_form(mpr, inequalities=False))
+    for builder in ['expression', 'sparse']:
+        timer(benchmark, instance, size, 'create_model.'+builder, lambda: create_model_replacing_LL_with_kkt(repn, builder))
+    if args.solve:
+        opt = pao.Solver('pao.mpr.FA', mip_solver=create_mip_solver(args))
+        start = time.perf_counter()
+        try:
+            results = opt.solve(mpr)
+        except Exception:
+            #
+            # The solution cannot be loaded if the MIP solver stopped
+            # at the time limit without a feasible solution
+            #
+            seconds = time.perf_counter()-start
+            if args.time_limit is not None and seconds >= args.time_limit:
+                status = 'maxTimeLimit'
+            else:
+                status = 'error'
+            timer.add(benchmark, instance, size, 'solve', seconds, status)
+            return
+        timer.add(benchmark, instance, size, 'solve', time.perf_counter()-start, results.solver.termination_condition.name)
+        for phase, seconds in results.timing.items():
+            timer.add(benchmark, instance, size, 'solve.'+phase, seconds)
+
+
+def run_examples(timer, args):
+    for name in sorted(pao.pyomo.examples.__dict__):
+        module = getattr(pao.pyomo.examples, name)
+        if not hasattr(module, 'create') or not hasattr(module, '__file__'):
+            continue
+        M = module.create()
+        (mpr, _), seconds = timer.measure(lambda: convert_pyomo2MultilevelProblem(M, inequalities=True))
+        timer.add('pyomo_examples', name, nnz(mpr), 'convert_pyomo', seconds)
+        run_mpr(timer, 'pyomo_examples', name, mpr, args)
+    for name in sorted(pao.mpr.examples.__dict__):
+        module = getattr(pao.mpr.examples, name)
+        if not hasattr(module, 'create') or not hasattr(module, '__file__'):
+            continue
+        run_mpr(timer, 'mpr_examples', name, module.create(), args)
+
+
+def run_generators(timer, args):
+    for name, generator in sorted(generators.items()):
+        size = 100
+        while size <= args.max_nnz:
+            mpr = generator(size, seed=args.seed)
+            run_mpr(timer, 'generators', name, mpr, args)
+            size *= 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for PAO")
+    parser.add_argument('--max-nnz', type=int, default=10**4, help="The maximum number of nonzeros in the generated instances (default is 10000)")
+    parser.add_argument('--repeat', type=int, default=1, help="The number of times each phase is repeated.  The minimum time is reported.  (default is 1)")
+    parser.add_argument('--seed', type=int, default=0, help="The random seed for the generated instances (default is 0)")
+    parser.add_argument('--solve', action='store_true', default=False, help="If specified, then the instances are solved with pao.mpr.FA")
+    parser.add_argument('--mip-solver', default='glpk', help="The MIP solver used by pao.mpr.FA (default is glpk)")
+    parser.add_argument('--time-limit', type=int, default=None, help="The time limit in seconds for each solve with the MIP solver (default is None)")
+    parser.add_argument('--output', default=None, help="A JSON file where the timing data is written")
+    args = parser.parse_args()
+
+    if args.solve and not pyomo.opt.check_available_solvers(args.mip_solver):
+        parser.error("The MIP solver '%s' is not available" % args.mip_solver)
+    if args.time_limit is not None and args.mip_solver not in time_limit_options:
+        parser.error("The --time-limit option is not supported for the MIP solver '%s'" % args.mip_solver)
+
+    timer = Timer(args.repeat)
+    print("benchmark,instance,nnz,phase,seconds,status")
+    run_examples(timer, args)
+    run_generators(timer, args)
+
+    if args.output is not None:
+        with open(args.output, 'w') as OUTPUT:
+            json.dump(dict(pao_version=pao.__version__,
+                           python_version=platform.python_version(),
+                           platform=platform.platform(),
+                           date=datetime.datetime.now().isoformat(),
+                           options=vars(args),
+                           results=timer.records), OUTPUT, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#
+# Random instance generators for the PAO benchmarks.
+#
+# Each generator creates a multilevel problem representation whose
+# constraint matrices have approximately nnz nonzeros.  The instances
+# are feasible (x=0 satisfies the constraints) and bounded.
+#
+import numpy as np
+import scipy.sparse
+from pao.mpr import LinearMultilevelProblem, QuadraticMultilevelProblem
+
+
+def random_matrix(rng, nrows, ncols, nnz):
+    rows = rng.integers(0, nrows, size=nnz)
+    cols = rng.integers(0, ncols, size=nnz)
+    return scipy.sparse.csr_matrix((rng.random(nnz), (rows, cols)), shape=(nrows, ncols))
+
+
+def linear_bilevel(nnz, seed=0, nnz_per_row=10):
+    """
+    A linear bilevel problem with continuous variables in both levels.
+    """
+    rng = np.random.default_rng(seed)
+    n = max(2, nnz//(2*nnz_per_row))
+
+    mpr = LinearMultilevelProblem(name='linear_bilevel')
+    U = mpr.add_upper(nxR=n)
+    L = U.add_lower(nxR=n)
+    for X in (U, L):
+        X.x.lower_bounds = np.zeros(n)
+        X.x.upper_bounds = np.full(n, 10.0)
+        X.inequalities = True
+        X.b = np.ones(n//2)
+        X.A[U] = random_matrix(rng, n//2, n, nnz//4)
+        X.A[L] = random_matrix(rng, n//2, n, nnz//4)
+    U.c[U] = -rng.random(n)
+    U.c[L] = -rng.random(n)
+    L.c[L] = -rng.random(n)
+    return mpr
+
+
+def interdiction(nnz, seed=0, nnz_per_row=10, budget=0.1):
+    """
+    An interdiction problem.  The upper level selects binary variables x
+    to interdict items, and the lower level selects a maximum-value
+    packing of the items that are not interdicted:
+
+        min_x  max_y  d'y
+        s.t.   sum(x) <= budget*n
+                      A y <= 1
+                      y + x <= 1
+                      0 <= y
+    """
+    rng = np.random.default_rng(seed)
+    m = max(1, nnz//(2*nnz_per_row))
+    n = max(2, nnz//nnz_per_row)
+    d = rng.random(n)
+
+    mpr = LinearMultilevelProblem(name='interdiction')
+    U = mpr.add_upper(nxB=n)
+    L = U.add_lower(nxR=n)
+    L.maximize = True
+    L.x.lower_bounds = np.zeros(n)
+
+    U.inequalities = True
+    U.c[L] = d
+    U.A[U] = scipy.sparse.csr_matrix(np.ones((1,n)))
+    U.b = [max(1.0, np.floor(budget*n))]
+
+    L.inequalities = True
+    L.c[L] = d
+    L.A[U] = scipy.sparse.vstack([scipy.sparse.csr_matrix((m,n)), scipy.sparse.identity(n)]).tocsr()
+    L.A[L] = scipy.sparse.vstack([random_matrix(rng, m, n, nnz//2), scipy.sparse.identity(n)]).tocsr()
+    L.b = np.ones(m+n)
+    return mpr
+
+
+def bilinear(nnz, seed=0, nnz_per_row=10):
+    """
+    A quadratic bilevel problem with bilinear terms between binary
+    upper-level variables and continuous lower-level variables in the
+    lower-level constraints.
+    """
+    rng = np.random.default_rng(seed)
+    n = max(2, nnz//(2*nnz_per_row))
+    m = max(1, n//2)
+
+    qmp = QuadraticMultilevelProblem(name='bilinear', bilinear=True)
+    U = qmp.add_upper(nxB=n)
+    L = U.add_lower(nxR=n)
+    L.maximize = True
+    L.x.lower_bounds = np.zeros(n)
+    L.x.upper_bounds = np.ones(n)
+
+    U.c[U] = rng.random(n)
+    U.c[L] = rng.random(n)
+    L.c[L] = rng.random(n)
+
+    L.inequalities = True
+    L.A[L] = random_matrix(rng, m, n, nnz//2)
+    k = rng.integers(0, m, size=nnz//2)
+    i = rng.integers(0, n, size=nnz//2)
+    j = rng.integers(0, n, size=nnz//2)
+    L.Q[U,L] = (m,n,n), (k, i, j, rng.random(nnz//2))
+    L.b = np.ones(m)
+    return qmp
+
+
+generators = {
+    'linear_bilevel': linear_bilevel,
+    'interdiction': interdiction,
+    'bilinear': bilinear,
+    }
@@ -1,2 +1,3 @@
-from .solver import TerminationCondition, SolverAPI, Results, Solver
+from .solver import TerminationCondition, SolverAPI, Results, Solver, PhaseTimer
 from .shellcmd import run_shellcmd
+from .batch import solve_many
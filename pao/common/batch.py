@@ -0,0 +1,84 @@
+#
+# Solving many multilevel problems in parallel
+#
+import concurrent.futures
+
+from .solver import Solver
+
+__all__ = ['solve_many']
+
+
+def _solve_arrays(index, arrays, name, options):
+    """
+    Solve a multilevel problem that is stored in a dictionary of arrays.
+
+    This function is executed in a worker process.
+    """
+    from pao.mpr.storage import _problem_from_arrays
+    from pao.mpr.cache import _results_to_data
+
+    model = _problem_from_arrays(arrays)
+    opt = Solver(name, **options)
+    results = opt.solve(model)
+    return index, _results_to_data(model, results)
+
+
+def solve_many(models, solver, workers=None, **options):
+    """
+    Solve many multilevel problems with a pool of worker processes.
+
+    Each problem is sent to a worker process as a dictionary of numpy
+    arrays, and it is optimized with a new instance of the specified
+    solver.  The results are yielded as the solves complete, so the order
+    of the results may differ from the order of the problems.  If the
+    solver is configured to load solutions, then the solution computed
+    by the worker is loaded into the corresponding problem.
+
+    Args
+    ----
+    models : list
+        A list of LinearMultilevelProblem or QuadraticMultilevelProblem objects.
+    solver : str
+        The name of a solver registered with :class:`.Solver`.
+    workers : int
+        The number of worker processes.  If this is None, then the
+        number of processors on the machine is used.  If this is 1,
+        then the problems are solved in the current process.
+    options
+        Keyword options that are used to create the solver.
+
+    Yields
+    ------
+    tuple
+        A tuple (i, results), where i is the index of a problem in
+        **models** and results is the :class:`Results` object for that
+        problem.
+    """
+    from pao.mpr.repn import LinearMultilevelProblem, QuadraticMultilevelProblem
+    from pao.mpr.storage import _problem_to_arrays
+    from pao.mpr.cache import _results_from_data
+
+    models = list(models)
+    for M in models:
+        assert (type(M) in [LinearMultilevelProblem, QuadraticMultilevelProblem]), "solve_many() cannot solve a model of type %s" % str(type(M))
+    #
+    # Create the solver here to validate the solver name and options
+    #
+    opt = Solver(solver, **options)
+    if workers == 1:
+        for i,M in enumerate(models):
+            yield i, opt.solve(M)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_solve_arrays, i, _problem_to_arrays(M), solver, options) for i,M in enumerate(models)]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                i, data = future.result()
+                results = _results_from_data(data)
+                if opt.config.load_solutions:
+                    results.copy_solution(From=None, To=models[i])
+                yield i, results
+        finally:
+            for future in futures:
+                future.cancel()
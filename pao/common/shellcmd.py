@@ -1,18 +1,40 @@
-
 import sys
 import subprocess
+import threading
 import io
 
 from pyutilib.misc import Bunch
-from pyutilib.subprocess import run_command
 
 
 
 def run_shellcmd(cmd, *, env=None, tee=False, time_limit=None):
+    #
+    # This uses subprocess directly (rather than pyutilib's run_command),
+    # which does not install signal handlers and can be called from
+    # worker threads.
+    #
+    # The output is read in a separate thread, so the process can be
+    # killed when the time limit expires even if it is still writing
+    # output.
+    #
     ostr = io.StringIO()
-    rc, log = run_command(cmd, tee=tee, env=env, timelimit=time_limit,
-            stdout=ostr,
-            stderr=ostr)
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
 
-    return Bunch(rc=rc, log=ostr.getvalue())
+    def read_output():
+        for line in proc.stdout:
+            if tee:
+                sys.stdout.write(line)
+            ostr.write(line)
 
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    try:
+        proc.wait(timeout=time_limit)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    reader.join()
+    proc.stdout.close()
+    rc = proc.returncode
+
+    return Bunch(rc=rc, log=ostr.getvalue())
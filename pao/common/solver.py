@@ -6,6 +6,8 @@ import copy
 import six
 import abc
 import enum
+import time
+import contextlib
 import textwrap
 import logging
 
@@ -22,7 +24,7 @@ except:
 from pyomo.common.config import ConfigValue, ConfigBlock, add_docstring_list
 from pyomo.neos.kestrel import kestrelAMPL
 
-__all__ = ['TerminationCondition', 'SolverAPI', 'Results', 'Solver']
+__all__ = ['TerminationCondition', 'SolverAPI', 'Results', 'Solver', 'PhaseTimer']
 
 
 _logger = logging.getLogger('pyomo')
@@ -104,6 +106,10 @@ class SolverAPI(abc.ABC):
         domain=bool,
         description="If True, then the finale solution is loaded into the model. (default is True)",
         ))
+    config.declare('timing_callback', ConfigValue(
+        default=None,
+        description="A function that is called with the name of a solver phase and the time spent in that phase (in seconds) when the phase completes.  (default is None)",
+        ))
 
     def __init__(self):
         # Create a per-instance copy of the configuration data
@@ -366,6 +372,9 @@ class ResultsBase(abc.ABC):
     ----------
     solution_manager
         An object that manages storing and loading data to and from models.
+    timing
+        The time spent in the phases of the solver (in seconds), indexed
+        by phase name.
     """
 
     def __init__(self):
@@ -375,6 +384,7 @@ class ResultsBase(abc.ABC):
                 best_feasible_objective=None,
                 )
         self.problem = Options()
+        self.timing = Options()
 
     @abc.abstractmethod
     def found_feasible_solution(self):
@@ -426,6 +436,61 @@ class ResultsBase(abc.ABC):
         pass
 
 
+class PhaseTimer(object):
+    """
+    Records the time spent in the phases of a solver.
+
+    The time spent in each phase is accumulated in the **timing**
+    attribute, which is stored in the results object returned by a solver::
+
+        timer = PhaseTimer()
+        with timer('solve'):
+            ...
+        results.timing = timer.timing
+
+    Parameters
+    ----------
+    callback
+        A function that is called with the phase name and the time spent
+        in the phase (in seconds) when each phase completes.
+    """
+
+    def __init__(self, callback=None):
+        self.timing = Options()
+        self.callback = callback
+
+    def add(self, phase, seconds):
+        """
+        Add the time spent in a phase.
+
+        Parameters
+        ----------
+        phase: str
+            The name of the phase.
+        seconds: float
+            The time spent in the phase.
+        """
+        self.timing[phase] = self.timing.get(phase, 0) + seconds
+        if self.callback is not None:
+            self.callback(phase, seconds)
+
+    @contextlib.contextmanager
+    def __call__(self, phase):
+        """
+        A context manager that records the time spent in a phase.
+
+        Parameters
+        ----------
+        phase: str
+            The name of the phase.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start_time)
+
+
 class Results(ResultsBase):
     """
     The results object.
@@ -0,0 +1,74 @@
+import pyutilib.th as unittest
+import pyomo.environ as pe
+
+import pao.common
+from pao.common import Solver, solve_many
+from pao.mpr import examples
+from pao.mpr.solver import LinearMultilevelSolverBase, LinearMultilevelResults
+
+
+@Solver.register(name='test.batch', doc='A solver used to test solve_many()')
+class BatchTestSolver(LinearMultilevelSolverBase):
+
+    config = LinearMultilevelSolverBase.config()
+    config.declare('x_value', pao.common.solver.ConfigValue(default=1.0))
+
+    def __init__(self):
+        super().__init__(name='test.batch')
+
+    def solve(self, model, **options):
+        self._update_config(options)
+        # The solution depends on the problem data, so the workers must
+        # receive the problems
+        for L in model.levels():
+            L.x.values = [self.config.x_value + len(L.b)]*len(L.x)
+        results = LinearMultilevelResults()
+        results.solver.termination_condition = pao.common.TerminationCondition.optimal
+        results.solver.best_feasible_objective = float(len(model.U.b))
+        return results
+
+
+class Test_solve_many(unittest.TestCase):
+
+    def _models(self):
+        return [examples.bard511.create(), examples.besancon27.create(), examples.anadalingam.create()]
+
+    def _check(self, models, results):
+        self.assertEqual(sorted(i for i,_ in results), list(range(len(models))))
+        for i,r in results:
+            self.assertEqual(r.solver.termination_condition, pao.common.TerminationCondition.optimal)
+            self.assertEqual(r.solver.best_feasible_objective, float(len(models[i].U.b)))
+
+    def test_serial(self):
+        models = self._models()
+        results = list(solve_many(models, 'test.batch', workers=1, x_value=2.0))
+        self._check(models, results)
+        for M in models:
+            for L in M.levels():
+                self.assertEqual(L.x.values, [2.0 + len(L.b)]*len(L.x))
+
+    def test_parallel(self):
+        models = self._models()
+        results = list(solve_many(models, 'test.batch', workers=2, x_value=2.0))
+        self._check(models, results)
+        for M in models:
+            for L in M.levels():
+                self.assertEqual(L.x.values, [2.0 + len(L.b)]*len(L.x))
+
+    def test_no_load(self):
+        models = self._models()
+        results = list(solve_many(models, 'test.batch', workers=2, load_solutions=False))
+        self._check(models, results)
+        for M in models:
+            for L in M.levels():
+                self.assertEqual(L.x.values, [None]*len(L.x))
+
+    def test_errors(self):
+        with self.assertRaises(AssertionError):
+            list(solve_many([pe.ConcreteModel()], 'test.batch'))
+        with self.assertRaises(AssertionError):
+            list(solve_many(self._models(), 'test.batch', bad_option=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
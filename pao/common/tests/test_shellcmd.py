@@ -0,0 +1,28 @@
+import sys
+import time
+import pyutilib.th as unittest
+
+from pao.common import run_shellcmd
+
+
+class Test_run_shellcmd(unittest.TestCase):
+
+    def test_output(self):
+        for tee in [False, True]:
+            ans = run_shellcmd([sys.executable, '-c', 'print("a"); print("b")'], tee=tee)
+            self.assertEqual(ans.rc, 0)
+            self.assertEqual(ans.log.splitlines(), ['a', 'b'])
+
+    def test_time_limit(self):
+        # The process is killed while it is still writing output
+        script = 'import time\nprint("start", flush=True)\nwhile True:\n    time.sleep(0.1)'
+        for tee in [False, True]:
+            start = time.time()
+            ans = run_shellcmd([sys.executable, '-c', script], tee=tee, time_limit=1)
+            self.assertLess(time.time()-start, 10)
+            self.assertNotEqual(ans.rc, 0)
+            self.assertEqual(ans.log.splitlines(), ['start'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import pyutilib.th as unittest
 import pyomo.environ as pe
 
 from pao import Solver
+from pao.common import PhaseTimer
 import pyomo.opt
 from pyomo.neos.kestrel import kestrelAMPL
 
@@ -153,5 +154,30 @@ class Test_neos(unittest.TestCase):
             pass
 
 
+class Test_PhaseTimer(unittest.TestCase):
+
+    def test_timing(self):
+        calls = []
+        timer = PhaseTimer(lambda phase, seconds: calls.append((phase, seconds)))
+        with timer('a'):
+            pass
+        with timer('b'):
+            pass
+        timer.add('a', 1.0)
+        self.assertEqual(sorted(timer.timing.keys()), ['a', 'b'])
+        self.assertEqual([phase for phase,_ in calls], ['a', 'b', 'a'])
+        self.assertTrue(timer.timing.a >= 1.0)
+        self.assertTrue(timer.timing.b >= 0.0)
+
+    def test_exception(self):
+        timer = PhaseTimer()
+        try:
+            with timer('a'):
+                raise RuntimeError("error")
+        except RuntimeError:
+            pass
+        self.assertTrue('a' in timer.timing)
+
+
 if __name__ == "__main__":
     unittest.main()
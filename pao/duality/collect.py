@@ -23,8 +23,13 @@ __all__ = ("create_linear_dual_from",)
 #pylint: disable-msg=too-many-branches
 #pylint: disable-msg=too-many-statements
 
+import numpy as np
+from scipy.sparse import csc_matrix
 from pyutilib.misc import Bunch
 from pyomo.repn import generate_standard_repn
+from pyomo.common.collections import ComponentMap
+from pyomo.core.expr.numvalue import native_numeric_types
+from pyomo.core.expr.numeric_expr import LinearExpression
 from pyomo.core import (Var,
                         Constraint,
                         Objective,
@@ -39,6 +44,126 @@ from pyomo.core import (Var,
 from pyomo.core.expr.visitor import identify_variables
 
 
+def _indexed_name(name, ndx):
+    """
+    Return the name of a component with the given index.
+    """
+    if ndx is None:
+        return name
+    elif isinstance(ndx, tuple):
+        return "%s[%s]" % (name, ','.join(map(str, ndx)))
+    return "%s[%s]" % (name, str(ndx))
+
+
+def _variable_name(var, block):
+    """
+    Return the name of the component that contains a variable.
+    """
+    try:
+        # The variable is in the subproblem
+        return var.parent_component().getname(fully_qualified=True, relative_to=block)
+    except RuntimeError:
+        # The variable is somewhere else in the model
+        return var.parent_component().getname(fully_qualified=True, relative_to=block.model())
+
+
+def _product(coef, var):
+    if type(coef) in native_numeric_types and coef == 1:
+        return var
+    return coef*var
+
+
+class _RepnCache(object):
+    """
+    A cache of the standard repns of the objectives and constraints
+    in a block.
+
+    The repns are generated with all variables unfixed, so the cache
+    can be reused when different variables are fixed.  The cached repn
+    of a component is regenerated if its expression has changed.  A
+    repn is generated by temporarily unfixing the fixed variables in the
+    expression, so the cache must not be used while the model is read
+    by other threads.
+    """
+
+    def __init__(self):
+        self.data = ComponentMap()
+
+    def get(self, component, expr):
+        """
+        Return a Bunch with the expression, the variables in the expression
+        and the standard repn of the expression.
+        """
+        entry = self.data.get(component, None)
+        if entry is None or entry.expr is not expr:
+            entry = Bunch(expr=expr, vars=list(identify_variables(expr, include_fixed=True)))
+            fixed = [vdata for vdata in entry.vars if vdata.fixed]
+            for vdata in fixed:
+                vdata.fixed = False
+            try:
+                entry.repn = generate_standard_repn(expr, compute_values=False, quadratic=True)
+            finally:
+                for vdata in fixed:
+                    vdata.fixed = True
+            self.data[component] = entry
+        return entry
+
+    def linear_repn(self, component, expr):
+        """
+        Return the linear repn of an expression, where the variables that
+        are currently fixed are treated as constants.
+        """
+        repn = self.get(component, expr).repn
+        if repn.nonlinear_expr is None:
+            constant = repn.constant
+            index = {}
+            linear_vars = []
+            linear_coefs = []
+
+            def add(var, coef):
+                i = index.get(id(var), None)
+                if i is None:
+                    index[id(var)] = len(linear_vars)
+                    linear_vars.append(var)
+                    linear_coefs.append(coef)
+                else:
+                    linear_coefs[i] = linear_coefs[i] + coef
+
+            for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+                if var.fixed:
+                    constant = constant + _product(coef, var)
+                else:
+                    add(var, coef)
+            for (var1, var2), coef in zip(repn.quadratic_vars, repn.quadratic_coefs):
+                if var1.fixed and var2.fixed:
+                    constant = constant + _product(coef, var1)*var2
+                elif var1.fixed:
+                    add(var2, _product(coef, var1))
+                elif var2.fixed:
+                    add(var1, _product(coef, var2))
+                else:
+                    break
+            else:
+                return Bunch(constant=constant, linear_vars=linear_vars, linear_coefs=linear_coefs)
+        #
+        # The expression is nonlinear after fixing variables, so the linear
+        # terms are collected in the standard repn
+        #
+        repn = generate_standard_repn(expr, compute_values=False)
+        return Bunch(constant=repn.constant, linear_vars=repn.linear_vars, linear_coefs=repn.linear_coefs)
+
+
+def _repn_cache(block):
+    """
+    Return the repn cache for a block, which is stored on the block.
+    """
+    cache = getattr(block, '_pao_repn_cache', None)
+    if cache is None:
+        cache = _RepnCache()
+        block._pao_repn_cache = cache
+    return cache
+
+
 def collect_dual_representation(block, fixed_modelvars):
     """
     Process linear terms from a block and return information that is
@@ -72,6 +197,7 @@ def collect_dual_representation(block, fixed_modelvars):
     for vdata in fixed_modelvars.values():
         vdata.fixed = True
 
+    cache = _repn_cache(block)
     all_vars = {}
 
     A = {}
@@ -87,7 +213,7 @@ def collect_dual_representation(block, fixed_modelvars):
     nobj = 0
     for odata in block.component_objects(Objective, active=True):
         for ndx in odata:
-            o_terms = generate_standard_repn(odata[ndx].expr, compute_values=False)
+            o_terms = cache.linear_repn(odata[ndx], odata[ndx].expr)
             obj_offset = o_terms.constant
             if odata[ndx].sense == maximize:
                 d_sense = minimize
@@ -132,10 +258,10 @@ def collect_dual_representation(block, fixed_modelvars):
                 dualvars = [name+"_lb_", name+"_ub_"]
             else:
                 dualvars = [name]
-            body_terms = generate_standard_repn(con.body, compute_values=False)
+            body_terms = cache.linear_repn(con, con.body)
             #print("HERE")
             #print(body_terms)
-            if body_terms.is_fixed():
+            if len(body_terms.linear_vars) == 0:
                 #
                 # If a constraint has a fixed body, then don't collect it.
                 #
@@ -305,16 +431,198 @@ def collect_dual_representation(block, fixed_modelvars):
     return (A, b_coef, obj_offset, c_rhs, c_sense, d_sense, v_domain)
 
 
+def collect_dual_matrices(block, fixed_modelvars):
+    """
+    Process linear terms from a block and return sparse arrays that are
+    used to define the dual.  This function does not change the block.
 
+    This collects the same data as collect_dual_representation(), but
+    primal variables and dual variables are identified by integer ids
+    instead of by their names.  The primal variables are numbered in the
+    order they are encountered, and the dual variables are numbered in
+    the order the constraints and variable bounds are processed.
 
-def create_linear_dual_from(block, fixed=None, unfixed=None):
+    Arguments:
+        block: The SubModel object that is dualized
+        fixed_modelvars: A map from variable ids to VarData objects, which will be
+                fixed before dualization
+
+    Returns: A Bunch with the following values:
+        vars:     The list of primal variables
+        A:        A sparse matrix with the numeric coefficients of the primal
+                      constraints, with a column for each primal variable and
+                      a row for each dual variable
+        A_terms:  A list of (row, column, coef) tuples for coefficients that
+                      are not numeric (e.g. expressions with fixed variables)
+        b_coef:   The coefficients of the dual objective
+        obj_offset: The offset for the dual objective
+        c_rhs:    The dual constraint right-hand side
+        c_sense:  The sense of each constraint in the dual
+        d_sense:  The sense of the dual objective
+        v_domain: An array that indicates the domain of the dual variables
+                      (-1: Nonpositive, 0: Unbounded, 1: Nonnegative)
+        rows:     A list of (component, index, suffix) tuples that describe
+                      the primal constraint or variable bound for each dual
+                      variable
+    """
+    #
+    # fix variables
+    #
+    for vdata in fixed_modelvars.values():
+        vdata.fixed = True
+
+    cache = _repn_cache(block)
+    varmap = {}
+    primal_vars = []
+    c_rhs = []
+    obj_offset = 0
+    d_sense = None
+
+    def column(var):
+        j = varmap.get(id(var), None)
+        if j is None:
+            j = varmap[id(var)] = len(primal_vars)
+            primal_vars.append(var)
+            c_rhs.append(0.0)
+        return j
+    #
+    # Collect objective
+    #
+    nobj = 0
+    for odata in block.component_objects(Objective, active=True):
+        for ndx in odata:
+            o_terms = cache.linear_repn(odata[ndx], odata[ndx].expr)
+            obj_offset = o_terms.constant
+            if odata[ndx].sense == maximize:
+                d_sense = minimize
+            else:
+                d_sense = maximize
+            for var, coef in zip(o_terms.linear_vars, o_terms.linear_coefs):
+                if var.parent_component() is None:
+                    raise RuntimeError("ERROR: Variable %s encountered that is not owned by a Pyomo model" % str(var))
+                c_rhs[column(var)] = coef
+            nobj += 1
+    if nobj == 0:
+        raise RuntimeError("Error dualizing block.  No objective expression.")
+    if nobj > 1:
+        raise RuntimeError("Error dualizing block.  Multiple objective expressions.")
+    if not c_rhs:
+        # If len(c_rhs) == 0, then the objective is constant
+        raise RuntimeError("Error dualizing block.  Objective is constant.")
+    #
+    # Collect constraints
+    #
+    rows = []
+    b_coef = []
+    v_domain = []
+    irow = []
+    jcol = []
+    vals = []
+    A_terms = []
+
+    def add_row(component, ndx, suffix, domain, rhs):
+        rows.append((component, ndx, suffix))
+        v_domain.append(domain)
+        b_coef.append(rhs)
+        return len(rows)-1
+
+    for data in block.component_objects(Constraint, active=True):
+        for ndx in data:
+            con = data[ndx]
+            body_terms = cache.linear_repn(con, con.body)
+            if len(body_terms.linear_vars) == 0:
+                #
+                # If a constraint has a fixed body, then don't collect it.
+                #
+                continue
+            lower_terms = generate_standard_repn(con.lower, compute_values=False) \
+                                                    if not con.lower is None else None
+            upper_terms = generate_standard_repn(con.upper, compute_values=False) \
+                                                    if not con.upper is None else None
+            assert(lower_terms is None or lower_terms.is_constant())
+            assert(upper_terms is None or upper_terms.is_constant())
+            #
+            if con.equality:
+                new_rows = [add_row(data, ndx, '', 0, lower_terms.constant - body_terms.constant)]
+            elif lower_terms is None:
+                new_rows = [add_row(data, ndx, '', -1, upper_terms.constant - body_terms.constant)]
+            elif upper_terms is None:
+                new_rows = [add_row(data, ndx, '', 1, lower_terms.constant - body_terms.constant)]
+            else:
+                new_rows = [add_row(data, ndx, '_lb_', 1, lower_terms.constant - body_terms.constant),
+                            add_row(data, ndx, '_ub_', -1, upper_terms.constant - body_terms.constant)]
+            for var, coef in zip(body_terms.linear_vars, body_terms.linear_coefs):
+                j = column(var)
+                if type(coef) in native_numeric_types:
+                    for i in new_rows:
+                        irow.append(i)
+                        jcol.append(j)
+                        vals.append(coef)
+                else:
+                    for i in new_rows:
+                        A_terms.append((i, j, coef))
+    #
+    # Collect bound constraints
+    #
+    c_sense = []
+    for j, var in enumerate(primal_vars):
+        lb, ub = var.bounds
+        if lb is None and ub is None:
+            c_sense.append('e')
+            continue
+        if lb is None:
+            c_sense.append('g' if ub == 0.0 else 'e')
+        elif ub is None:
+            c_sense.append('l' if lb == 0.0 else 'e')
+        elif lb == 0:
+            c_sense.append('l')
+        elif ub == 0:
+            c_sense.append('g')
+        else:
+            c_sense.append('e')
+        #
+        # Add constraints that define the bounds, unless a bound is zero
+        # and it is treated as the sign of the variable
+        #
+        if ub is not None and (ub != 0 or lb == 0):
+            irow.append(add_row(var, var.index(), '_upper_', -1, ub))
+            jcol.append(j)
+            vals.append(1.0)
+        if lb is not None and not (lb == 0):
+            irow.append(add_row(var, var.index(), '_lower_', 1, lb))
+            jcol.append(j)
+            vals.append(1.0)
+
+    #
+    # Unfix the variables that were fixed
+    #
+    for vdata in fixed_modelvars.values():
+        vdata.fixed = False
+
+    A = csc_matrix((np.array(vals, dtype=np.float64), (np.array(irow, dtype=np.int64), np.array(jcol, dtype=np.int64))),
+                   shape=(len(rows), len(primal_vars)))
+    return Bunch(vars=primal_vars, A=A, A_terms=A_terms, b_coef=b_coef, obj_offset=obj_offset,
+                 c_rhs=c_rhs, c_sense=c_sense, d_sense=d_sense, v_domain=np.array(v_domain, dtype=np.int8),
+                 rows=rows)
+
+
+
+
+def create_linear_dual_from(block, fixed=None, unfixed=None, matrix=False, name_map=False):
     """
     Construct a block that represents the dual of the given block.
 
-    The resulting block contains variables and constraints whose names are
-    the dual names of the primal block.  Note that this involves a many
-    string operations.  A quicker operations could be executed, but it
-    would generate a dual representation that is difficult to interpret.
+    By default, the resulting block contains variables and constraints
+    whose names are the dual names of the primal block.  Note that this
+    involves a many string operations.  If **matrix** is True, then
+    the primal is collected as sparse arrays, and the dual is created
+    with an indexed variable, y, and an indexed constraint, c, which is
+    indexed by the ids of the primal variables.  This is much quicker for
+    large blocks, but it generates a dual representation that is more
+    difficult to interpret.  If **name_map** is also True, then the
+    dual block has a name_map attribute, which is a ComponentMap from
+    the dual variables and constraints to the names they would have
+    without the **matrix** option.
 
     Note that the dualization of a maximization problem is performed by
     negating objective and right-hand side coefficients after dualizing
@@ -328,39 +636,52 @@ def create_linear_dual_from(block, fixed=None, unfixed=None):
                 not fixed variables.  All other variables are assumed to be fixed.
         fixed: An iterable object with Variable and VarData values that are fixed.  
                 All other variables are assumed not fixed.
+        matrix: If True, then the dual is created from sparse arrays.
+        name_map: If True and matrix is True, then the name_map attribute
+                is added to the dual block.
 
     Returns:
         If the block is a model object, then this returns a ConcreteModel.
         Otherwise, it returns a Block.
     """
-    #
-    # Collect vardata that needs to be fixed
-    #
+    fixed_modelvars = _collect_fixed_modelvars(block, fixed, unfixed)
+    data = _collect_linear_dual(block, fixed_modelvars, matrix)
+    return _create_linear_dual_block(block, data, matrix, name_map)
+
+
+def _collect_fixed_modelvars(block, fixed=None, unfixed=None):
+    """
+    Collect the vardata in the block that are fixed when the dual is
+    collected.  This also caches the standard repns of the objectives
+    and constraints in the block.
+    """
     fixed_modelvars = {}
     if fixed or unfixed:
         #
         # Collect model variables
         #
+        # The variables are collected when the repns are cached, so
+        # the repns are not regenerated when the dual is collected.
+        #
+        cache = _repn_cache(block)
         modelvars = {}
         #
         # vardata in objectives
         #
         for obj in block.component_objects(Objective, active=True):
             for ndx in obj:
-                #odata = generate_standard_repn(obj[ndx].expr, compute_values=False)
-                for vdata in identify_variables(obj[ndx].expr, include_fixed=False):
+                for vdata in cache.get(obj[ndx], obj[ndx].expr).vars:
                     id_ = id(vdata)
-                    if not id_ in modelvars:
+                    if not vdata.fixed and not id_ in modelvars:
                         modelvars[id_] = vdata
         #
         # vardata in constraints
         #
         for con in block.component_objects(Constraint, active=True):
             for ndx in con:
-                #cdata = generate_standard_repn(con[ndx].body, compute_values=False)
-                for vdata in identify_variables(con[ndx].body, include_fixed=False):
+                for vdata in cache.get(con[ndx], con[ndx].body).vars:
                     id_ = id(vdata)
-                    if not id_ in modelvars:
+                    if not vdata.fixed and not id_ in modelvars:
                         modelvars[id_] = vdata
         #
         # Fix everything that isn't specified as unfixed
@@ -390,9 +711,27 @@ def create_linear_dual_from(block, fixed=None, unfixed=None):
             for id_ in fixed_vars:
                 if id_ in modelvars:
                     fixed_modelvars[id_] = modelvars[id_]
+    return fixed_modelvars
+
 
-    A, b_coef, obj_constant, c_rhs, c_sense, d_sense, v_domain =\
-                    collect_dual_representation(block, fixed_modelvars)
+def _collect_linear_dual(block, fixed_modelvars, matrix=False):
+    """
+    Collect the data used to construct the dual of the block.
+    """
+    if matrix:
+        return collect_dual_matrices(block, fixed_modelvars)
+    return collect_dual_representation(block, fixed_modelvars)
+
+
+def _create_linear_dual_block(block, data, matrix=False, name_map=False):
+    """
+    Construct a block that represents the dual, using the data collected
+    by _collect_linear_dual().
+    """
+    if matrix:
+        return _create_linear_dual_from_matrices(block, data, name_map)
+
+    A, b_coef, obj_constant, c_rhs, c_sense, d_sense, v_domain = data
 
     #
     # Construct the block
@@ -409,13 +748,7 @@ def create_linear_dual_from(block, fixed=None, unfixed=None):
         v = _vars.get((name, ndx), None)
         if v is None:
             v = Var()
-            if ndx is None:
-                v_name = name
-            elif isinstance(ndx, tuple):
-                v_name = "%s[%s]" % (name, ','.join(map(str, ndx)))
-            else:
-                v_name = "%s[%s]" % (name, str(ndx))
-            setattr(dual, v_name, v)
+            setattr(dual, _indexed_name(name, ndx), v)
             _vars[name, ndx] = v
         return v
     #
@@ -457,16 +790,8 @@ def create_linear_dual_from(block, fixed=None, unfixed=None):
                 e = expr - rhsval >= 0
             c = Constraint(expr=e)
 
-            # Build constraint name
-            if ndx is None:
-                c_name = cname
-            elif isinstance(ndx, tuple):
-                c_name = "%s[%s]" % (cname, ','.join(map(str, ndx)))
-            else:
-                c_name = "%s[%s]" % (cname, str(ndx))
-
             # Add new constraint along with its name to the dual
-            setattr(dual, c_name, c)
+            setattr(dual, _indexed_name(cname, ndx), c)
 
         # Set variable domains
         for (name, ndx), domain in v_domain.items():
@@ -481,3 +806,81 @@ def create_linear_dual_from(block, fixed=None, unfixed=None):
                 v.domain = Reals
 
     return dual
+
+
+def _create_linear_dual_from_matrices(block, data, name_map):
+    """
+    Construct a block that represents the dual, using the data collected
+    by collect_dual_matrices().
+    """
+    if isinstance(block, Model):
+        dual = ConcreteModel()
+    else:
+        dual = Block()
+    dual.construct()
+    #
+    # Create the dual variables
+    #
+    nrows, ncols = data.A.shape
+    dual.y = Var(range(nrows))
+    y = [dual.y[i] for i in range(nrows)]
+    for i in np.flatnonzero(data.v_domain == 1):
+        y[i].domain = NonNegativeReals
+    for i in np.flatnonzero(data.v_domain == -1):
+        y[i].domain = NonPositiveReals
+    #
+    # Construct the objective
+    # The dualization of a maximization problem is handled by simply negating the
+    # objective and left-hand side coefficients while keeping the dual sense.
+    #
+    if data.d_sense == minimize:
+        rhs_multiplier = -1
+    else:
+        rhs_multiplier = 1
+    numeric = [i for i in range(nrows) if type(data.b_coef[i]) in native_numeric_types]
+    e = LinearExpression(constant=0, linear_coefs=[rhs_multiplier*data.b_coef[i] for i in numeric], linear_vars=[y[i] for i in numeric])
+    if len(numeric) < nrows:
+        numeric = set(numeric)
+        e = e + sum(rhs_multiplier*data.b_coef[i]*y[i] for i in range(nrows) if i not in numeric)
+    dual.o = Objective(expr=data.obj_offset + e, sense=data.d_sense)
+    #
+    # Construct the constraints from the columns of the primal matrix
+    #
+    A = data.A
+    A_terms = {}
+    for i, j, coef in data.A_terms:
+        A_terms.setdefault(j, []).append((i, coef))
+
+    def c_rule(model, j):
+        start, stop = A.indptr[j], A.indptr[j+1]
+        if start == stop and j not in A_terms:
+            return Constraint.Skip
+        expr = LinearExpression(constant=0, linear_coefs=A.data[start:stop].tolist(), linear_vars=[y[i] for i in A.indices[start:stop]])
+        if j in A_terms:
+            expr = expr + sum(coef*y[i] for i, coef in A_terms[j])
+        #
+        # Note that rhs_multiplier is 1 if the dual is a maximization problem and -1 otherwise
+        #
+        rhsval = rhs_multiplier*data.c_rhs[j]
+        if data.c_sense[j] == 'e':
+            return expr - rhsval == 0
+        elif data.c_sense[j] == 'l':
+            return expr - rhsval <= 0
+        return expr - rhsval >= 0
+    dual.c = Constraint(range(ncols), rule=c_rule)
+    #
+    # Create the map from dual components to the names used by create_linear_dual_from()
+    #
+    if name_map:
+        dual.name_map = ComponentMap()
+        for i, (component, ndx, suffix) in enumerate(data.rows):
+            if suffix in ('_upper_', '_lower_'):
+                name = _variable_name(component, block)
+            else:
+                name = component.getname(relative_to=block)
+            dual.name_map[y[i]] = _indexed_name(name+suffix, ndx)
+        for j, var in enumerate(data.vars):
+            if j in dual.c:
+                dual.name_map[dual.c[j]] = _indexed_name(_variable_name(var, block), var.index())
+
+    return dual
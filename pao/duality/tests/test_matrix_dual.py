@@ -0,0 +1,136 @@
+#
+# Test the matrix-based construction of linear duals
+#
+
+from os.path import abspath, dirname, join
+
+import pyutilib.misc
+import pyutilib.th as unittest
+
+from pyomo.environ import Var, Constraint, Objective, value
+from pyomo.repn import generate_standard_repn
+from pao.duality.collect import create_linear_dual_from, _repn_cache
+
+currdir = dirname(abspath(__file__))
+
+
+def summarize(dual, name):
+    """
+    Summarize the dual using the names of its components.
+    """
+    cons = {}
+    for c in dual.component_data_objects(Constraint, active=True):
+        repn = generate_standard_repn(c.body, compute_values=False)
+        coefs = {name(v):value(coef) for v, coef in zip(repn.linear_vars, repn.linear_coefs)}
+        lower = None if c.lower is None else value(c.lower) - value(repn.constant)
+        upper = None if c.upper is None else value(c.upper) - value(repn.constant)
+        cons[name(c)] = (coefs, lower, upper, repn.nonlinear_expr is not None)
+    obj = next(dual.component_data_objects(Objective, active=True))
+    repn = generate_standard_repn(obj.expr, compute_values=True)
+    objective = ({name(v):coef for v, coef in zip(repn.linear_vars, repn.linear_coefs)}, repn.constant, obj.sense)
+    domains = {name(v):str(v.domain) for v in dual.component_data_objects(Var)}
+    return cons, objective, domains
+
+
+class Test_matrix_dual(unittest.TestCase):
+
+    def run_dual(self, problem, block=None, fixed=None):
+        model = pyutilib.misc.import_file(join(currdir, problem+'.py'), clear_cache=True).model
+        if block is not None:
+            block = getattr(model, block)
+        else:
+            block = model
+        if fixed is not None:
+            fixed = [getattr(model, v) for v in fixed]
+
+        dual = create_linear_dual_from(block, fixed=fixed)
+        mdual = create_linear_dual_from(block, fixed=fixed, matrix=True, name_map=True)
+
+        self.assertEqual(len(mdual.name_map), len(list(dual.component_data_objects(Var))) + len(list(dual.component_data_objects(Constraint))))
+        expected = summarize(dual, lambda c: c.parent_component().local_name)
+        actual = summarize(mdual, lambda c: mdual.name_map[c] if c in mdual.name_map else c.name)
+        self.assertEqual(actual, expected)
+
+    def test_t1(self):
+        self.run_dual('t1')
+
+    def test_t2(self):
+        self.run_dual('t2')
+
+    def test_t5(self):
+        self.run_dual('t5')
+
+    def test_t6(self):
+        self.run_dual('t6')
+
+    def test_t8(self):
+        self.run_dual('t8', block='sub', fixed=['u'])
+
+    def test_t10(self):
+        self.run_dual('t10')
+
+    def test_t11(self):
+        self.run_dual('t11')
+
+    def test_indexed(self):
+        model = pyutilib.misc.import_file(join(currdir, 't1.py'), clear_cache=True).model
+        dual = create_linear_dual_from(model, matrix=True)
+        self.assertFalse(hasattr(dual, 'name_map'))
+        self.assertEqual(len(dual.y), 3)
+        self.assertEqual(len(dual.c), 3)
+
+    def test_err1(self):
+        model = pyutilib.misc.import_file(join(currdir, 'err1.py'), clear_cache=True).model
+        with self.assertRaises(RuntimeError):
+            create_linear_dual_from(model, matrix=True)
+
+
+class Test_repn_cache(unittest.TestCase):
+
+    def load(self, problem):
+        return pyutilib.misc.import_file(join(currdir, problem+'.py'), clear_cache=True).model
+
+    def test_reuse(self):
+        # The cached repns are reused when the block is dualized again
+        model = self.load('t8')
+        create_linear_dual_from(model.sub, fixed=[model.u])
+        cache = _repn_cache(model.sub)
+        entries = {id(c):cache.data[c] for c in model.sub.component_data_objects(Constraint, active=True)}
+        self.assertEqual(len(entries), len(cache.data)-1)
+        create_linear_dual_from(model.sub, fixed=[model.u])
+        for c in model.sub.component_data_objects(Constraint, active=True):
+            self.assertIs(cache.data[c], entries[id(c)])
+
+    def dual(self, problem, block=None, fixed=None, first=None):
+        model = self.load(problem)
+        block = model if block is None else getattr(model, block)
+        if first is not None:
+            create_linear_dual_from(block, fixed=[getattr(model, v) for v in first])
+        fixed = None if fixed is None else [getattr(model, v) for v in fixed]
+        dual = create_linear_dual_from(block, fixed=fixed)
+        return summarize(dual, lambda c: c.parent_component().local_name)
+
+    def test_fixed(self):
+        # The cached repns are valid when different variables are fixed
+        self.assertEqual(self.dual('t8', 'sub', ['u'], first=[]), self.dual('t8', 'sub', ['u']))
+        self.assertEqual(self.dual('t1', first=['x1']), self.dual('t1'))
+        self.assertEqual(self.dual('t1', fixed=['x1'], first=['x2']), self.dual('t1', fixed=['x1']))
+
+    def test_modified(self):
+        # The cached repn is regenerated when a constraint is modified
+        model = self.load('t1')
+        create_linear_dual_from(model)
+        cache = _repn_cache(model)
+        entry = cache.data[model.c1]
+        model.c1.set_value(model.x1 + model.x2 >= 2)
+        dual = create_linear_dual_from(model)
+        self.assertIsNot(cache.data[model.c1], entry)
+
+        model = self.load('t1')
+        model.c1.set_value(model.x1 + model.x2 >= 2)
+        expected = summarize(create_linear_dual_from(model), lambda c: c.parent_component().local_name)
+        self.assertEqual(summarize(dual, lambda c: c.parent_component().local_name), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
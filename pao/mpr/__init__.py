@@ -2,6 +2,8 @@ from .repn import LinearMultilevelProblem, QuadraticMultilevelProblem
 from . import convert_repn
 from . import examples
 from .convert_repn import linearize_bilinear_terms
+from .cache import ResultsCache, CachedSolver
+from .storage import save_problem, load_problem
 from .solver import Solver
 #from . import pyomo_solvers
 from . import solvers
@@ -0,0 +1,255 @@
+#
+# Caching of solver results for multilevel problem representations
+#
+import os
+import enum
+import time
+import pickle
+import hashlib
+import tempfile
+import collections
+import numpy as np
+from scipy.sparse import csr_matrix
+
+import pao.common
+from .repn import LinearMultilevelProblem, QuadraticMultilevelProblem
+from .solver import LinearMultilevelResults
+from .soln_manager import SolutionManager_Cached_Results
+
+
+def _hash_array(h, x):
+    if x is None:
+        h.update(b'None')
+        return
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    h.update(str(x.shape).encode())
+    h.update(x.tobytes())
+
+
+def _hash_matrix(h, A):
+    if A is None:
+        h.update(b'None')
+        return
+    A = csr_matrix(A, dtype=np.float64, copy=True)
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    A.sort_indices()
+    h.update(str(A.shape).encode())
+    h.update(A.indptr.astype(np.int64).tobytes())
+    h.update(A.indices.astype(np.int64).tobytes())
+    h.update(A.data.tobytes())
+
+
+def canonical_hash(M, *args):
+    """
+    Compute a hash of the data in a multilevel problem.
+
+    The hash is computed from the level tree, the variable types and
+    bounds, and the c, A, b, d, P and Q data in each level.  Sparse
+    matrices are hashed in a canonical CSR form, so the hash does not
+    depend on how the matrices were created.  Levels are identified by
+    their position in M.levels(), so the hash does not depend on the
+    level ids.  Additional arguments are
+    included in the hash using their repr() value.
+
+    Args
+    ----
+    M : LinearMultilevelProblem or QuadraticMultilevelProblem
+        The multilevel problem.
+    args
+        Additional data that is included in the hash.
+
+    Returns
+    -------
+    str
+        A hexadecimal digest of the hash.
+    """
+    h = hashlib.sha256()
+    h.update(type(M).__name__.encode())
+    levels = list(M.levels())
+    position = {L.id:i for i,L in enumerate(levels)}
+    for L in levels:
+        UL = L.UL()
+        h.update(repr((position[L.id], None if UL is None else position[UL.id], L.x.nxR, L.x.nxZ, L.x.nxB, L.minimize, L.inequalities, float(L.d))).encode())
+        _hash_array(h, L.x.lower_bounds)
+        _hash_array(h, L.x.upper_bounds)
+        _hash_array(h, L.b)
+        for X in levels:
+            _hash_array(h, L.c[X])
+            _hash_matrix(h, L.A[X])
+        if type(M) is QuadraticMultilevelProblem:
+            for i,j in sorted(L.P, key=lambda ij: (position[ij[0]], position[ij[1]])):
+                h.update(repr(('P',position[i],position[j])).encode())
+                _hash_matrix(h, L.P[i,j])
+            for i,j in sorted(L.Q, key=lambda ij: (position[ij[0]], position[ij[1]])):
+                h.update(repr(('Q',position[i],position[j])+L.Q[i,j].shape).encode())
+                _hash_matrix(h, L.Q[i,j].data)
+    for arg in args:
+        h.update(repr(arg).encode())
+    return h.hexdigest()
+
+
+class ResultsCache(object):
+    """
+    A cache of solver results.
+
+    Results are stored in memory in a least-recently-used cache with at
+    most **maxsize** entries.  If **directory** is specified, then results
+    are also stored on disk, and results that are not in memory are loaded
+    from disk.
+
+    Args
+    ----
+    maxsize : int, Default: 128
+        The maximum number of results stored in memory.
+    directory : str
+        The directory where results are stored on disk.
+    """
+
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._data = collections.OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._data)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key+'.pkl')
+
+    def get(self, key):
+        """
+        Return the results stored with **key**, or None if there are none.
+        """
+        value = self._data.get(key, None)
+        if value is not None:
+            self._data.move_to_end(key)
+            return value
+        if self.directory is None or not os.path.exists(self._filename(key)):
+            return None
+        with open(self._filename(key), 'rb') as INPUT:
+            value = pickle.load(INPUT)
+        self._add(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Store results with **key**.
+        """
+        self._add(key, value)
+        if self.directory is not None:
+            fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as OUTPUT:
+                pickle.dump(value, OUTPUT)
+            os.replace(tmpname, self._filename(key))
+
+    def clear(self):
+        """
+        Remove the results stored in memory.
+        """
+        self._data.clear()
+
+    def _add(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+def _simple_value(value):
+    return value is None or type(value) in (bool, int, float, str) or isinstance(value, enum.Enum)
+
+
+def _results_to_data(model, results):
+    """
+    Return a picklable summary of the results and the solution in the model.
+    """
+    return dict(values=[list(L.x.values) for L in model.levels()],
+                solver={k:v for k,v in results.solver.items() if _simple_value(v)},
+                problem={k:v for k,v in results.problem.items() if _simple_value(v)})
+
+
+def _results_from_data(data):
+    """
+    Create a results object from the data created by _results_to_data().
+    """
+    results = LinearMultilevelResults(solution_manager=SolutionManager_Cached_Results(data['values']))
+    results.solver.update(data['solver'])
+    results.problem.update(data['problem'])
+    return results
+
+
+class CachedSolver(pao.common.SolverAPI):
+    """
+    A solver that caches the results of another solver.
+
+    The results for a multilevel problem are stored in **cache**, using
+    a hash of the problem, the solver name and the solver options.  If
+    the same problem is solved again with the same options, then the
+    cached results are returned and the cached solution is loaded into
+    the problem without executing the solver.
+
+    Problems are only cached when the solution is loaded into the
+    problem, and when all of the solver options are simple values (e.g.
+    not solver objects).  The timing data for cached results only
+    contains the ``cache_lookup`` phase.
+
+    Args
+    ----
+    solver
+        A solver created with :class:`.Solver`, or the name of a solver.
+    cache : ResultsCache
+        The cache where results are stored.  If this is not specified,
+        then an in-memory cache is created.
+    options
+        Keyword options used to create the solver, if **solver** is a name.
+    """
+
+    def __init__(self, solver, cache=None, **options):
+        super().__init__()
+        if isinstance(solver, str):
+            solver = pao.common.Solver(solver, **options)
+        self.solver = solver
+        self.cache = ResultsCache() if cache is None else cache
+        self.config = solver.config
+
+    def available(self):
+        return self.solver.available()
+
+    def solve(self, model, **options):
+        if type(model) not in [LinearMultilevelProblem, QuadraticMultilevelProblem]:
+            return self.solver.solve(model, **options)
+        #
+        # Compute the solver options used for this solve
+        #
+        config = self.solver.config()
+        self.solver._update_config(dict(options), config=config, validate_options=False)
+        config = {k:config[k] for k in config if k not in ('tee', 'timing_callback')}
+        if not config.get('load_solutions', True) or not all(_simple_value(v) for v in config.values()):
+            return self.solver.solve(model, **options)
+        #
+        # Return the cached results, and load the solution into the model
+        #
+        start_time = time.time()
+        key = canonical_hash(model, getattr(self.solver, 'name', type(self.solver).__name__), sorted(config.items()), sorted((k,repr(v)) for k,v in options.items() if k not in config))
+        data = self.cache.get(key)
+        if data is not None:
+            results = _results_from_data(data)
+            results.solver.cache_hit = True
+            results.copy_solution(From=None, To=model)
+            results.solver.wallclock_time = time.time() - start_time
+            results.timing.cache_lookup = results.solver.wallclock_time
+            return results
+        #
+        # Solve the problem and cache the results
+        #
+        results = self.solver.solve(model, **options)
+        if results.solver.termination_condition != pao.common.TerminationCondition.error:
+            self.cache.put(key, _results_to_data(model, results))
+        results.solver.cache_hit = False
+        return results
+
+
+pao.common.SolverAPI._generate_solve_docstring(CachedSolver)
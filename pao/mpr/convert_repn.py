@@ -1,406 +1,184 @@
 import copy
-from scipy.sparse import coo_matrix, dok_matrix, csc_matrix, vstack
+from scipy.sparse import coo_matrix, csc_matrix, csr_matrix, diags, vstack
 import numpy as np
+from pyutilib.misc import Bunch
 from .repn import LinearMultilevelProblem, QuadraticMultilevelProblem, LinearLevelRepn
 from .soln_manager import LMP_SolutionManager, SolutionManager_Linearized_Bilinear_Terms
 
-#
-# Variable Change objects that cache information needed to
-# transform real and integer variables into a non-negative form.
-#
-class VChange(object):
-    def __init__(self, real=True, v=None, cid=None, w=None, lb=None, ub=None):
-        self.real = real            # If false, then this is a general integer variable
-        self.v = v                  # Index of the current variable, whose coefficient may change
-        self.cid = cid
-        self.w = w                  # Index of a new variable that needs to be added
-        self.lb = lb
-        self.ub = ub
-
-    def __str__(self):              # pragma: no cover
-        return "VChange(real=%d v=%s cid=%d w=%s lb=%s ub=%s)" % (self.real, str(self.v), self.cid, str(self.w), str(self.lb), str(self.ub))
-
-# Variable with a nonzero lower bound
-class VChangeLowerBound(VChange):
-    def __init__(self, *, real, v, lb):
-        super().__init__(real=real, v=v, cid=1, lb=lb)
-
-# Variable with a finite upper bound
-class VChangeUpperBound(VChange):
-    def __init__(self, *, real, v, ub):
-        super().__init__(real=real, v=v, cid=2, ub=ub)
-
-# Variable with finite lower and upper bounds
-class VChangeRange(VChange):
-    def __init__(self, *, real, v, lb, ub, w=None):
-        super().__init__(real=real, v=v, cid=3, lb=lb, ub=ub, w=w)
-
-# Variable that is unbounded
-class VChangeUnbounded(VChange):
-    def __init__(self, *, real, v, w):
-        super().__init__(real=real, v=v, cid=4, w=w)
-
 class VChanges(object):
+    """
+    Cache the information needed to transform the real and integer
+    variables in a level into a non-negative form.
+
+    The changes are stored as parallel NumPy arrays with one entry per
+    variable that changes:
+
+        kind    The type of change (LowerBound, UpperBound, Range or Unbounded)
+        v       Index of the current variable, whose coefficient may change
+        w       Index of a new variable that needs to be added (-1 if none)
+        lb      The lower bound of the variable
+        ub      The upper bound of the variable
+    """
+
+    LowerBound = 1      # Variable with a nonzero lower bound
+    UpperBound = 2      # Variable with a finite upper bound
+    Range = 3           # Variable with finite lower and upper bounds
+    Unbounded = 4       # Variable that is unbounded
 
     def __init__(self, nxR, nxZ):
-        self._data = []     # List of VChange object
         self.nxR_old = nxR  # The old nxR value before applying changes
         self.nxZ_old = nxZ  # The old nxZ value before applying changes
         self.nxR = nxR      # The new nxR value after applying changes
         self.nxZ = nxZ      # The new nxZ value after applying changes
-
-    def append(self, chg):
-        self._data.append(chg)
+        self.kind = np.zeros(0, dtype=np.int64)
+        self.v = np.zeros(0, dtype=np.int64)
+        self.w = np.zeros(0, dtype=np.int64)
+        self.lb = np.zeros(0, dtype=np.float64)
+        self.ub = np.zeros(0, dtype=np.float64)
 
     def __len__(self):
-        return len(self._data)
-
-    def __iter__(self):
-        for chg in self._data:
-            yield chg
-
-def _matrix_rows(M, col):
-    if M is None or M.data.size == 0:
-        return
-    i = M.indptr[col]
-    inext = M.indptr[col+1]
-    while i<inext:
-        row = M.indices[i]
-        yield row
-        i += 1
+        return self.kind.size
 
 def _find_nonpositive_variables(V, inequalities):
     nxV = V.nxR+V.nxZ
-    nxR = V.nxR
-    nxZ = V.nxZ
-    changes = VChanges(nxR, nxZ)
-
-    for i in range(nxV):
-        lb = V.lower_bounds[i]
-        ub = V.upper_bounds[i]
-        if ub == np.PINF:
-            if lb == 0:
-                continue
-            elif lb == np.NINF:
-                # Unbounded variable
-                if i<V.nxR:
-                    changes.append( VChangeUnbounded(real=True, v=i, w=nxR) )
-                    nxR += 1
-                else:
-                    changes.append( VChangeUnbounded(real=False, v=i, w=nxZ) )
-                    nxZ += 1
-            else:
-                # Bounded below
-                changes.append( VChangeLowerBound(real=i<V.nxR, v=i, lb=lb) )
-        elif lb == np.NINF:
-            # Bounded above
-            changes.append( VChangeUpperBound(real=i<V.nxR, v=i, ub=ub) )
-        elif inequalities:
-            # Bounded above and below (inequality formulation)
-            changes.append( VChangeRange(real=i<V.nxR, v=i, lb=lb, ub=ub) )
-        else:
-            # Bounded above and below (equality formulation)
-            changes.append( VChangeRange(real=i<V.nxR, v=i, lb=lb, ub=ub, w=nxR) )
-            nxR += 1
-
-    # Reset the variable id for integers, given the final value of nxR
-    for c in changes:
-        if c.real is False:
-            c.v += nxR-V.nxR
-        if type(c) is VChangeUnbounded and c.real is False:
-            c.w += nxR
-
-    assert (nxR+nxZ == nxV + sum(1 if c.w is not None else 0 for c in changes))
+    changes = VChanges(V.nxR, V.nxZ)
+
+    lb = V.lower_bounds[:nxV]
+    ub = V.upper_bounds[:nxV]
+    real = np.arange(nxV) < V.nxR
+    kind = np.zeros(nxV, dtype=np.int64)
+    kind[(ub == np.PINF) & (lb != np.NINF) & (lb != 0)] = VChanges.LowerBound
+    kind[(ub != np.PINF) & (lb == np.NINF)] = VChanges.UpperBound
+    kind[(ub != np.PINF) & (lb != np.NINF)] = VChanges.Range
+    kind[(ub == np.PINF) & (lb == np.NINF)] = VChanges.Unbounded
+    #
+    # New real variables are added for unbounded real variables, and
+    # for the slack variables of bounded variables (equality formulation).
+    # New integer variables are added for unbounded integer variables.
+    #
+    wR = (kind == VChanges.Unbounded) & real
+    if not inequalities:
+        wR |= kind == VChanges.Range
+    wZ = (kind == VChanges.Unbounded) & ~real
+    nxR = V.nxR + int(wR.sum())
+    nxZ = V.nxZ + int(wZ.sum())
+
+    w = np.full(nxV, -1, dtype=np.int64)
+    w[wR] = V.nxR + np.arange(nxR-V.nxR)
+    # Integer variables are shifted by the new real variables
+    w[wZ] = nxR + V.nxZ + np.arange(nxZ-V.nxZ)
+    v = np.arange(nxV)
+    v[~real] += nxR-V.nxR
+
+    ndx = np.flatnonzero(kind)
+    changes.kind = kind[ndx]
+    changes.v = v[ndx]
+    changes.w = w[ndx]
+    changes.lb = lb[ndx]
+    changes.ub = ub[ndx]
     changes.nxR = nxR
     changes.nxZ = nxZ
     return changes
 
 
+def _shift_and_scale(changes, ncols):
+    """
+    Return the vectors (shift, scale) where the original variables are
+    x = shift + scale*x' for the new nonnegative variables x'.
+    """
+    kind, v, lb, ub = changes.kind, changes.v, changes.lb, changes.ub
+    shift = np.zeros(ncols)
+    scale = np.ones(ncols)
+    mask = (kind == VChanges.LowerBound) | (kind == VChanges.Range)
+    shift[v[mask]] = lb[mask]
+    mask = kind == VChanges.UpperBound
+    shift[v[mask]] = ub[mask]
+    scale[v[mask]] = -1
+    return shift, scale
+
+
 def _process_changes_obj(changes, V, c, d):
     if c is None:
         return c, d
 
-    d = copy.copy(d)
-
-    for chg in changes:
-        v = chg.v
-        if type(chg) is VChangeLowerBound:      # real variable bounded below
-            # Replace v >= lb with v' >= 0
-            # v = lb + v'
-            # c[v]*v = c[v]*lb + c[v]*v'
-            lb = chg.lb
-            d += c[v]*lb
-
-        elif type(chg) is VChangeUpperBound:    # real variable bounded above
-            # Replace v <= ub with v' >= 0
-            # v = ub - v'
-            # c[v]*v = c[v]*ub - c[v]*v'
-            ub = chg.ub
-            d += c[v]*ub
-            c[v] *= -1
-
-        elif type(chg) is VChangeRange:         # real variable bounded
-            # Replace lb <= v <= ub with v' >= 0
-            # v = lb + v'
-            # c[v]*v = c[v]*lb + c[v]*v'
-            lb = chg.lb
-            ub = chg.ub
-            d += c[v]*lb
-            w = chg.w
-            if w is not None:
-                c[w] = 0
-
-        else:                                   # real variable unbounded
-            # Replace unbounded v with v',v'' >= 0
-            # v = v' - v''
-            # c[v]*v = c[v]*v' - c[v]*v''
-            w = chg.w
-            c[w] = -c[v]
+    kind, v, w = changes.kind, changes.v, changes.w
+    shift, scale = _shift_and_scale(changes, c.size)
+    #
+    # Substitute x = shift + scale*x'
+    #
+    #   c*x = c*shift + (c*scale)*x'
+    #
+    d = d + np.dot(c, shift)
+    c *= scale
+    #
+    # Slack variables for range variables have zero cost
+    #
+    mask = (kind == VChanges.Range) & (w >= 0)
+    c[w[mask]] = 0
+    #
+    # Replace unbounded v with v',v'' >= 0
+    #
+    #   c[v]*v = c[v]*v' - c[v]*v''
+    #
+    mask = kind == VChanges.Unbounded
+    c[w[mask]] = -c[v[mask]]
 
     return c, d
 
 
 def _process_changes_con(changes, V, A, b, add_rows=False):
-    b = copy.copy(b)
+    b = np.array(b, dtype=np.float64)
+    ncols = changes.nxR+changes.nxZ+V.nxB
+    kind, v, w, lb, ub = changes.kind, changes.v, changes.w, changes.lb, changes.ub
 
-    if A is None:
-        Acsc = csc_matrix(0)
-        nrows = 0
+    if A is not None and A.shape[0] > 0:
+        A = csr_matrix(A)
+        shift, scale = _shift_and_scale(changes, A.shape[1])
+        #
+        # Substitute x = shift + scale*x'
+        #
+        #   A*x <= b   -->   (A*diag(scale))*x' <= b - A*shift
+        #
+        b[:A.shape[0]] -= A @ shift
+        B = A @ diags(scale)
+        #
+        # Replace unbounded v with v',v'' >= 0.  The matrix S copies
+        # the negated column v into column w.
+        #
+        #   A[:,v]*v = A[:,v]*v' - A[:,v]*v''
+        #
+        mask = kind == VChanges.Unbounded
+        if mask.any():
+            S = csr_matrix((-np.ones(mask.sum()), (v[mask], w[mask])), shape=(A.shape[1], A.shape[1]))
+            B = B + A @ S
+        B.resize((B.shape[0], ncols))
     else:
-        Acsc = A.tocsc()
-        nrows = A.shape[0]
-
-    B = {}
-    for chg in changes:
-        v = chg.v
-        if type(chg) is VChangeLowerBound:      # real variable bounded below
-            # Replace v >= lb with v' >= 0
-            # v = lb + v'
-            # A[row,v]*v = A[row,v]*lb + A[row,v]*v'
-            lb = chg.lb
-            for row in _matrix_rows(Acsc, v):
-                b[row] -= Acsc[row, v]*lb
-
-        elif type(chg) is VChangeUpperBound:    # real variable bounded above
-            # Replace v <= ub with v' >= 0
-            # v = ub - v'
-            # A[row,v]*v = A[row,v]*ub - A[row,v]*v'
-            ub = chg.ub
-            for row in _matrix_rows(Acsc, v):
-                b[row] -= Acsc[row, v]*ub
-                Acsc[row, v] *= -1
-
-        elif type(chg) is VChangeRange:         # real variable bounded
-            # Replace lb <= v <= ub with v' >= 0
-            # v = lb + v'
-            # A[row,v]*v = A[row,v]*lb + A[row,v]*v'
-            lb = chg.lb
-            ub = chg.ub
-            w = chg.w
-            for row in _matrix_rows(Acsc, v):
-                b[row] -= Acsc[row, v]*lb
-            if add_rows:
-                # Add new constraint
-                # If w is not None, then we are adding an associated slack variable
-                # NOTE: We only add the constraint to the level that "owns" the variables
-                b = np.append(b, ub-lb)
-                B[nrows, v] = 1
-                if w is not None:
-                    B[nrows, w] = 1
-                nrows += 1
-
-        else:                                   # real variable unbounded
-            # Replace unbounded v with v',v'' >= 0
-            # v = v' - v''
-            # A[row,v]*v = A[row,v]*v' - A[row,v]*v''
-            w = chg.w
-            for row in _matrix_rows(Acsc, v):
-                B[row, w] = - Acsc[row, v]
-
-    if nrows == 0:
-        return None, b
+        B = None
 
-    Bdok = dok_matrix((nrows, changes.nxR+changes.nxZ+V.nxB))
-    # Collect the items from B
-    for k,v in B.items():
-        Bdok[k] = v
-    # Merge in the items from A, shifting columns
-    Adok = Acsc.todok()
-    for k,v in Adok.items():
-        Bdok[k] = v
-    return Bdok.tocoo(), b
-
-
-def X_process_changes_P(changes, Lx, Xci, P, Xcj, changes_i, changes_j): #pragma: nocover
-    if P is None:
-        return Xci, P, Xcj
-
-    if Xci is None:
-        Xci = np.zeros(P.shape[0])
-    if Xcj is None:
-        Xcj = np.zeros(P.shape[1])
-
-    if changes_i and changes_j:
-        raise RuntimeError("PAO does not (yet) support quadratic and bilinear terms amongst variables in the same level")
-
-    elif changes_j:
-        Pcsc = P.tocsc()
-
-        B = {}
-        for chg in changes:
-            v = chg.v
-            if type(chg) is VChangeLowerBound:      # real variable bounded below
-                # Replace v >= lb with v' >= 0
-                # v = lb + v'
-                # P[row,v]*v = P[row,v]*lb + P[row,v]*v'
-                lb = chg.lb
-                for row in _matrix_rows(Pcsc, v):
-                    Xci[row] += Pcsc[row, v]*lb
-
-            elif type(chg) is VChangeUpperBound:    # real variable bounded above
-                # Replace v <= ub with v' >= 0
-                # v = ub - v'
-                # P[row,v]*v = P[row,v]*ub - P[row,v]*v'
-                ub = chg.ub
-                for row in _matrix_rows(Pcsc, v):
-                    Xci[row] += pcsc[row, v]*ub
-                    Pcsc[row, v] *= -1
-
-            elif type(chg) is VChangeRange:         # real variable bounded
-                # Replace lb <= v <= ub with v' >= 0
-                # v = lb + v'
-                # P[row,v]*v = P[row,v]*lb + P[row,v]*v'
-                lb = chg.lb
-                for row in _matrix_rows(Pcsc, v):
-                    Xci[row] += Pcsc[row, v]*lb
-
-            else:                                   # real variable unbounded
-                # Replace unbounded v with v',v'' >= 0
-                # v = v' - v''
-                # A[row,v]*v = A[row,v]*v' - A[row,v]*v''
-                w = chg.w
-                for row in _matrix_rows(Pcsc, v):
-                    B[row, w] = - Pcsc[row, v]
-
-        Bdok = dok_matrix((Pcsc.shape[0], changes.nxR+changes.nxZ+Lx.nxB))
-        # Collect the items from B
-        for k,v in B.items():
-            Bdok[k] = v
-        # Merge in the items from Pcsc
-        Pdok = Pcsc.todok()
-        for k,v in Pdok.items():
-            Bdok[k] = v
-
-        if len(Xci.nonzero()) == 0:
-            Xci = None
-        if len(Xcj.nonzero()) == 0:
-            Xcj = None
-
-        return Xci, Bdok.tocoo(), Xcj
-
-    else:   # changes_i
-        #print("HERE")
-        _Xcj, _P, _Xci = _process_changes_P(changes, Lx, Xcj, P.transpose(), Xci, changes_j, changes_i)
-        #print(Xci, _Xci)
-        #print(Xcj, _Xcj)
-        return _Xci, _P.transpose(), _Xcj
-
-def X_process_changes(changes, V, c, d, A, b, add_rows=False):  #pragma: nocover
-    d = copy.copy(d)
-    b = copy.copy(b)
+    if add_rows:
+        #
+        # Add new constraints for range variables:  v + w = ub - lb
+        # If w is not -1, then we are adding an associated slack variable
+        # NOTE: We only add the constraint to the level that "owns" the variables
+        #
+        mask = kind == VChanges.Range
+        nrange = mask.sum()
+        if nrange > 0:
+            k = np.arange(nrange)
+            slack = w[mask] >= 0
+            rows = np.concatenate((k, k[slack]))
+            cols = np.concatenate((v[mask], w[mask][slack]))
+            R = csr_matrix((np.ones(rows.size), (rows, cols)), shape=(nrange, ncols))
+            if B is None:
+                B = csr_matrix((b.size, ncols))
+            else:
+                B.resize((b.size, ncols))
+            B = vstack([B, R], format='csr')
+            b = np.concatenate((b, ub[mask]-lb[mask]))
 
-    if A is None:
-        Acsc = csc_matrix(0)
-        nrows = 0
-    else:
-        Acsc = A.tocsc()
-        nrows = A.shape[0]
-
-    B = {}
-    for chg in changes:
-        v = chg.v
-        if type(chg) is VChangeLowerBound:      # real variable bounded below
-            # Replace v >= lb with v' >= 0
-            # v' = v - lb
-            lb = chg.lb
-            if c is not None:
-                # c[v]*v = c[v]*lb + c[v]*v'
-                d += c[v]*lb
-            if A is not None:
-                # i is index of the vth column in the A matrix
-                i = Acsc.indptr[v]
-                inext = Acsc.indptr[v+1]
-                while i<inext:
-                    row = Acsc.indices[i]
-                    b[row] -= Acsc[row, v]*lb
-                    i += 1
-
-        elif type(chg) is VChangeUpperBound:    # real variable bounded above
-            ub = chg.ub
-            if c is not None:
-                d += c[v]*ub
-                c[v] *= -1
-            if A is not None:
-                # i is index of the vth column in the A matrix
-                i = Acsc.indptr[v]
-                inext = Acsc.indptr[v+1]
-                while i<inext:
-                    row = Acsc.indices[i]
-                    b[row] -= Acsc[row, v]*ub
-                    Acsc[row, v] *= -1
-                    i += 1
-
-        elif type(chg) is VChangeRange:         # real variable bounded
-            lb = chg.lb
-            ub = chg.ub
-            w = chg.w
-            if c is not None:
-                d += c[v]*lb
-                if w is not None:
-                    c[w] = 0
-            if A is not None:
-                # i is index of the vth column in the A matrix
-                i = Acsc.indptr[v]
-                inext = Acsc.indptr[v+1]
-                while i<inext:
-                    row = Acsc.indices[i]
-                    b[row] -= Acsc[row, v]*lb
-                    i += 1
-            if add_rows:
-                # Add new constraint
-                # If w is not None, then we are adding an associated slack variable
-                # NOTE: We only add the constraint to the level that "owns" the variables
-                b = np.append(b, ub-lb)
-                B[nrows, v] = 1
-                if w is not None:
-                    B[nrows, w] = 1
-                nrows += 1
-
-        else:                                   # real variable unbounded
-            w = chg.w
-            if c is not None:
-                c[w] = -c[v]
-            if A is not None:
-                # i is index of the vth column in the A matrix
-                i = Acsc.indptr[v]
-                inext = Acsc.indptr[v+1]
-                while i<inext:
-                    row = Acsc.indices[i]
-                    B[row, w] = - Acsc[row, v]
-                    i += 1
-
-    if nrows == 0:
-        return c, d, None, b
-
-    Bdok = dok_matrix((nrows, changes.nxR+changes.nxZ+V.nxB))
-    # Collect the items from B
-    for k,v in B.items():
-        Bdok[k] = v
-    # Merge in the items from A, shifting columns
-    Adok = Acsc.todok()
-    for k,v in Adok.items():
-        Bdok[k] = v
-    return c, d, Bdok.tocoo(), b
+    if B is None or B.shape[0] == 0:
+        return None, b
+    return B.tocoo(), b
 
 
 def convert_to_nonnegative_variables(ans, inequalities):
@@ -509,10 +287,8 @@ def convert_constraints(ans, inequalities):
                 B = L.A[L]
                 if B is None:
                     continue
-                B = B.todok()
-                for i in range(len(L.b)):
-                    B[i,nxR+i] = 1
-                L.A[L] = B
+                i = np.arange(len(L.b))
+                L.A[L] = B + csr_matrix((np.ones(i.size), (i, nxR+i)), shape=B.shape)
     #
     # Update inequality values
     #
@@ -520,18 +296,48 @@ def convert_constraints(ans, inequalities):
         L.inequalities = inequalities
 
 
+def _original_index(L, changes):
+    """
+    Return the index in level L of each variable that was changed.
+    Slack variables are never changed, so the real variables keep their
+    index and the integer variables are shifted back by the number of
+    real variables added to L.
+    """
+    row = changes.v.copy()
+    row[row >= changes.nxR] -= changes.nxR - L.x.nxR
+    return row
+
+
 def get_multipliers(mpr, changes):
     multipliers = {}
     for L in mpr.levels():
+        chg = changes[L.id]
+        nx = len(L.x)
+        #
+        # The column of each original variable in the transformed level.
+        # If there were no changes, then the multiplier is 1.
+        #
+        # The changes were computed after slack variables were added to
+        # the real variables, so the integer and binary columns are
+        # shifted relative to the original level.
         #
-        # If there were no changes, then the multiplier is 1
+        col = np.arange(nx)
+        col[L.x.nxR:] += chg.nxR - L.x.nxR
+        col[L.x.nxR+L.x.nxZ:] += chg.nxZ - L.x.nxZ
+        data = np.ones(nx)
         #
-        multipliers[L.id] =   [[(i,1)] for i in L.x]
-        for chg in changes[L.id]:
-            if type(chg) is VChangeUpperBound:
-                multipliers[L.id][ chg.v ] = [(chg.v,-1)]
-            elif type(chg) is VChangeUnbounded:
-                multipliers[L.id][ chg.v ] = [(chg.v,1), (chg.w,-1)]
+        # The original index of each changed variable
+        #
+        row = _original_index(L, chg)
+
+        mask = chg.kind == VChanges.UpperBound
+        data[row[mask]] = -1
+        mask = chg.kind == VChanges.Unbounded
+        i = np.concatenate((np.arange(nx), row[mask]))
+        j = np.concatenate((col, chg.w[mask]))
+        data = np.concatenate((data, -np.ones(mask.sum())))
+        ncols = chg.nxR + chg.nxZ + L.x.nxB
+        multipliers[L.id] = csr_matrix((data, (i, j)), shape=(nx, ncols))
     return multipliers
 
 def get_offsets(mpr, changes):
@@ -540,14 +346,13 @@ def get_offsets(mpr, changes):
         #
         # If there were no changes, then the offset is 0
         #
-        offsets[L.id] =   [0 for i in L.x]
-        for chg in changes[L.id]:
-            if type(chg) is VChangeUpperBound:
-                offsets[L.id][ chg.v ] = chg.ub
-            elif type(chg) is VChangeLowerBound:
-                offsets[L.id][ chg.v ] = chg.lb
-            elif type(chg) is VChangeRange:
-                offsets[L.id][ chg.v ] = chg.lb
+        chg = changes[L.id]
+        row = _original_index(L, chg)
+        offsets[L.id] = np.zeros(len(L.x))
+        mask = chg.kind == VChanges.UpperBound
+        offsets[L.id][row[mask]] = chg.ub[mask]
+        mask = (chg.kind == VChanges.LowerBound) | (chg.kind == VChanges.Range)
+        offsets[L.id][row[mask]] = chg.lb[mask]
     return offsets
 
 
@@ -560,14 +365,13 @@ def convert_binaries_to_integers(mpr, nonnegative=True):
                 L.x._resize(nxR=L.x.nxR, nxZ=L.x.nxZ+L.x.nxB, nxB=0, lb=0, ub=np.PINF)
                 if L.b is None or L.b.size == 0:
                     continue
-                M = dok_matrix((nxB,len(L.x)))
-                for i in range(nxB):
-                    M[i,nxRZ+i] = 1
+                i = np.arange(nxB)
+                M = coo_matrix((np.ones(nxB), (i, nxRZ+i)), shape=(nxB,len(L.x)))
                 L.b = np.append(L.b, [1]*nxB)
                 if L.A[L] is None:
-                    L.A[L] = M.tocoo()
+                    L.A[L] = M
                 else:
-                    L.A[L] = vstack([L.A[L], M.tocoo()])
+                    L.A[L] = vstack([L.A[L], M])
             else:
                 L.x._resize(nxR=L.x.nxR, nxZ=L.x.nxZ+L.x.nxB, nxB=0, lb=0, ub=1)
     #
@@ -635,19 +439,6 @@ def convert_to_standard_form(M, inequalities=False):
     return ans, LMP_SolutionManager(get_multipliers(M, changes), get_offsets(M, changes))
 
 
-def merge_matrices(M1, M2, nrows, ncols):
-    if M1 is None:
-        M = dok_matrix((0,0))
-    else:
-        M = M1.todok()
-    M.resize( (max(M.shape[0], nrows), max(M.shape[1], ncols)) )
-    for k,v in M2.items():
-        M[k] = v
-    if M.shape[0] == 0 or M.shape[1] == 0:
-        return None
-    return M 
-
-
 def linearize_bilinear_terms(M, bigM):
     """
     Generate a linear multilevel problem from a quadratic multilevel
@@ -694,137 +485,118 @@ def linearize_bilinear_terms(M, bigM):
     # regardless where they appear in the model.  Hence, we need to collect
     # these terms before adding their replacement throughout the model.
     #
-    bilevel = {} 
-    for L in M.levels():
-        bilevel[L.id] = {}
+    # Each occurrence of a term is stored as arrays with the level l where
+    # it appears, the constraint c (-1 for the objective), the
+    # variables (i,v1) and (j,v2) and its coefficient.
+    #
+    occurrences = {L.id:[] for L in M.levels()}
     for L in M.levels():
-        l = L.id
         for i,j in L.P:
-            for v1,v2 in L.P[i,j].keys():
-                assert (v1 >= LL[i].x.nxR+LL[i].x.nxZ), "Expected binary variable %d in bilinear term %s.P[%d,%d]" % (v1,str(L),i,j)
-                if (i,v1,j,v2) not in bilevel[j]:
-                    bilevel[j][i,v1,j,v2] = len(bilevel[j])
+            P = L.P[i,j].tocoo()
+            occurrences[j].append( (L.id, np.full(P.nnz, -1, dtype=np.int64), i, P.row, P.col, P.data) )
         for i,j in L.Q:
-            for c,Q in enumerate(L.Q[i,j]):
-                if Q is None:
-                    continue
-                for v1,v2 in Q.todok().keys():
-                    assert (v1 >= LL[i].x.nxR+LL[i].x.nxZ), "Expected binary variable %d in bilinear term %s.Q[%d,%d][%d,%d]" % (v1,L.name,i,j,v1,v2)
-                    if (i,v1,j,v2) not in bilevel[j]:
-                        #print(i,j,c,v1,v2, L.Q[i,j][c][v1,v2])
-                        bilevel[j][i,v1,j,v2] = len(bilevel[j])
+            c, v1, v2, val = L.Q[i,j].triplets()
+            occurrences[j].append( (L.id, c, i, v1, v2, val) )
+    #
+    # Number the distinct terms (i,v1,v2) in each level j in the order
+    # they are first found.  The w-th term in level j is replaced by the
+    # new real variable nxR[j]+w.
+    #
+    bilevel = {}
+    for j, occ in occurrences.items():
+        if len(occ) == 0:
+            continue
+        i = np.concatenate([np.full(len(o[3]), o[2], dtype=np.int64) for o in occ])
+        v1 = np.concatenate([o[3] for o in occ]).astype(np.int64)
+        v2 = np.concatenate([o[4] for o in occ]).astype(np.int64)
+        _, first, inverse = np.unique(np.stack([i, v1, v2], axis=1), axis=0, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty(order.size, dtype=np.int64)
+        rank[order] = np.arange(order.size)
+        terms = first[order]
+        bilevel[j] = Bunch(i=i[terms], v1=v1[terms], v2=v2[terms], w=rank[inverse.ravel()],
+                           l=np.concatenate([np.full(len(o[1]), o[0], dtype=np.int64) for o in occ]),
+                           c=np.concatenate([o[1] for o in occ]).astype(np.int64),
+                           val=np.concatenate([o[5] for o in occ]))
+        for k in np.unique(bilevel[j].i):
+            X = LL[k].x
+            bad = (bilevel[j].i == k) & (bilevel[j].v1 < X.nxR+X.nxZ)
+            assert (not bad.any()), "Expected binary variable %d in bilinear term with variables in levels %d and %d" % (bilevel[j].v1[bad][0], k, j)
     #
     # Return if no bilevel terms were found
     #
-    if sum(len(bilevel[i]) for i in bilevel) == 0:
-        return ans
+    if len(bilevel) == 0:
+        return ans, SolutionManager_Linearized_Bilinear_Terms()
     #
     # Now we walk through each level
     #
-    # Add constraint terms for the existing variables that are in each term
-    #
-    # NOTE: We cache the constraint terms for the *new* variables
-    #
-    A = {}
-    wlb = {}
-    wub = {}
-    for l,L in LL.items():
-        lenb = len(L.b)
-        nxR = L.x.nxR
-        nrows = lenb
-        wlb[l] = {}
-        wub[l] = {}
-        b = []
-        # A[l] is the new terms in the constraint matrix for new variables in level l
-        A[l] = {}
-        # B[i] is the new terms in the constraint matrix for variables in level l
-        X = {}
-        # C[j] is the new terms in the constraint matrix for variables in level j that appear in level l
-        Y = {}
-        for key,w in bilevel[l].items():
-            # w = xy
-            i,v1,j,v2 = key
-            assert (j==l), "Something is wrong..."
-            if i not in X:
-                X[i] = {}
-            if j not in Y:
-                Y[j] = {}
-            lb = LL[j].x.lower_bounds[v2]
-            wlb[j][nxR+w] = lb
-            if lb == np.NINF:
-                lb = -bigM
-            ub = LL[j].x.upper_bounds[v2]
-            wub[j][nxR+w] = ub
-            if ub == np.PINF:
-                ub = bigM
-            # Lx - w <= 0
-            X[i][nrows,v1] = lb
-            A[l][nrows,nxR+w] = -1
-            b.append(0)
-            nrows += 1
-            # Ux + y - w <= U
-            Y[j][nrows,v2] = 1
-            X[i][nrows,v1] = ub
-            A[l][nrows,nxR+w] = -1
-            b.append(ub)
-            nrows += 1
-            # w - Ux <= 0
-            X[i][nrows,v1] = -ub
-            A[l][nrows,nxR+w] = 1
-            b.append(0)
-            nrows += 1
-            # w - y - Lx <= -L
-            Y[j][nrows,v2] = -1
-            X[i][nrows,v1] = -lb
-            A[l][nrows,nxR+w] = 1
-            if lb == 0:
-                b.append(0)
+    # Add four constraints for each term w = x*y, where x is binary and
+    # L <= y <= U:
+    #
+    #   Lx - w <= 0
+    #   Ux + y - w <= U
+    #   w - Ux <= 0
+    #   w - y - Lx <= -L
+    #
+    # The constraint terms for the *new* variables are added after the
+    # levels are resized.
+    #
+    nxR = {l:L.x.nxR for l,L in LL.items()}
+    for l,T in bilevel.items():
+        L = LL[l]
+        nrows = len(L.b)
+        k = T.v2.size
+        lb = L.x.lower_bounds[T.v2]
+        lb = np.where(lb == np.NINF, -bigM, lb)
+        ub = L.x.upper_bounds[T.v2]
+        ub = np.where(ub == np.PINF, bigM, ub)
+        t = np.arange(k)
+        zeros = np.zeros(k)
+        ones = np.ones(k)
+        #
+        # Terms for the binary variables x and the variables y
+        #
+        rows = np.concatenate([4*t, 4*t+1, 4*t+2, 4*t+3, 4*t+1, 4*t+3])
+        cols = np.concatenate([np.tile(T.v1, 4), T.v2, T.v2])
+        vals = np.concatenate([lb, ub, -ub, -lb, ones, -ones])
+        levels = np.concatenate([np.tile(T.i, 4), np.full(2*k, l, dtype=np.int64)])
+        for X in LL.values():
+            mask = levels == X.id
+            if not mask.any() and L.A[X] is None:
+                continue
+            B = csr_matrix((vals[mask], (rows[mask], cols[mask])), shape=(4*k, len(X.x)))
+            if L.A[X] is None:
+                L.A[X] = vstack([csr_matrix((nrows, len(X.x))), B], format='csr')
             else:
-                b.append(-lb)
-            nrows += 1
-        L.b = list(L.b) + b
-        for i in X:
-            L.A[i] = merge_matrices(L.A[i], X[i], len(L.b), len(LL[i].x))
-        for j in Y:
-            L.A[j] = merge_matrices(L.A[j], Y[j], len(L.b), len(LL[j].x))
+                L.A[X] = vstack([L.A[X], B], format='csr')
+        L.b = np.concatenate([L.b, np.stack([zeros, ub, zeros, np.where(lb == 0, 0, -lb)], axis=1).ravel()])
+        T.rows = nrows + np.concatenate([4*t, 4*t+1, 4*t+2, 4*t+3])
+        T.vals = np.concatenate([-ones, -ones, ones, ones])
     #
     # Resize the variables
     #
     for l,L in LL.items():
-        L.resize(nxR=L.x.nxR+len(bilevel[l]), nxZ=L.x.nxZ, nxB=L.x.nxB)
-        #for i in wlb[l]:
-        #    L.x.lower_bounds[i] = wlb[l][i]
-        #    L.x.upper_bounds[i] = wub[l][i]
-    #
-    # Update the coefficients of the objectives
-    #
-    nxR = {L.id:L.x.nxR for L in M.levels()}
-    for L in M.levels():
-        l = L.id
-        for i,j in L.P:
-            for v1,v2 in L.P[i,j].keys():
-                w = bilevel[j][i,v1,j,v2]
-                # The coefficient in ans at level l for variables in level j at (w + number of reals in M) is coef
-                LL[l].c[j][w+nxR[j]] = L.P[i,j][v1,v2]
-    #
-    # Merge the cached terms now that we've shifted the variables
-    #
-    for l,L in LL.items():
-        L.A[l] = merge_matrices(L.A[l], A[l], len(L.b), len(L.x))
-    #
-    # Update the A matrices with coefficients from Q[i,j]
-    #
-    for L in M.levels():
-        l = L.id
-        for i,j in L.Q:
-            A = {}
-            for c,Q in enumerate(L.Q[i,j]):
-                if Q is None:
-                    continue
-                for v1,v2 in Q.todok().keys():
-                    w = bilevel[j][i,v1,j,v2]
-                    A[c,w+nxR[j]] = Q[v1,v2]
-            LL[l].A[j] = merge_matrices(LL[l].A[j], A, len(LL[l].b), len(LL[j].x))
+        if l in bilevel:
+            L.resize(nxR=L.x.nxR+bilevel[l].v2.size, nxZ=L.x.nxZ, nxB=L.x.nxB)
+    #
+    # Add the new variables to the constraints and objectives.  The
+    # coefficient of a term in P[i,j] or Q[i,j] at level l is the
+    # coefficient of its new variable in c[j] or A[j] at level l.
+    #
+    for j,T in bilevel.items():
+        cols = nxR[j] + T.w
+        L = LL[j]
+        L.A[j] = L.A[j] + csr_matrix((T.vals, (T.rows, nxR[j] + np.tile(np.arange(T.v2.size), 4))), shape=L.A[j].shape)
+        for l in np.unique(T.l):
+            X = LL[l]
+            mask = (T.l == l) & (T.c == -1)
+            if mask.any():
+                if X.c[j] is None:
+                    X.c[j] = np.zeros(len(L.x))
+                X.c[j][cols[mask]] = T.val[mask]
+            mask = (T.l == l) & (T.c >= 0)
+            if mask.any():
+                Q = csr_matrix((T.val[mask], (T.c[mask], cols[mask])), shape=(len(X.b), len(L.x)))
+                X.A[j] = Q if X.A[j] is None else X.A[j] + Q
 
     return ans, SolutionManager_Linearized_Bilinear_Terms()
-
@@ -3,7 +3,7 @@ import weakref
 import copy
 import pprint
 import collections.abc
-from scipy.sparse import csr_matrix, dok_matrix
+from scipy.sparse import csr_matrix
 import numpy as np
 from pyutilib.misc import Bunch
 
@@ -18,29 +18,128 @@ def _equal_nparray(Ux, U_coef, Lx, L_coef):
             return False
     return True
 
+def _remap_columns(j, old, new):
+    """
+    Map the column indices in the array **j** from the variable layout
+    described by **old** to the layout described by **new**.  Columns
+    that are dropped by the resize are mapped to -1.
+    """
+    ans = np.full(j.shape, -1, dtype=np.int64)
+    # Reals
+    mask = (j < old.nxR) & (j < new.nxR)
+    ans[mask] = j[mask]
+    # Integers
+    j_ = j - old.nxR
+    mask = (j_ >= 0) & (j_ < old.nxZ) & (j_ < new.nxZ)
+    ans[mask] = j_[mask] + new.nxR
+    # Binaries
+    j_ = j - old.nxR - old.nxZ
+    mask = (j_ >= 0) & (j_ < new.nxB)
+    ans[mask] = j_[mask] + new.nxR + new.nxZ
+    return ans
+
 def _update_matrix(*, A, old, new, update_columns=True):
-    A = A.todok()
-    if not update_columns:
-        A = A.transpose()
-
-    A_ = dok_matrix((A.shape[0], new.nxR+new.nxZ+new.nxB), dtype=np.float64)
-    for ndx in A.keys():
-        i,j = ndx
-        if j < old.nxR:
-            if j<new.nxR:
-                A_[i,j] = A[i,j]
-        elif j < old.nxR+old.nxZ:
-            j_ = j-old.nxR
-            if j_<new.nxZ:
-                A_[i,j_+new.nxR] = A[i,j]
-        else:
-            j_ = j-old.nxR-old.nxZ
-            if j_<new.nxB:
-                A_[i,j_+new.nxR+new.nxZ] = A[i,j]
+    A = A.tocoo()
+    nx = new.nxR+new.nxZ+new.nxB
+    if update_columns:
+        j = _remap_columns(A.col, old, new)
+        keep = j >= 0
+        return csr_matrix((A.data[keep], (A.row[keep], j[keep])), shape=(A.shape[0], nx), dtype=np.float64)
+    else:
+        i = _remap_columns(A.row, old, new)
+        keep = i >= 0
+        return csr_matrix((A.data[keep], (i[keep], A.col[keep])), shape=(nx, A.shape[1]), dtype=np.float64)
+
+
+def _triplets(shape, data):
+    """
+    Convert a dictionary that maps index tuples to values, or a tuple of
+    index arrays followed by a value array, into a list of index arrays
+    and a value array.
+    """
+    if type(data) is dict:
+        keys = np.array(list(data.keys()), dtype=np.int64).reshape(-1, len(shape))
+        values = np.fromiter(data.values(), dtype=np.float64, count=len(data))
+        return [keys[:,k] for k in range(len(shape))], values
+    return [np.asarray(index, dtype=np.int64) for index in data[:-1]], np.asarray(data[-1], dtype=np.float64)
+
 
-    if not update_columns:
-        A_ = A_.transpose()
-    return A_.tocsr()
+class SparseMatrixStack(object):
+    """
+    A list of sparse matrices with the same shape.  This is stored as a
+    single CSR matrix with a row for each matrix, which contains the
+    nonzeros of the matrix in row-major order.
+    """
+
+    def __init__(self, shape, data=None):
+        nmat, nrows, ncols = shape
+        self.shape = shape
+        if data is None:
+            data = csr_matrix((nmat, nrows*ncols), dtype=np.float64)
+        self.data = data
+
+    @staticmethod
+    def from_triplets(shape, k, i, j, v):
+        """
+        Create a stack from arrays with the matrix, row and column
+        index of each nonzero value.  Duplicate entries are summed.
+        """
+        nmat, nrows, ncols = shape
+        ndx = np.asarray(i, dtype=np.int64)*ncols + np.asarray(j, dtype=np.int64)
+        return SparseMatrixStack(shape, csr_matrix((v, (k, ndx)), shape=(nmat, nrows*ncols), dtype=np.float64))
+
+    @staticmethod
+    def from_list(matrices):
+        """
+        Create a stack from a list of sparse matrices, where a value of
+        None indicates an empty matrix.
+        """
+        shape = next((m.shape for m in matrices if m is not None), (0,0))
+        k = []
+        i = []
+        j = []
+        v = []
+        for c, m in enumerate(matrices):
+            if m is None:
+                continue
+            m = csr_matrix(m).tocoo()
+            k.append(np.full(m.nnz, c, dtype=np.int64))
+            i.append(m.row)
+            j.append(m.col)
+            v.append(m.data)
+        if len(v) == 0:
+            return SparseMatrixStack((len(matrices),)+shape)
+        return SparseMatrixStack.from_triplets((len(matrices),)+shape, np.concatenate(k), np.concatenate(i), np.concatenate(j), np.concatenate(v))
+
+    def triplets(self):
+        """
+        Return arrays with the matrix, row and column index of each
+        nonzero value, and the array of values.
+        """
+        A = self.data.tocoo()
+        i, j = np.divmod(A.col.astype(np.int64), self.shape[2])
+        return A.row.astype(np.int64), i, j, A.data
+
+    def copy(self):
+        return SparseMatrixStack(self.shape, self.data.copy())
+
+    @property
+    def size(self):
+        return self.data.nnz
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, c):
+        row = self.data.getrow(c)
+        if row.nnz == 0:
+            return None
+        i, j = np.divmod(row.indices.astype(np.int64), self.shape[2])
+        return csr_matrix((row.data, (i, j)), shape=self.shape[1:])
+
+    def __iter__(self):
+        for c in range(self.shape[0]):
+            yield self[c]
 
 
 class SimplifiedList(collections.abc.MutableSequence):
@@ -142,18 +241,18 @@ class LevelVariable(object):
 
         tlower = self.lower_bounds
         tupper = self.upper_bounds
-        self.lower_bounds = np.array([lb]*num, dtype=np.float64)
-        self.upper_bounds = np.array([ub]*num, dtype=np.float64)
-
-        for i in range(min(nxR,self.nxR)):
-            self.lower_bounds[i] = tlower[i]
-            self.upper_bounds[i] = tupper[i]
-        for i in range(min(nxZ,self.nxZ)):
-            self.lower_bounds[i+nxR] = tlower[i+self.nxR]
-            self.upper_bounds[i+nxR] = tupper[i+self.nxR]
-        for i in range(min(nxB,self.nxB)):
-            self.lower_bounds[i+nxR+nxZ] = tlower[i+self.nxR+self.nxZ]
-            self.upper_bounds[i+nxR+nxZ] = tupper[i+self.nxR+self.nxZ]
+        self.lower_bounds = np.full(num, lb, dtype=np.float64)
+        self.upper_bounds = np.full(num, ub, dtype=np.float64)
+
+        n = min(nxR,self.nxR)
+        self.lower_bounds[:n] = tlower[:n]
+        self.upper_bounds[:n] = tupper[:n]
+        n = min(nxZ,self.nxZ)
+        self.lower_bounds[nxR:nxR+n] = tlower[self.nxR:self.nxR+n]
+        self.upper_bounds[nxR:nxR+n] = tupper[self.nxR:self.nxR+n]
+        n = min(nxB,self.nxB)
+        self.lower_bounds[nxR+nxZ:nxR+nxZ+n] = tlower[self.nxR+self.nxZ:self.nxR+self.nxZ+n]
+        self.upper_bounds[nxR+nxZ:nxR+nxZ+n] = tupper[self.nxR+self.nxZ:self.nxR+self.nxZ+n]
 
         self.nxR = nxR
         self.nxZ = nxZ
@@ -205,7 +304,8 @@ class LevelValues(object):
             if self.x is not None:
                 ans.x = self.x.copy()
         elif self._matrix_list:
-            ans.x = [None if m is None else np.copy(m) for m in self.x]
+            if self.x is not None:
+                ans.x = self.x.copy()
         else:
             if self.x is not None:
                 ans.x = np.copy(self.x)
@@ -216,31 +316,20 @@ class LevelValues(object):
             if self._matrix:                
                 x = csr_matrix( x )
             elif self._matrix_list:                
-                x = [csr_matrix(m) if type(m) is list else m for m in x]
+                x = SparseMatrixStack.from_list([csr_matrix(m) if type(m) is list else m for m in x])
             else:
                 x = np.array(x, dtype=np.float64)
         elif type(x) is tuple:
+            #
+            # The data is either a dictionary that maps indices to values,
+            # or a tuple of index arrays followed by a value array.
+            #
             if self._matrix:
-                nrows,ncols = x[0]
-                xnew = dok_matrix((nrows,ncols))
-                for key,value in x[1].items():
-                    xnew[key] = value
-                x = xnew
+                (i, j), v = _triplets(x[0], x[1])
+                x = csr_matrix((v, (i, j)), shape=x[0], dtype=np.float64)
             elif self._matrix_list:
-                ncon,nrows,ncols = x[0]
-                con = {}
-                for key,value in x[1].items():
-                    i,j,k = key
-                    if i not in con:
-                        con[i] = dok_matrix((nrows,ncols))
-                    con[i][j,k] = value
-                xnew = []
-                for i in range(ncon):
-                    if i in con:
-                        xnew.append( csr_matrix(con[i]) )
-                    else:
-                        xnew.append( None )
-                x = xnew
+                (k, i, j), v = _triplets(x[0], x[1])
+                x = SparseMatrixStack.from_triplets(x[0], k, i, j, v)
                 
         super().__setattr__('x', x)
 
@@ -260,7 +349,7 @@ class LevelValues(object):
                 n = max(n, self.x.shape[0])
         elif self._matrix_list:
             if self.x is not None:
-                n += sum(0 if m is None else m.size for m in self.x)
+                n += self.x.size
         else:
             if self.x is not None:
                 n += self.x.size
@@ -513,13 +602,11 @@ class LinearLevelRepn(object):
         #
         c = self.c[level]
         if c is not None:
-            c_ = np.zeros(new.nxR+new.nxZ+new.nxB)          # RHS of the constraints
-            for i in range(min(new.nxR,old.nxR)):
-                c_[i] = c[i]
-            for i in range(min(new.nxZ,old.nxZ)):
-                c_[i+new.nxR] = c[i+old.nxR]
-            for i in range(min(new.nxB,old.nxB)):
-                c_[i+new.nxR+new.nxZ] = c[i+old.nxR+old.nxZ]
+            c_ = np.zeros(new.nxR+new.nxZ+new.nxB)
+            j = np.arange(c.size)
+            j_ = _remap_columns(j, old, new)
+            keep = j_ >= 0
+            c_[j_[keep]] = c[keep]
             self.c[level] = c_
         #
         # Update 'A'
@@ -669,7 +756,17 @@ class QuadraticLevelRepn(LinearLevelRepn):
         for L1,L2 in self.Q:
             if L1 == level.id or L2 == level.id:
                 Q = self.Q[L1,L2]
-                self.Q[L1,L2] = [None if m is None else _update_matrix(A=m, old=old, new=new, update_columns=L2==level.id) for m in Q]
+                k, i, j, v = Q.triplets()
+                nmat, nrows, ncols = Q.shape
+                if L2 == level.id:
+                    j = _remap_columns(j, old, new)
+                    keep = j >= 0
+                    ncols = new.nxR+new.nxZ+new.nxB
+                else:
+                    i = _remap_columns(i, old, new)
+                    keep = i >= 0
+                    nrows = new.nxR+new.nxZ+new.nxB
+                self.Q[L1,L2] = SparseMatrixStack.from_triplets((nmat, nrows, ncols), k[keep], i[keep], j[keep], v[keep])
 
     @staticmethod
     def _clone_level(self, parent, data, ans=None):
@@ -1,9 +1,28 @@
 from munch import Munch
+import numpy as np
 import pyomo.environ as pe
 from .repn import LinearMultilevelProblem, QuadraticMultilevelProblem
 
 
+def _values(var):
+    """
+    Return the values of an indexed Pyomo variable as an array.
+    """
+    if var is None:
+        return np.zeros(0)
+    return np.array([v.value for v in var.values()], dtype=np.float64)
+
+
 class LMP_SolutionManager(object):
+    """
+    Map the solution of a transformed problem back to the original problem.
+
+    For each level, the original variables are recovered as
+
+        x = multipliers[L.id] @ x' + offsets[L.id]
+
+    where x' is the vector of variables in the transformed level.
+    """
 
     def __init__(self, multipliers, offsets):
         self.multipliers = multipliers
@@ -28,20 +47,18 @@ class LMP_SolutionManager(object):
 
         elif type(From) is Munch and type(To) in [LinearMultilevelProblem,QuadraticMultilevelProblem]:
             for L in To.levels():
-                multipliers = self.multipliers[L.id]
-                offsets = self.offsets[L.id]
-                for j in range(L.x.nxR):
-                    L.x.values[j] = sum(pe.value(From.LxR[L.id][v]) * c for v,c in multipliers[j]) + offsets[j]
-                for j in range(L.x.nxZ):
-                    jj = j+L.x.nxR
-                    L.x.values[jj] = round(sum(pe.value(From.LxZ[L.id][v-L.x.nxR]) * c for v,c in multipliers[jj])) + offsets[jj]
-                if From.get('LxB',None) is None:
-                    # Binaries are at the end of the integers
-                    for j in range(L.x.nxB):
-                        L.x.values[j+L.x.nxR+L.x.nxZ] = round(pe.value(From.LxZ[L.id][j+L.x.nxZ]))
-                else:
-                    for j in range(L.x.nxB):
-                        L.x.values[j+L.x.nxR+L.x.nxZ] = round(pe.value(From.LxB[L.id][j]))
+                #
+                # The variables in the transformed model are ordered as
+                # reals, integers and binaries.  If LxB is missing, then the
+                # binaries are at the end of the integers.
+                #
+                x = [_values(From.LxR[L.id]), _values(From.LxZ[L.id])]
+                if From.get('LxB',None) is not None:
+                    x.append(_values(From.LxB[L.id]))
+                x = np.concatenate(x)
+                values = self.multipliers[L.id] @ x + self.offsets[L.id]
+                nxR = L.x.nxR
+                L.x.values = values[:nxR].tolist() + [int(v) for v in np.round(values[nxR:])]
 
         else:
             raise RuntimeError("Unexpected types: From=%s To=%s" % (str(type(From)), str(type(To))))
@@ -68,3 +85,19 @@ class SolutionManager_Linearized_Bilinear_Terms(object):
                 L.x.values[j + L.x.nxR] = L_.x.values[j + L_.x.nxR]
             for j in range(L.x.nxB):
                 L.x.values[j + L.x.nxR+L.x.nxZ] = L_.x.values[j + L_.x.nxR+L_.x.nxZ]
+
+
+class SolutionManager_Cached_Results(object):
+    """
+    Copy a cached solution into a multilevel problem.
+
+    The solution is stored as a list with the variable values in each
+    level, in the order of To.levels().
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    def copy(self, From=None, To=None):
+        for L, values in zip(To.levels(), self.values):
+            L.x.values = list(values)
@@ -42,6 +42,7 @@ class LinearMultilevelSolver_FA(LinearMultilevelSolverBase):
         domain=float,
         description="The big-M value used to enforce complementarity conditions.  (default is 1e5)"
         ))
+    config.declare('model_builder', pyomo_util.model_builder_option())
 
     def __init__(self, **kwds):
         super().__init__(name='pao.mpr.FA')
@@ -77,10 +78,12 @@ class LinearMultilevelSolver_FA(LinearMultilevelSolverBase):
         # Start clock
         #
         start_time = time.time()
+        timer = pao.common.PhaseTimer(self.config.timing_callback)
 
-        self.standard_form, soln_manager = convert_to_standard_form(model, inequalities=False)
+        with timer('convert_to_standard_form'):
+            self.standard_form, soln_manager = convert_to_standard_form(model, inequalities=False)
 
-        M = self._create_pyomo_model(self.standard_form, self.config.bigm)
+        M = self._create_pyomo_model(self.standard_form, self.config.bigm, timer)
         #
         # Solve the Pyomo model the specified solver
         #
@@ -92,23 +95,26 @@ class LinearMultilevelSolver_FA(LinearMultilevelSolverBase):
 
         #if self.config.mip_options is not None:
         #    opt.options.update(self.config.mip_options)
-        pyomo_results = opt.solve(M, tee=self.config.tee, 
-                                     load_solutions=self.config.load_solutions)
+        with timer('solve'):
+            pyomo_results = opt.solve(M, tee=self.config.tee, 
+                                         load_solutions=self.config.load_solutions)
         pyomo.opt.check_optimal_termination(pyomo_results)
 
         self._initialize_results(results, pyomo_results, M)
         results.solver.rc = getattr(opt, '_rc', None)
 
-        if self.config.load_solutions:
-            # Load results from the Pyomo model to the LinearMultilevelProblem
-            results.copy_solution(From=M, To=model)
-        else:
-            # Load results from the Pyomo model to the Results
-            results.load_from(pyomo_results)
+        with timer('load_solution'):
+            if self.config.load_solutions:
+                # Load results from the Pyomo model to the LinearMultilevelProblem
+                results.copy_solution(From=M, To=model)
+            else:
+                # Load results from the Pyomo model to the Results
+                results.load_from(pyomo_results)
 
         #self._debug(M)
         #results.solver.log = getattr(opt, '_log', None)
 
+        results.timing = timer.timing
         results.solver.wallclock_time = time.time() - start_time
         return results
 
@@ -137,20 +143,13 @@ class LinearMultilevelSolver_FA(LinearMultilevelSolverBase):
         #prob.sense = 'minimize'
         return results
 
-    def _create_pyomo_model(self, repn, bigM):
-        M = create_model_replacing_LL_with_kkt(repn)
+    def _create_pyomo_model(self, repn, bigM, timer):
         #
-        # Transform the problem to a MIP
+        # The complementarity conditions are expressed with binary
+        # variables and big-M constraints, so this is a MIP
         #
-        # TODO - directly create the bigM relaxation here.  Applying
-        # Pyomo transformations in sequence creates a model object that is
-        # difficult to interpret.
-        #
-        xfrm = pe.TransformationFactory('mpec.simple_disjunction')
-        xfrm.apply_to(M)
-        xfrm = pe.TransformationFactory('gdp.bigm')
-        xfrm.apply_to(M, bigM=bigM)
-
+        with timer('create_model'):
+            M = create_model_replacing_LL_with_kkt(repn, self.config.model_builder, encoding='bigm', bigM=bigM)
         return M
 
     def _debug(self, M):    # pragma: no cover
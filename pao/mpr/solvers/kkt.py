@@ -0,0 +1,180 @@
+#
+# Utilities for creating the KKT conditions of linear lower-level
+# problems in Pyomo models, using the sparse arrays that define the
+# lower-level problems.
+#
+# These functions are used to create the KKT reformulations in the
+# pao.mpr.FA and pao.mpr.REG solvers and in the pao.pyomo.linear_mpec
+# transformation.
+#
+import numpy as np
+import scipy.sparse
+import pyomo.environ as pe
+from pyomo.core.expr.numeric_expr import LinearExpression
+from pyomo.core.expr.relational_expr import InequalityExpression
+from pyomo.mpec import Complementarity, complements
+
+
+def stationarity_matrix(*matrices):
+    """
+    Stack sparse matrices whose rows correspond to dual variables and
+    whose columns correspond to primal variables, and return a CSC matrix
+    whose columns define the stationarity conditions.
+    """
+    G = scipy.sparse.vstack(matrices, format='csc')
+    G.sum_duplicates()
+    return G
+
+
+def add_stationarity(block, name, G, duals, d=None, terms=None, start=0):
+    """
+    Add the stationarity conditions
+
+        d + G' y = 0
+
+    to the block, where G is a sparse matrix with a row for each dual
+    variable in y and a column for each primal variable.  This creates a
+    constraint named **name** that is indexed from **start**, and each
+    constraint is created from a column of G.
+
+    Args
+    ----
+    block
+        The Pyomo block where the constraint is added.
+    name : str
+        The name of the constraint.
+    G
+        A sparse matrix.  This is converted to a CSC matrix.
+    duals
+        A list of the Pyomo variables for the rows of G.
+    d
+        A list or numpy array with the constant terms in the constraints.
+        If this is None, then the constant terms are zero.
+    terms
+        A list with a list of Pyomo expressions for each column of G,
+        which are added to the constraint.  This is used for terms whose
+        coefficients are not numeric.
+    start : int
+        The first index of the constraint.
+
+    Returns
+    -------
+    The Pyomo constraint.
+
+    Raises
+    ------
+    IOError
+        If a constraint does not contain a variable.
+    """
+    G = scipy.sparse.csc_matrix(G)
+    indptr = G.indptr
+    duals = np.array(duals, dtype=object)
+
+    def rule(B, j):
+        j -= start
+        first, last = indptr[j], indptr[j+1]
+        if first == last and (terms is None or len(terms[j]) == 0):
+            # TODO: Annotate the model as unbounded
+            raise IOError("Unbounded variable without side constraints")
+        e = LinearExpression(constant=0 if d is None else float(d[j]),
+                             linear_coefs=G.data[first:last].tolist(),
+                             linear_vars=duals[G.indices[first:last]].tolist())
+        if terms is not None:
+            for t in terms[j]:
+                e = e + t
+        return e == 0
+
+    con = pe.Constraint(range(start, start+G.shape[1]), rule=rule)
+    setattr(block, name, con)
+    return con
+
+
+def _slack(expr):
+    """
+    Return an expression that is nonnegative when the inequality
+    is satisfied.
+    """
+    if type(expr) is not InequalityExpression:
+        raise ValueError("Complementarity conditions must be defined with inequalities: %s" % str(expr))
+    lhs, rhs = expr.args
+    return rhs - lhs
+
+
+def add_complementarity(block, name, conditions, duals, start=0, encoding=None, bigM=None, rho=None):
+    """
+    Add the complementarity conditions
+
+        g_i(x) >= 0  _|_  y_i >= 0
+
+    to the block, where the inequalities g_i(x) >= 0 are given by
+    **conditions** and the variables y_i are given by **duals**.  The
+    components are indexed from **start**.
+
+    If **encoding** is None, then a Complementarity component named
+    **name** is created.  Otherwise, the inequalities g_i(x) >= 0 and
+    y_i >= 0 are created with a constraint named **name**, along with
+    an encoding of the complementarity conditions:
+
+    * 'bigm' - A binary variable z_i is created in a variable named
+      **name** + '_z', and the constraints g_i(x) <= bigM*z_i and
+      y_i <= bigM*(1-z_i) are added.
+
+    * 'regularized' - The constraint g_i(x)*y_i <= rho is added.
+
+    Args
+    ----
+    block
+        The Pyomo block where the components are added.
+    name : str
+        The name of the component.
+    conditions
+        A list of Pyomo inequalities.
+    duals
+        A list of Pyomo variables.
+    start : int
+        The first index of the components.
+    encoding : str
+        The encoding of the complementarity conditions (None, 'bigm' or
+        'regularized').
+    bigM : float
+        The big-M value used with the 'bigm' encoding.
+    rho : float
+        The tolerance used with the 'regularized' encoding.
+
+    Returns
+    -------
+    The Pyomo component named **name**.
+    """
+    assert (encoding in [None, 'bigm', 'regularized']), "Unknown complementarity encoding: %s" % str(encoding)
+    assert (len(conditions) == len(duals)), "The number of conditions and dual variables differ"
+    index = range(start, start+len(duals))
+    if encoding is None:
+        comp = Complementarity(index, rule=lambda B, i: complements(conditions[i-start], duals[i-start] >= 0))
+        setattr(block, name, comp)
+        return comp
+
+    slacks = [_slack(expr) for expr in conditions]
+    if encoding == 'bigm':
+        assert (bigM is not None), "The 'bigm' encoding requires a big-M value"
+        z = pe.Var(index, within=pe.Binary)
+        setattr(block, name+'_z', z)
+        def rule(B, i, k):
+            if k == 'primal':
+                return slacks[i-start] >= 0
+            elif k == 'dual':
+                return duals[i-start] >= 0
+            elif k == 'primal_bigm':
+                return slacks[i-start] - bigM*z[i] <= 0
+            return duals[i-start] + bigM*z[i] <= bigM
+        con = pe.Constraint(index, ['primal', 'dual', 'primal_bigm', 'dual_bigm'], rule=rule)
+    else:
+        assert (rho is not None), "The 'regularized' encoding requires a value for rho"
+        def rule(B, i, k):
+            if k == 'primal':
+                return slacks[i-start] >= 0
+            elif k == 'dual':
+                return duals[i-start] >= 0
+            return slacks[i-start]*duals[i-start] <= rho
+        con = pe.Constraint(index, ['primal', 'dual', 'product'], rule=rule)
+    setattr(block, name, con)
+    return con
@@ -10,18 +10,21 @@
 import os
 import sys
 import time
+import tempfile
+import concurrent.futures
 import numpy as np
 import pyutilib
 import pyomo.environ as pe
 import pyomo.opt
 from pyomo.common.config import ConfigBlock, ConfigValue
+from pyomo.common.deprecation import deprecated
 #from pyomo.mpec import ComplementarityList, complements
 
 import pao.common
 from ..solver import Solver, LinearMultilevelSolverBase, LinearMultilevelResults
 from ..repn import LinearMultilevelProblem
 from ..convert_repn import convert_to_standard_form
-from . import pyomo_util
+from .mps import write_mps
 #from .reg import create_model_replacing_LL_with_kkt
 
 
@@ -42,6 +45,10 @@ class LinearMultilevelSolver_MIBS(LinearMultilevelSolverBase):
         default=None,
         description="The parameter file used to configure MibS.  (default is None)"
         ))
+    config.declare('tempdir', ConfigValue(
+        default=None,
+        description="The directory where a scratch directory is created for each solve.  For example, '/dev/shm' can be used for a memory-backed directory.  (default is None, which uses the system temporary directory)"
+        ))
 
     def __init__(self, **kwds):
         super().__init__(name='pao.mpr.MIBS')
@@ -72,33 +79,69 @@ class LinearMultilevelSolver_MIBS(LinearMultilevelSolverBase):
         # Start clock
         #
         start_time = time.time()
+        timer = pao.common.PhaseTimer(self.config.timing_callback)
 
-        self.standard_form, soln_manager = convert_to_standard_form(model, inequalities=True)
+        with timer('convert_to_standard_form'):
+            self.standard_form, soln_manager = convert_to_standard_form(model, inequalities=True)
 
         #
-        # Write the MPS file and MIBS auxilliary file
-        #
-        # TODO - Make these temporary files
+        # Write the MPS file and MIBS auxilliary file in a scratch
+        # directory, so concurrent solves do not collide
         #
-        M = self.create_mibs_model(model, "mibs.mps", "mibs.aux")
+        with tempfile.TemporaryDirectory(prefix='pao_mibs_', dir=self.config['tempdir']) as tmpdir:
+            mps_filename = os.path.join(tmpdir, "mibs.mps")
+            aux_filename = os.path.join(tmpdir, "mibs.aux")
+            with timer('create_model'):
+                self.write_mibs_files(model, mps_filename, aux_filename)
 
-        cmd = [ self.config['executable'], '-Alps_instance', 'mibs.mps', '-MibS_auxiliaryInfoFile', 'mibs.aux']
-        if self.config['param_file'] is not None:
-            cmd.append('-param')
-            cmd.append('mibs.par')
+            cmd = [ self.config['executable'], '-Alps_instance', mps_filename, '-MibS_auxiliaryInfoFile', aux_filename]
+            if self.config['param_file'] is not None:
+                cmd.append('-param')
+                cmd.append(self.config['param_file'])
 
-        ans = pao.common.run_shellcmd(cmd, tee=self.config['tee'])
-        os.remove("mibs.mps")
-        os.remove("mibs.aux")
+            with timer('solve'):
+                ans = pao.common.run_shellcmd(cmd, tee=self.config['tee'])
         #print("RC", ans.rc)
         #print("LOG", ans.log)
 
-        results = self._initialize_results(ans, model)
+        with timer('load_solution'):
+            results = self._initialize_results(ans, model)
         results.check_optimal_termination()
 
+        results.timing = timer.timing
         results.solver.wallclock_time = time.time() - start_time
         return results
 
+    def solve_batch(self, models, workers=None, **options):
+        """
+        Solve a list of models concurrently.
+
+        Each model is solved with a separate MibS process and a separate
+        scratch directory.  The solver options are applied to every solve.
+
+        Parameters
+        ----------
+        models
+            The list of LinearMultilevelProblem objects that are solved.
+        workers
+            The maximum number of concurrent MibS processes.  (default is None,
+            which uses the default of concurrent.futures.ThreadPoolExecutor)
+        options
+            Keyword options that are used to configure the solver.
+
+        Returns
+        -------
+        A list of Results objects, in the order of the models.
+        """
+        def solve(model):
+            opt = self.__class__()
+            opt.config = self.config()
+            return opt.solve(model, **options)
+
+        # The work is done by MibS subprocesses, so threads are sufficient
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(solve, models))
+
     def _initialize_results(self, ans, M):
         #
         # Default value is zero
@@ -167,50 +210,24 @@ class LinearMultilevelSolver_MIBS(LinearMultilevelSolverBase):
 
 
 
+    @deprecated("create_mibs_model() has been renamed write_mibs_files(), "
+                "and it no longer creates a Pyomo model.", version='TBD')
     def create_mibs_model(self, repn, mps_filename, aux_filename):
         """
-        TODO - Document this transformation
+        Write the MibS input files.  This function returns None.
+        """
+        self.write_mibs_files(repn, mps_filename, aux_filename)
+
+    def write_mibs_files(self, repn, mps_filename, aux_filename):
+        """
+        Write the MPS file and the MibS auxiliary file for the bilevel
+        problem.  The MPS file is written directly from the sparse matrices
+        in the problem, so no Pyomo model is created.
         """
         U = repn.U
         L = repn.U.LL[0]
 
-        #---------------------------------------------------
-        # Create Pyomo model
-        #---------------------------------------------------
-
-        M = pe.ConcreteModel()
-        M.U = pe.Block()
-        M.L = pe.Block()
-
-        # upper-level variables
-        pyomo_util.add_variables(M.U, U)
-        # lower-level variables
-        pyomo_util.add_variables(M.L, L)
-
-        # objective
-        e = pyomo_util.dot(U.c[U], U.x, num=1) + U.d
-        e += pyomo_util.dot(U.c[L], L.x, num=1)
-        M.o = pe.Objective(expr=e)
-
-        # upper-level constraints
-        pyomo_util.add_linear_constraints(M.U, U.A, U, L, U.b, U.inequalities)
-        # lower-level constraints
-        pyomo_util.add_linear_constraints(M.L, L.A, U, L, L.b, L.inequalities)
-
-        #---------------------------------------------------
-        # Write files
-        #---------------------------------------------------
-        # TODO - get variable mapping information
-        #
-        M.write("tmp.mps")
-        #
-        # Add a space after "BOUND"
-        #
-        with open("tmp.mps", "r") as INPUT:
-            with open(mps_filename, "w") as OUTPUT:
-                for line in INPUT:
-                    OUTPUT.write(line.replace("BOUND ", "BOUND  "))
-        os.remove("tmp.mps")
+        write_mps(repn, mps_filename)
 
         with open(aux_filename, "w") as OUTPUT:
             # Num lower-level variables
@@ -219,21 +236,17 @@ class LinearMultilevelSolver_MIBS(LinearMultilevelSolverBase):
             OUTPUT.write("M {}\n".format(L.b.size))
             # Indices of lower-level variables
             nx_upper = len(U.x)
-            for i in range(len(L.x)):
-                OUTPUT.write("LC {}\n".format(i+nx_upper))
+            OUTPUT.writelines("LC {}\n".format(i+nx_upper) for i in range(len(L.x)))
             # Indices of lower-level constraints
             nc_upper = U.b.size
-            for i in range(L.b.size):
-                OUTPUT.write("LR {}\n".format(i+nc_upper))
+            OUTPUT.writelines("LR {}\n".format(i+nc_upper) for i in range(L.b.size))
             # Coefficients for lower-level objective
-            for i in range(len(L.x)):
-                OUTPUT.write("LO {}\n".format(L.c[L][i]))
+            c = np.zeros(len(L.x)) if L.c[L] is None else L.c[L]
+            OUTPUT.writelines("LO {}\n".format(v) for v in c)
             # Lower-level objective sense
             if L.minimize:
                 OUTPUT.write("OS 1\n")
             else:
                 OUTPUT.write("OS -1\n")
 
-        return M
-
 pao.common.SolverAPI._generate_solve_docstring(LinearMultilevelSolver_MIBS)
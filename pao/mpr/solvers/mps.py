@@ -0,0 +1,118 @@
+#
+# Utilities for writing a LinearMultilevelProblem in free MPS format
+# directly from the sparse matrices in the problem representation.
+#
+import numpy as np
+import scipy.sparse
+
+
+def _num(v):
+    return repr(float(v))
+
+
+def _stacked_matrix(levels, nrows):
+    #
+    # Stack the constraint matrices of all levels, where the
+    # columns are ordered by level and the rows are ordered by level
+    #
+    blocks = []
+    for X in levels:
+        row = []
+        for Y in levels:
+            A = X.A[Y]
+            if A is None:
+                A = scipy.sparse.coo_matrix((nrows[X.id], len(Y.x)))
+            else:
+                A = A.tocoo()
+                A = scipy.sparse.coo_matrix((A.data, (A.row, A.col)), shape=(nrows[X.id], len(Y.x)))
+            row.append(A)
+        blocks.append(row)
+    return scipy.sparse.bmat(blocks, format='csc')
+
+
+def write_mps(repn, filename, name='unknown'):
+    """
+    Write the linear multilevel problem to a free MPS file.
+
+    The objective is the objective of the upper level.  The columns are
+    named C<j> and the rows are named R<i>, where the variables and
+    constraints are numbered in the order of the levels in the problem.
+    Constraints with no nonzero coefficients are also written, so the
+    row numbering matches the constraint numbering in each level.
+    """
+    U = repn.U
+    levels = list(repn.levels())
+    nrows = {X.id: 0 if X.b is None else X.b.size for X in levels}
+    ncols = sum(len(X.x) for X in levels)
+    A = _stacked_matrix(levels, nrows)
+    A.sort_indices()
+
+    c = np.zeros(ncols)
+    lb = np.empty(ncols)
+    ub = np.empty(ncols)
+    integer = np.zeros(ncols, dtype=bool)
+    binary = np.zeros(ncols, dtype=bool)
+    offset = 0
+    for X in levels:
+        nx = len(X.x)
+        if U.c[X] is not None:
+            c[offset:offset+nx] = U.c[X]
+        lb[offset:offset+nx] = X.x.lower_bounds
+        ub[offset:offset+nx] = X.x.upper_bounds
+        integer[offset+X.x.nxR:offset+X.x.nxR+X.x.nxZ] = True
+        binary[offset+X.x.nxR+X.x.nxZ:offset+nx] = True
+        offset += nx
+    rowtype = np.concatenate([np.full(nrows[X.id], 'L' if X.inequalities else 'E') for X in levels])
+    rhs = np.concatenate([np.zeros(0) if X.b is None else X.b for X in levels])
+
+    with open(filename, "w") as OUTPUT:
+        OUTPUT.write("NAME {}\n".format(name))
+        OUTPUT.write("OBJSENSE\n")
+        OUTPUT.write(" MIN\n" if U.minimize else " MAX\n")
+        #
+        # ROWS
+        #
+        OUTPUT.write("ROWS\n")
+        OUTPUT.write(" N  OBJ\n")
+        OUTPUT.writelines(" {}  R{}\n".format(t, i) for i,t in enumerate(rowtype))
+        #
+        # COLUMNS
+        #
+        OUTPUT.write("COLUMNS\n")
+        intorg = False
+        for j in range(ncols):
+            if integer[j] != intorg:
+                OUTPUT.write("    MARKER 'MARKER' {}\n".format("'INTORG'" if integer[j] else "'INTEND'"))
+                intorg = integer[j]
+            if c[j] != 0:
+                OUTPUT.write("     C{} OBJ {}\n".format(j, _num(c[j])))
+            start, stop = A.indptr[j], A.indptr[j+1]
+            OUTPUT.writelines("     C{} R{} {}\n".format(j, i, _num(v)) for i,v in zip(A.indices[start:stop], A.data[start:stop]))
+        if intorg:
+            OUTPUT.write("    MARKER 'MARKER' 'INTEND'\n")
+        #
+        # RHS
+        #
+        OUTPUT.write("RHS\n")
+        if U.d != 0:
+            OUTPUT.write("     RHS OBJ {}\n".format(_num(-U.d)))
+        OUTPUT.writelines("     RHS R{} {}\n".format(i, _num(v)) for i,v in enumerate(rhs) if v != 0)
+        #
+        # BOUNDS
+        #
+        OUTPUT.write("BOUNDS\n")
+        for j in range(ncols):
+            if binary[j]:
+                OUTPUT.write(" BV BOUND  C{}\n".format(j))
+            elif lb[j] == np.NINF and ub[j] == np.PINF:
+                OUTPUT.write(" FR BOUND  C{}\n".format(j))
+            else:
+                if lb[j] == np.NINF:
+                    OUTPUT.write(" MI BOUND  C{}\n".format(j))
+                else:
+                    OUTPUT.write(" LO BOUND  C{} {}\n".format(j, _num(lb[j])))
+                if ub[j] != np.PINF:
+                    OUTPUT.write(" UP BOUND  C{} {}\n".format(j, _num(ub[j])))
+                elif integer[j]:
+                    OUTPUT.write(" PL BOUND  C{}\n".format(j))
+        OUTPUT.write("ENDATA\n")
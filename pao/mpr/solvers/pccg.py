@@ -71,6 +71,11 @@ class LinearMultilevelSolver_PCCG(LinearMultilevelSolverBase):
         domain=int,
         description="Maximum number of iterations. (default is None)"
         ))
+    config.declare('warmstart', ConfigValue(
+        default=False,
+        domain=bool,
+        description="If True, then the subproblems are warm-started with the solution from the previous iteration. (default is False)"
+        ))
     config.declare('quiet', ConfigValue(
         default=True,
         domain=bool,
@@ -104,16 +109,18 @@ class LinearMultilevelSolver_PCCG(LinearMultilevelSolverBase):
         # Start clock
         #
         start_time = time.time()
+        timer = pao.common.PhaseTimer(self.config.timing_callback)
 
         # PCCG requires a standard form with inequalities and 
         # a maximization lower-level
-        self.standard_form, soln_manager = convert_to_standard_form(mpr, inequalities=True)
-        convert_sense(self.standard_form.U.LL, minimize=False)
-        convert_binaries_to_integers(self.standard_form)
+        with timer('convert_to_standard_form'):
+            self.standard_form, soln_manager = convert_to_standard_form(mpr, inequalities=True)
+            convert_sense(self.standard_form.U.LL, minimize=False)
+            convert_binaries_to_integers(self.standard_form)
         
         results = LinearMultilevelResults(solution_manager=soln_manager)
 
-        UxR, UxZ, LxR, LxZ = execute_PCCG_solver(self.standard_form, self.config, results)
+        UxR, UxZ, LxR, LxZ = execute_PCCG_solver(self.standard_form, self.config, results, timer)
         xR = {mpr.U.id:UxR, mpr.U.LL[0].id:LxR}
         xZ = {mpr.U.id:UxZ, mpr.U.LL[0].id:LxZ}
 
@@ -131,8 +138,10 @@ class LinearMultilevelSolver_PCCG(LinearMultilevelSolverBase):
             for i in LxZ:
                 print(i, LxZ[i].value)
 
-        results.copy_solution(From=Munch(LxR=xR, LxZ=xZ), To=mpr)
+        with timer('load_solution'):
+            results.copy_solution(From=Munch(LxR=xR, LxZ=xZ), To=mpr)
 
+        results.timing = timer.timing
         results.solver.wallclock_time = time.time() - start_time
         return results
 
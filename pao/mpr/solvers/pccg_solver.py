@@ -11,10 +11,14 @@ This algorithm seeks to solve the following bilevel MILP:
      (xl0,yl0) in argmax {wR*xl+wZ*yl: PR*xl+PZ*yl<=s-QR*xu-QZ*yu}
 '''
 import time
+import pao.common
 
 from pyomo.environ import *
 from pyomo.gdp import *
 from pyomo.mpec import *
+from pyomo.common.collections import ComponentSet
+from pyomo.core.expr.current import identify_mutable_parameters
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
 
 from . import pyomo_util
 
@@ -23,11 +27,33 @@ infinity = float('inf')
 
 offset=0
 
-def mat2dict(m, start, stop):
+def mat2rows(m, start, stop, nrows, transpose=False):
+    """
+    Return a list with the nonzero (index, value) terms in each row of
+    m[:, start:stop].  If transpose is True, then return the terms in each
+    column of m[:, start:stop] (and nrows is the number of columns).
+    """
+    rows = [[] for i in range(nrows)]
     if m is None:
-        return {}
-    cx = m.tocoo()    
-    return {(i+offset,j+offset-start):float(v) for i,j,v in zip(cx.row, cx.col, cx.data) if j>=start and j<stop}
+        return rows
+    cx = m.tocoo()
+    mask = (cx.col >= start) & (cx.col < stop)
+    row = cx.row[mask]
+    col = cx.col[mask] - start
+    if transpose:
+        row, col = col, row
+    for i,j,v in zip(row.tolist(), (col+offset).tolist(), cx.data[mask].tolist()):
+        rows[i].append((j,v))
+    return rows
+
+def dot(terms, x, k=None):
+    """
+    The sum of the (index, value) terms multiplied by the variables or
+    parameters x.  If k is not None, then x is indexed by (index, k).
+    """
+    if k is None:
+        return sum(v*x[j] for j,v in terms)
+    return sum(v*x[(j,k)] for j,v in terms)
 
 def array2dict(m, start=0, stop=None):
     if m is None:
@@ -47,7 +73,7 @@ def create_pyomo_model(mpr, M):
     x is continuous (R)
     y is discrete (Z)
 
-    coefficient vectors and matrices should be dictionaries (with tuples for matrices)
+    coefficient vectors should be dictionaries, and the nonzeros in matrices are stored by row
     variable size should be floats
     '''
     U = mpr.U
@@ -60,23 +86,24 @@ def create_pyomo_model(mpr, M):
     nR = L.x.nxR
     nZ = L.x.nxZ
 
-    AR = mat2dict(U.A[U], 0,       U.x.nxR)
-    AZ = mat2dict(U.A[U], U.x.nxR, U.x.nxR+U.x.nxZ)
-    BR = mat2dict(U.A[L], 0,       L.x.nxR)
-    BZ = mat2dict(U.A[L], L.x.nxR, L.x.nxR+U.x.nxZ)
+    AR = mat2rows(U.A[U], 0,  mR,    mU)
+    AZ = mat2rows(U.A[U], mR, mR+mZ, mU)
+    BR = mat2rows(U.A[L], 0,  nR,    mU)
+    BZ = mat2rows(U.A[L], nR, nR+nZ, mU)
     r  = array2dict(U.b)
     cR = array2dict(U.c[U], 0,       U.x.nxR)
     cZ = array2dict(U.c[U], U.x.nxR, U.x.nxR+U.x.nxZ)
     dR = array2dict(U.c[L], 0,       L.x.nxR)
-    dZ = array2dict(U.c[L], L.x.nxR, L.x.nxR+U.x.nxZ)
+    dZ = array2dict(U.c[L], L.x.nxR, L.x.nxR+L.x.nxZ)
 
-    PR = mat2dict(L.A[L], 0,       L.x.nxR)
-    PZ = mat2dict(L.A[L], L.x.nxR, L.x.nxR+U.x.nxZ)
-    QR = mat2dict(L.A[U], 0,       U.x.nxR)
-    QZ = mat2dict(L.A[U], U.x.nxR, U.x.nxR+U.x.nxZ)
+    PR = mat2rows(L.A[L], 0,  nR,    nL)
+    PZ = mat2rows(L.A[L], nR, nR+nZ, nL)
+    QR = mat2rows(L.A[U], 0,  mR,    nL)
+    QZ = mat2rows(L.A[U], mR, mR+mZ, nL)
+    PRt = mat2rows(L.A[L], 0, nR,    nR, transpose=True)
     s  = array2dict(L.b)
     wR = array2dict(L.c[L], 0,       L.x.nxR)
-    wZ = array2dict(L.c[L], L.x.nxR, L.x.nxR+U.x.nxZ)
+    wZ = array2dict(L.c[L], L.x.nxR, L.x.nxR+L.x.nxZ)
     '''
     mU number of upper level constraints
     mR number of upper level continuous variables
@@ -86,6 +113,7 @@ def create_pyomo_model(mpr, M):
     nR number of lower level continuous variables
     nZ number of lower level integer variables
 
+    Constraint matrices are lists with the nonzero (column, value) terms in each row
     AR constraint matrix for upper level problem, upper level continuous variables
     AZ constraint matrix for upper level problem, upper level integer variables
     BR constraint matrix for upper level problem, lower level continuous variables
@@ -100,6 +128,7 @@ def create_pyomo_model(mpr, M):
     PZ constraint matrix for lower level problem, lower level integer variables
     QR constraint matrix for lower level problem, upper level continuous variables
     QZ constraint matrix for lower level problem, upper level integer variables
+    PRt transpose of PR
     s  RHS vector for lower level constraint
     wR coefficient vector for the lower level objective, lower level continuous variables
     wZ coefficient vector for the lower level objective, lower level integer variables
@@ -128,14 +157,17 @@ def create_pyomo_model(mpr, M):
     Parent.wR=Param(Parent.nRset,initialize=wR,default=0,mutable=True)
     Parent.wZ=Param(Parent.nZset,initialize=wZ,default=0,mutable=True)
 
-    Parent.AR=Param(Parent.mUset,Parent.mRset,initialize=AR, default=0,mutable=True)
-    Parent.AZ=Param(Parent.mUset,Parent.mZset,initialize=AZ, default=0,mutable=True)
-    Parent.BR=Param(Parent.mUset,Parent.nRset,initialize=BR, default=0,mutable=True)
-    Parent.BZ=Param(Parent.mUset,Parent.nZset,initialize=BZ, default=0,mutable=True)
-    Parent.PR=Param(Parent.nLset,Parent.nRset,initialize=PR, default=0,mutable=True)
-    Parent.PZ=Param(Parent.nLset,Parent.nZset,initialize=PZ, default=0,mutable=True)
-    Parent.QR=Param(Parent.nLset,Parent.mRset,initialize=QR, default=0,mutable=True)
-    Parent.QZ=Param(Parent.nLset,Parent.mZset,initialize=QZ, default=0,mutable=True)
+    #The constraint matrices are only used to generate expressions, so they are
+    #stored as python lists with the nonzeros in each row
+    Parent.AR=AR
+    Parent.AZ=AZ
+    Parent.BR=BR
+    Parent.BZ=BZ
+    Parent.PR=PR
+    Parent.PZ=PZ
+    Parent.QR=QR
+    Parent.QZ=QZ
+    Parent.PRt=PRt
 
     Parent.zero=Param(initialize=0, mutable=True) 
 
@@ -192,18 +224,18 @@ def create_pyomo_model(mpr, M):
     Parent.Master.Theta_star=Objective(rule=Master_obj,sense=minimize)
         
     def Master_c1(Master,i):
-        value=(sum(Parent.AR[(i,j)]*Parent.Master.xu[j] for j in Parent.mRset)+
-               sum(Parent.AZ[(i,j)]*Parent.Master.yu[j] for j in Parent.mZset)+
-               sum(Parent.BR[(i,j)]*Parent.Master.xl0[j] for j in Parent.nRset)+
-               sum(Parent.BZ[(i,j)]*Parent.Master.yl0[j] for j in Parent.nZset))
+        value=(dot(Parent.AR[i], Parent.Master.xu)+
+               dot(Parent.AZ[i], Parent.Master.yu)+
+               dot(Parent.BR[i], Parent.Master.xl0)+
+               dot(Parent.BZ[i], Parent.Master.yl0))
         return value - Parent.r[i] <= Parent.zero
     Parent.Master.c1=Constraint(Parent.mUset,rule=Master_c1) #(12)
 
     def Master_c2(Master,i):
-        value=(sum(Parent.QR[(i,j)]*Parent.Master.xu[j] for j in Parent.mRset)+
-               sum(Parent.QZ[(i,j)]*Parent.Master.yu[j] for j in Parent.mZset)+
-               sum(Parent.PR[(i,j)]*Parent.Master.xl0[j] for j in Parent.nRset)+
-               sum(Parent.PZ[(i,j)]*Parent.Master.yl0[j] for j in Parent.nZset))
+        value=(dot(Parent.QR[i], Parent.Master.xu)+
+               dot(Parent.QZ[i], Parent.Master.yu)+
+               dot(Parent.PR[i], Parent.Master.xl0)+
+               dot(Parent.PZ[i], Parent.Master.yl0))
         return value - Parent.s[i] <= Parent.zero
     Parent.Master.c2=Constraint(Parent.nLset,rule=Master_c2) #(13)
 
@@ -216,31 +248,31 @@ def create_pyomo_model(mpr, M):
 
 
     def Master_c4(Master,i):
-        value=(sum(Parent.PR[(i,j)]*Parent.Master.xltilde[j] for j in Parent.nRset)+
-               sum(Parent.PZ[(i,j)]*Parent.Master.yl0[j] for j in Parent.nZset)+
-               sum(Parent.QZ[(i,j)]*Parent.Master.yu[j] for j in Parent.mZset)+
-               sum(Parent.QR[(i,j)]*Parent.Master.xu[j] for j in Parent.mRset))
+        value=(dot(Parent.PR[i], Parent.Master.xltilde)+
+               dot(Parent.PZ[i], Parent.Master.yl0)+
+               dot(Parent.QZ[i], Parent.Master.yu)+
+               dot(Parent.QR[i], Parent.Master.xu))
         return value - Parent.s[i] <= Parent.zero
     Parent.Master.c4=Constraint(Parent.nLset,rule=Master_c4) #(75a)
 
     def Master_c5(Master,j):
-        PRpi=sum(Parent.PR[(i,j)]*Parent.Master.pitilde[i] for i in Parent.nLset)
+        PRpi=dot(Parent.PRt[j], Parent.Master.pitilde)
         return PRpi - Parent.wR[j] >= Parent.zero
     Parent.Master.c5=Constraint(Parent.nRset, rule=Master_c5) #(75b)
 
 
     Parent.Master.CompBlock=Block()
     Parent.Master.CompBlock.c6=ComplementarityList(rule=(complements(Parent.Master.xltilde[j] >= 0,
-                                                           sum(Parent.PR[(i,j)]*Parent.Master.pitilde[i] for i in Parent.nLset)-
+                                                           dot(Parent.PRt[j], Parent.Master.pitilde)-
                                                            Parent.wR[j] >=0) for j in Parent.nRset))
     #(76a)
 
     #(76b)
     Parent.Master.CompBlock.c7=ComplementarityList(rule=(complements(Parent.Master.pitilde[j] >= 0,
-                                                           (Parent.s[j]-sum(Parent.QR[(j,i)]*Parent.Master.xu[i] for i in Parent.mRset) -
-                                                           sum(Parent.QZ[(j,i)]*Parent.Master.yu[i] for i in Parent.mZset)-
-                                                           sum(Parent.PR[(j,i)]*Parent.Master.xltilde[i] for i in Parent.nRset)-
-                                                           sum(Parent.PZ[(j,i)]*Parent.Master.yl0[i] for i in Parent.nZset))>=0) for j in Parent.nLset))
+                                                           (Parent.s[j]-dot(Parent.QR[j], Parent.Master.xu) -
+                                                           dot(Parent.QZ[j], Parent.Master.yu)-
+                                                           dot(Parent.PR[j], Parent.Master.xltilde)-
+                                                           dot(Parent.PZ[j], Parent.Master.yl0))>=0) for j in Parent.nLset))
 
     #TransformationFactory('mpec.simple_disjunction').apply_to(Parent.Master.CompBlock) #To get the complementarity not in disjunction
 
@@ -278,10 +310,10 @@ def create_pyomo_model(mpr, M):
         return value
 
     def sub1_c1(sub1,i):
-        value=(sum(Parent.PR[(i,j)]*Parent.sub1.xl[j] for j in Parent.nRset)+
-               sum(Parent.PZ[(i,j)]*Parent.sub1.yl[j] for j in Parent.nZset)+
-               sum(Parent.QR[(i,j)]*Parent.xu_star[j] for j in Parent.mRset)+
-               sum(Parent.QZ[(i,j)]*Parent.yu_star[j] for j in Parent.mZset))
+        value=(dot(Parent.PR[i], Parent.sub1.xl)+
+               dot(Parent.PZ[i], Parent.sub1.yl)+
+               dot(Parent.QR[i], Parent.xu_star)+
+               dot(Parent.QZ[i], Parent.yu_star))
         return Parent.zero <= Parent.s[i] -value
 
 
@@ -305,17 +337,17 @@ def create_pyomo_model(mpr, M):
         return value
 
     def sub2_c1(sub2,i):
-        value=(sum(Parent.PR[(i,j)]*Parent.sub2.xl[j] for j in Parent.nRset)+
-               sum(Parent.PZ[(i,j)]*Parent.sub2.yl[j] for j in Parent.nZset)+
-               sum(Parent.QR[(i,j)]*Parent.xu_star[j] for j in Parent.mRset)+
-               sum(Parent.QZ[(i,j)]*Parent.yu_star[j] for j in Parent.mZset))
+        value=(dot(Parent.PR[i], Parent.sub2.xl)+
+               dot(Parent.PZ[i], Parent.sub2.yl)+
+               dot(Parent.QR[i], Parent.xu_star)+
+               dot(Parent.QZ[i], Parent.yu_star))
         return Parent.zero <= Parent.s[i] -value
 
     def sub2_c2(sub2,i):
-        value=(sum(Parent.BR[(i,j)]*Parent.sub2.xl[j] for j in Parent.nRset)+
-               sum(Parent.BZ[(i,j)]*Parent.sub2.yl[j] for j in Parent.nZset)+
-               sum(Parent.AR[(i,j)]*Parent.xu_star[j] for j in Parent.mRset)+
-               sum(Parent.AZ[(i,j)]*Parent.yu_star[j] for j in Parent.mZset))                                                                        
+        value=(dot(Parent.BR[i], Parent.sub2.xl)+
+               dot(Parent.BZ[i], Parent.sub2.yl)+
+               dot(Parent.AR[i], Parent.xu_star)+
+               dot(Parent.AZ[i], Parent.yu_star))
         return Parent.zero <= Parent.r[i] - value
 
     def sub2_c3(sub2):
@@ -339,88 +371,182 @@ def create_pyomo_model(mpr, M):
 
 
 def Master_add(Parent, k, epsilon): #function for adding constraints on each iteration
+    Master = Parent.Master
+
+    #s - QR*xu - QZ*yu - PZ*Y[k], which is shared by (79), (85), (82b) and (82d)
+    rhs = {i: (Parent.s[i]-
+               dot(Parent.QR[i], Master.xu)-
+               dot(Parent.QZ[i], Master.yu)-
+               dot(Parent.PZ[i], Master.Y, k)) for i in Parent.nLset}
+    #PR*x[k]
+    PRx = {i: dot(Parent.PR[i], Master.x, k) for i in Parent.nLset}
+
     #(79)
-    
-    Parent.Master.CompBlock2[k].c_comp=ComplementarityList()
+    Master.CompBlock2[k].c_comp=ComplementarityList()
     for i in Parent.nLset:
-        r_value= (sum(Parent.PR[(i,j)]*Parent.Master.x[(j,k)] for j in Parent.nRset)-
-                  Parent.Master.t[(i,k)])
-        l_value= (Parent.s[i]-
-                  sum(Parent.QR[(i,j)]*Parent.Master.xu[j] for j in Parent.mRset)-
-                  sum(Parent.QZ[(i,j)]*Parent.Master.yu[j] for j in Parent.mZset)-
-                  sum(Parent.PZ[(i,j)]*Parent.Master.Y[(j,k)] for j in Parent.nZset)) 
-    
-        Parent.Master.c_col.add(l_value-r_value >= Parent.zero)
+        r_value= PRx[i] - Master.t[(i,k)]
+        Master.c_col.add(rhs[i]-r_value >= Parent.zero)
     
     for i in Parent.nRset:  
-        Parent.Master.c_col.add(sum(Parent.PR[(j,i)]*Parent.Master.lam[(j,k)] for j in Parent.nLset)>=Parent.zero)
-        Parent.Master.CompBlock2[k].c_comp.add(complements(Parent.Master.x[(i,k)]>=0, 
-                                                             sum(Parent.PR[(j,i)]*Parent.Master.lam[(j,k)] for j in Parent.nLset)>=0)) #(83)  
+        if len(Parent.PRt[i]) == 0:
+            # PR*lam is zero, so (83) is trivially satisfied
+            continue
+        PRlam = dot(Parent.PRt[i], Master.lam, k)
+        Master.c_col.add(PRlam>=Parent.zero)
+        Master.CompBlock2[k].c_comp.add(complements(Master.x[(i,k)]>=0, PRlam>=0)) #(83)  
     
     for i in Parent.nLset:
-        Parent.Master.c_col.add(1-Parent.Master.lam[(i,k)]>=Parent.zero)
-        Parent.Master.CompBlock2[k].c_comp.add(complements(1-Parent.Master.lam[(i,k)]>=0,Parent.Master.t[(i,k)]>=0)) #(84)
+        Master.c_col.add(1-Master.lam[(i,k)]>=Parent.zero)
+        Master.CompBlock2[k].c_comp.add(complements(1-Master.lam[(i,k)]>=0,Master.t[(i,k)]>=0)) #(84)
     
     for i in Parent.nLset:
-        Parent.Master.CompBlock2[k].c_comp.add(complements(Parent.Master.lam[(i,k)]>=0,(Parent.s[i]-
-                                                     sum(Parent.QR[(i,j)]*Parent.Master.xu[j] for j in Parent.mRset)-
-                                                     sum(Parent.QZ[(i,j)]*Parent.Master.yu[j] for j in Parent.mZset)-
-                                                     sum(Parent.PZ[(i,j)]*Parent.Master.Y[(j,k)] for j in Parent.nZset)-
-                                                     sum(Parent.PR[(i,j)]*Parent.Master.x[(j,k)] for j in Parent.nRset)+
-                                                     Parent.Master.t[(i,k)]>=0))) #(85)
-    
-    
-    
-    #TransformationFactory('mpec.simple_disjunction').apply_to(Parent.Master.CompBlock2[k]) #To get the complementarity not in disjunction
+        Master.CompBlock2[k].c_comp.add(complements(Master.lam[(i,k)]>=0,
+                                                    rhs[i]-PRx[i]+Master.t[(i,k)]>=0)) #(85)
     
     #(82) Disjunction
-    Parent.Master.DisjunctionBlock[k].LH=Disjunct()
-    Parent.Master.DisjunctionBlock[k].BLOCK=Disjunct()
-    
+    Master.DisjunctionBlock[k].LH=Disjunct()
+    Master.DisjunctionBlock[k].BLOCK=Disjunct()
     
+    Master.DisjunctionBlock[k].LH.cons=Constraint(expr= sum(Master.t[(j,k)] for j in Parent.nLset) >= epsilon) 
     
-    Parent.Master.DisjunctionBlock[k].LH.cons=Constraint(expr= sum(Parent.Master.t[(j,k)] for j in Parent.nLset) >= epsilon) 
+    Master.DisjunctionBlock[k].BLOCK.cons=ConstraintList()
     
-    Parent.Master.DisjunctionBlock[k].BLOCK.cons=ConstraintList()
-    
-    l_value = (sum(Parent.wR[j]*Parent.Master.xl0[j] for j in Parent.nRset)+
-               sum(Parent.wZ[j]*Parent.Master.yl0[j] for j in Parent.nZset))
-    r_value = (sum(Parent.wR[j]*Parent.Master.x[(j,k)] for j in Parent.nRset)+
-               sum(Parent.wZ[j]*Parent.Master.Y[(j,k)] for j in Parent.nZset))
-    Parent.Master.DisjunctionBlock[k].BLOCK.cons.add(l_value - r_value >= 0)  #(82a) 
+    l_value = (sum(Parent.wR[j]*Master.xl0[j] for j in Parent.nRset)+
+               sum(Parent.wZ[j]*Master.yl0[j] for j in Parent.nZset))
+    r_value = (sum(Parent.wR[j]*Master.x[(j,k)] for j in Parent.nRset)+
+               sum(Parent.wZ[j]*Master.Y[(j,k)] for j in Parent.nZset))
+    Master.DisjunctionBlock[k].BLOCK.cons.add(l_value - r_value >= 0)  #(82a) 
     
     for i in Parent.nLset:
-        r_value = (Parent.s[i] - 
-               sum(Parent.QR[(i,j)]*Parent.Master.xu[j] for j in Parent.mRset)-
-               sum(Parent.QZ[(i,j)]*Parent.Master.yu[j] for j in Parent.mZset)-
-               sum(Parent.PZ[(i,j)]*Parent.Master.Y[(j,k)] for j in Parent.nZset))
-        l_value = sum(Parent.PR[(i,j)]*Parent.Master.x[(j,k)] for j in Parent.nRset)#(82b)
-        
-        Parent.Master.DisjunctionBlock[k].BLOCK.cons.add(r_value-l_value >= 0)
+        Master.DisjunctionBlock[k].BLOCK.cons.add(rhs[i]-PRx[i] >= 0) #(82b)
         
+    PRpi = {j: dot(Parent.PRt[j], Master.pi, k) for j in Parent.nRset}
     for j in Parent.nRset:
-        value= sum(Parent.PR[(i,j)]*Parent.Master.pi[(i,k)] for i in Parent.nLset)
-        Parent.Master.DisjunctionBlock[k].BLOCK.cons.add(value >= Parent.wR[j])#(82c1)
+        Master.DisjunctionBlock[k].BLOCK.cons.add(PRpi[j] >= Parent.wR[j])#(82c1)
     
-    Parent.Master.DisjunctionBlock[k].BLOCK.comp1=ComplementarityList(rule=(complements(Parent.Master.pi[(j,k)]>=0, 
-                                  (Parent.s[j]-
-                                   sum(Parent.QR[(j,i)]*Parent.Master.xu[i] for i in Parent.mRset)-
-                                   sum(Parent.QZ[(j,i)]*Parent.Master.yu[i] for i in Parent.mZset)-
-                                   sum(Parent.PR[(j,i)]*Parent.Master.x[(i,k)] for i in Parent.nRset)-
-                                   sum(Parent.PZ[(j,i)]*Parent.Master.Y[(i,k)] for i in Parent.nZset))>=0) for j in Parent.nLset)) #(82d)
+    Master.DisjunctionBlock[k].BLOCK.comp1=ComplementarityList(rule=(complements(Master.pi[(j,k)]>=0, 
+                                  rhs[j]-PRx[j]>=0) for j in Parent.nLset)) #(82d)
     
-    Parent.Master.DisjunctionBlock[k].BLOCK.comp2=ComplementarityList(rule=(complements(
-            Parent.Master.x[(j,k)]>=0,
-            sum(Parent.PR[(i,j)]*Parent.Master.pi[(i,k)] for i in Parent.nLset)-Parent.wR[j]>=0) for j in Parent.nRset)) #(82c2)
+    Master.DisjunctionBlock[k].BLOCK.comp2=ComplementarityList(rule=(complements(
+            Master.x[(j,k)]>=0,
+            PRpi[j]-Parent.wR[j]>=0) for j in Parent.nRset)) #(82c2)
     
-    
-    Parent.Master.DisjunctionBlock[k].c_disj=Disjunction(expr=[Parent.Master.DisjunctionBlock[k].LH, Parent.Master.DisjunctionBlock[k].BLOCK])
+    Master.DisjunctionBlock[k].c_disj=Disjunction(expr=[Master.DisjunctionBlock[k].LH, Master.DisjunctionBlock[k].BLOCK])
     
     #TransformationFactory('mpec.simple_disjunction').apply_to(
     #    Parent.Master.DisjunctionBlock[k].BLOCK) #to get the complementarity in the disjunction
     return Parent
 
 
+def transform_master(Master, targets=None):
+    """
+    Reformulate the complementarity conditions in the master problem as
+    disjunctions, and then relax the disjunctions with big-M constraints.
+
+    If targets is specified, then only these blocks are transformed.
+    Components that were transformed in previous iterations are left
+    unchanged.
+    """
+    if targets is None:
+        targets = [Master]
+    for target in targets:
+        TransformationFactory('mpec.simple_disjunction').apply_to(target)
+    TransformationFactory('gdp.bigm').apply_to(Master, targets=targets)
+
+
+class MasterSolver(object):
+    """
+    Solve the master problem.
+
+    If the solver is a Pyomo persistent solver, then the master problem
+    is loaded into the solver once, and each subsequent solve only adds
+    the variables and constraints that were created since the last solve.
+    """
+
+    def __init__(self, opt, Master):
+        self.opt = opt
+        self.Master = Master
+        self.persistent = isinstance(opt, PersistentSolver)
+        self._vars = None
+        self._cons = None
+
+    def _new_components(self, ctype, known, **kwds):
+        for obj in self.Master.component_data_objects(ctype, descend_into=(Block, Disjunct), **kwds):
+            if obj not in known:
+                known.add(obj)
+                yield obj
+
+    def solve(self):
+        if not self.persistent:
+            return self.opt.solve(self.Master)
+
+        if self._cons is None:
+            self.opt.set_instance(self.Master)
+            self._vars = ComponentSet(self.Master.component_data_objects(Var, descend_into=(Block, Disjunct)))
+            self._cons = ComponentSet(self.Master.component_data_objects(Constraint, active=True, descend_into=(Block, Disjunct)))
+        else:
+            for var in list(self._new_components(Var, self._vars)):
+                self.opt.add_var(var)
+            for con in list(self._new_components(Constraint, self._cons, active=True)):
+                self.opt.add_constraint(con)
+        return self.opt.solve()
+
+
+class SubproblemSolver(object):
+    """
+    Solve a PCCG subproblem.
+
+    Only the parameters for the upper-level values change between
+    iterations.  In warm-start mode, the variable values from the previous
+    iteration are passed to the solver as an initial solution.  If the
+    solver is a Pyomo persistent solver, then the subproblem is loaded
+    into the solver once, and each subsequent solve only updates the
+    constraints that depend on the parameters in **params**.
+    """
+
+    def __init__(self, opt, block, warmstart=False, params=()):
+        self.opt = opt
+        self.block = block
+        self.persistent = isinstance(opt, PersistentSolver)
+        self.warmstart = warmstart and getattr(opt, 'warm_start_capable', lambda: False)()
+        self._initialized = False
+        #
+        # The constraints whose coefficients change when the
+        # parameters are updated
+        #
+        params = ComponentSet(p for param in params for p in param.values())
+        self._cons = [con for con in block.component_data_objects(Constraint, active=True)
+                      if any(p in params for p in identify_mutable_parameters(con.body))]
+
+    def solve(self):
+        if not self.persistent:
+            if self.warmstart:
+                return self.opt.solve(self.block, warmstart=True)
+            return self.opt.solve(self.block)
+
+        if not self._initialized:
+            self.opt.set_instance(self.block)
+            self._initialized = True
+        else:
+            for con in self._cons:
+                self.opt.remove_constraint(con)
+                self.opt.add_constraint(con)
+        if self.warmstart:
+            return self.opt.solve(warmstart=True)
+        return self.opt.solve()
+
+
+def create_solver(solver):
+    """
+    Create a new solver object if the solver is specified by name.
+    Separate solver objects are needed for persistent solvers, which
+    are associated with a single model.
+    """
+    if isinstance(solver, str):
+        return SolverFactory(solver)
+    return solver
+
+
 def UBnew(Parent):
     return sum(Parent.cR[j]*Parent.xu_star[j] for j in Parent.cR) +\
            sum(Parent.cZ[j]*Parent.yu_star[j] for j in Parent.cZ) +\
@@ -446,8 +572,10 @@ def check_termination(LB, UB, atol, rtol, quiet):
     return 0
 
 
-def execute_PCCG_solver(mpr, config, results):
+def execute_PCCG_solver(mpr, config, results, timer=None):
     t = time.time()
+    if timer is None:
+        timer = pao.common.PhaseTimer()
 
     #These parameters can be changed for your specific problem
     epsilon = get_value(config, 'epsilon', 1e-4) #For use in disjunction approximation
@@ -457,6 +585,7 @@ def execute_PCCG_solver(mpr, config, results):
     M       = get_value(config, 'bigm', 1e6)    #upper bound on variables
     solver  = config.mip_solver                 # MIP solver to use here
     quiet   = config.quiet                      # If True, then suppress output
+    warmstart = get_value(config, 'warmstart', False) #If True, then warm-start the subproblems
 
     LB=-infinity
     UB=infinity
@@ -464,22 +593,22 @@ def execute_PCCG_solver(mpr, config, results):
      
     flag=0
 
-    Parent = create_pyomo_model(mpr, M)
-
-    bigm_xfrm = TransformationFactory('gdp.bigm')
+    with timer('create_model'):
+        Parent = create_pyomo_model(mpr, M)
 
     #Step 1: Initialization (done)
-    if isinstance(solver, str):
-        opt = SolverFactory(solver)
-    else:
-        opt = solver
+    with timer('transform_model'):
+        transform_master(Parent.Master)
+    master_opt = MasterSolver(create_solver(solver), Parent.Master)
+    params = [Parent.xu_star, Parent.yu_star, Parent.theta]
+    sub1_opt = SubproblemSolver(create_solver(solver), Parent.sub1, warmstart, params)
+    sub2_opt = SubproblemSolver(create_solver(solver), Parent.sub2, warmstart, params)
 
     #Iteration
     while k < maxit:
         #Step 2: Solve the Master Problem
-        TransformationFactory('mpec.simple_disjunction').apply_to(Parent.Master)
-        bigm_xfrm.apply_to(Parent.Master) 
-        res = opt.solve(Parent.Master)
+        with timer('master_solve'):
+            res = master_opt.solve()
         if res.solver.termination_condition !=TerminationCondition.optimal:
             raise RuntimeError("ERROR! ERROR! Master: Could not find optimal solution")
 
@@ -505,7 +634,8 @@ def execute_PCCG_solver(mpr, config, results):
         if not quiet:
             print("Step 4")
         #Step 4: Solve first subproblem
-        results1=opt.solve(Parent.sub1) 
+        with timer('subproblem_solve'):
+            results1=sub1_opt.solve()
         
         if results1.solver.termination_condition !=TerminationCondition.optimal:
             raise RuntimeError("ERROR! ERROR! Subproblem 1: Could not find optimal solution")
@@ -519,7 +649,8 @@ def execute_PCCG_solver(mpr, config, results):
         if not quiet:
             print("Step 5")
         #Step 5: Solve second subproblem
-        results2=opt.solve(Parent.sub2)
+        with timer('subproblem_solve'):
+            results2=sub2_opt.solve()
         
         if results2.solver.termination_condition==TerminationCondition.optimal: #If Optimal
             for i in Parent.xl_star:
@@ -544,7 +675,9 @@ def execute_PCCG_solver(mpr, config, results):
         k = k+1
         for i in Parent.yl_arc:  #range(nZ):
             Parent.Master.Y[(i,k)]=Parent.yl_arc[i] #Make sure yl_arc is int or else Master.Y rejects
-        Master_add(Parent, k, epsilon)
+        with timer('transform_model'):
+            Master_add(Parent, k, epsilon)
+            transform_master(Parent.Master, targets=[Parent.Master.CompBlock2[k], Parent.Master.DisjunctionBlock[k]])
 
         if not quiet:
             print(f'Iteration {k}: Step 7 Obj={LB} UB={UB}')
@@ -3,12 +3,27 @@
 # LinearMultilevelProblem objects.
 #
 import numpy as np
+import scipy.sparse
 import pyomo.environ as pe
 import pyomo.opt.results
+from pyomo.common.config import ConfigValue, In
+from pyomo.core.expr.numeric_expr import LinearExpression
 from ..repn import LinearLevelRepn, LevelValues, SimplifiedList, LevelVariable
 import pao.common.solver
 
 
+def model_builder_option():
+    """
+    Return a new ConfigValue for the 'model_builder' option of solvers
+    that create Pyomo models with add_linear_constraints().
+    """
+    return ConfigValue(
+        default='expression',
+        domain=In(['expression', 'sparse']),
+        description="The method used to create constraints in the Pyomo model.  The 'sparse' builder creates constraints directly from the rows of the sparse constraint matrices.  (default is expression)"
+        )
+
+
 def dot(A, x, num=None):
     if A is None:
         if num is not None:
@@ -90,11 +105,22 @@ def add_variables(block, level):
             i += 1
 
 
-def add_linear_constraints(block, A, U, L, b, inequalities):
+def add_linear_constraints(block, A, U, L, b, inequalities, builder='expression'):
+    """
+    Add the constraints A[U]*U.x + A[L]*L.x (<=|==) b to the block.
+
+    If builder is 'expression', then each constraint is created by
+    summing the Pyomo terms in the row.  If builder is 'sparse', then
+    each constraint is created directly from the rows of the CSR
+    constraint matrices.
+    """
     assert (b is not None), "Unexpected 'None' value for constraint RHS"
+    assert (builder in ['expression', 'sparse']), "Unknown model builder: %s" % str(builder)
     nc = b.size
     if nc == 0:
         return
+    if builder == 'sparse':
+        return _add_sparse_linear_constraints(block, A, U, L, b, inequalities)
     e = dot(A[U], U.x, num=nc) + dot(A[L], L.x, num=nc)
 
     block.c = pe.ConstraintList()
@@ -111,6 +137,41 @@ def add_linear_constraints(block, A, U, L, b, inequalities):
             block.c.add( e[i] == b[i] )
 
 
+def _add_sparse_linear_constraints(block, A, U, L, b, inequalities):
+    #
+    # Stack the matrices for the U and L variables, so each row
+    # defines a LinearExpression from a slice of the CSR arrays
+    #
+    matrices = []
+    pyvar = []
+    for X in (U, L):
+        if A[X] is not None:
+            matrices.append(A[X])
+            pyvar.append(X.x.pyvar)
+    if len(matrices) > 0:
+        M = scipy.sparse.hstack(matrices, format='csr')
+        M.sum_duplicates()
+        pyvar = np.concatenate(pyvar)
+        indptr = M.indptr
+    else:
+        indptr = np.zeros(b.size+1, dtype=np.int64)
+
+    block.c = pe.ConstraintList()
+    for i in range(b.size):
+        start, stop = indptr[i], indptr[i+1]
+        if start == stop:
+            if inequalities:
+                assert 0 <= b[i], "Trivial linear constraint violated: %f <= %f" % (0, b[i])
+            else:
+                assert 0 == b[i], "Trivial linear constraint violated: %f == %f" % (0, b[i])
+            continue
+        e = LinearExpression(constant=0, linear_coefs=M.data[start:stop].tolist(), linear_vars=pyvar[M.indices[start:stop]].tolist())
+        if inequalities:
+            block.c.add( (None, e, float(b[i])) )
+        else:
+            block.c.add( (e, float(b[i])) )
+
+
 def pyomo2pao_termination_condition(tc):
 
     if tc == pyomo.opt.results.TerminationCondition.unknown or \
@@ -4,22 +4,29 @@
 #
 import time
 import numpy as np
+import scipy.sparse
 import pyutilib
 import pyomo.environ as pe
 import pyomo.opt
 from pyomo.common.config import ConfigBlock, ConfigValue
-from pyomo.mpec import ComplementarityList, complements
 
 import pao.common
 from ..solver import Solver, LinearMultilevelSolverBase, LinearMultilevelResults
 from ..repn import LinearMultilevelProblem
 from ..convert_repn import convert_to_standard_form
 from . import pyomo_util
+from . import kkt
 
 
-def create_model_replacing_LL_with_kkt(repn):
+def create_model_replacing_LL_with_kkt(repn, builder='expression', encoding=None, bigM=None, rho=None):
     """
-    TODO - Document this transformation
+    Create a Pyomo model where the lower-level problems are replaced
+    by their KKT conditions.
+
+    The builder option specifies how the linear constraints are created
+    (see pyomo_util.add_linear_constraints).  The encoding, bigM and rho
+    options specify how the complementarity conditions are expressed
+    (see kkt.add_complementarity).
     """
     U = repn.U
     LL = repn.U.LL
@@ -51,28 +58,26 @@ def create_model_replacing_LL_with_kkt(repn):
     M.o = pe.Objective(expr=e)
 
     # upper-level constraints
-    pyomo_util.add_linear_constraints(M.U, U.A, U, L, U.b, U.inequalities)
+    pyomo_util.add_linear_constraints(M.U, U.A, U, L, U.b, U.inequalities, builder)
     for i in range(N):
         # lower-level constraints
         L = LL[i]
-        pyomo_util.add_linear_constraints(M.L[i], L.A, U, L, L.b, L.inequalities)
+        pyomo_util.add_linear_constraints(M.L[i], L.A, U, L, L.b, L.inequalities, builder)
 
     for i in range(N):
         L = LL[i]
-        # stationarity
-        M.kkt[i].stationarity = pe.ConstraintList() 
-        # L_A_L' * lam
-        L_A_L_T = L.A[L].transpose().todok()
-        X = pyomo_util.dot( L_A_L_T, M.kkt[i].lam )
+        # stationarity:  c + L_A_L' * lam - nu = 0
         if L.c[L] is not None:
-            for k in range(len(L.c[L])):
-                M.kkt[i].stationarity.add( L.c[L][k] + X[k] - M.kkt[i].nu[k] == 0 )
+            nx = len(L.x)
+            G = kkt.stationarity_matrix(L.A[L], -scipy.sparse.identity(nx))
+            duals = list(M.kkt[i].lam.values()) + list(M.kkt[i].nu.values())
+            kkt.add_stationarity(M.kkt[i], 'stationarity', G, duals, d=L.c[L])
 
     for i in range(N):
         # complementarity slackness - variables
-        M.kkt[i].slackness = ComplementarityList()
-        for j in M.kkt[i].nu:
-            M.kkt[i].slackness.add( complements( M.L[i].xR[j] >= 0, M.kkt[i].nu[j] >= 0 ) )
+        conditions = [M.L[i].xR[j] >= 0 for j in M.kkt[i].nu]
+        kkt.add_complementarity(M.kkt[i], 'slackness', conditions, list(M.kkt[i].nu.values()),
+                                encoding=encoding, bigM=bigM, rho=rho)
 
     return M
 
@@ -101,6 +106,7 @@ class LinearMultilevelSolver_REG(LinearMultilevelSolverBase):
         domain=float,
         description="The tolerance for constraints that enforce complementarity conditions.  (default is 1e-7)"
         ))
+    config.declare('model_builder', pyomo_util.model_builder_option())
 
     def __init__(self, **kwds):
         super().__init__(name='pao.mpr.REG')
@@ -141,10 +147,12 @@ class LinearMultilevelSolver_REG(LinearMultilevelSolverBase):
         # Start clock
         #
         start_time = time.time()
+        timer = pao.common.PhaseTimer(self.config.timing_callback)
 
-        self.standard_form, soln_manager = convert_to_standard_form(model, inequalities=False)
+        with timer('convert_to_standard_form'):
+            self.standard_form, soln_manager = convert_to_standard_form(model, inequalities=False)
 
-        M = self._create_pyomo_model(self.standard_form, self.config.rho)
+        M = self._create_pyomo_model(self.standard_form, self.config.rho, timer)
         #
         # Solve the Pyomo model the specified solver
         #
@@ -156,23 +164,26 @@ class LinearMultilevelSolver_REG(LinearMultilevelSolverBase):
 
         #if self.config.nlp_options is not None:
         #    opt.options.update(self.config.nlp_options)
-        pyomo_results = opt.solve(M, tee=self.config.tee, 
-                                     load_solutions=self.config.load_solutions)
+        with timer('solve'):
+            pyomo_results = opt.solve(M, tee=self.config.tee, 
+                                         load_solutions=self.config.load_solutions)
         pyomo.opt.check_optimal_termination(pyomo_results)
 
         self._initialize_results(results, pyomo_results, M)
         results.solver.rc = getattr(opt, '_rc', None)
 
-        if self.config.load_solutions:
-            # Load results from the Pyomo model to the LinearMultilevelProblem
-            results.copy_solution(From=M, To=model)
-        else:
-            # Load results from the Pyomo model to the Results
-            results.load_from(pyomo_results)
+        with timer('load_solution'):
+            if self.config.load_solutions:
+                # Load results from the Pyomo model to the LinearMultilevelProblem
+                results.copy_solution(From=M, To=model)
+            else:
+                # Load results from the Pyomo model to the Results
+                results.load_from(pyomo_results)
 
         #self._debug()
         #results.solver.log = getattr(opt, '_log', None)
 
+        results.timing = timer.timing
         results.solver.wallclock_time = time.time() - start_time
         return results
 
@@ -201,14 +212,13 @@ class LinearMultilevelSolver_REG(LinearMultilevelSolverBase):
         prob.sense = 'minimize'
         return results
 
-    def _create_pyomo_model(self, repn, rho):
-        M = create_model_replacing_LL_with_kkt(repn)
+    def _create_pyomo_model(self, repn, rho, timer):
         #
-        # Transform the problem to a MIP
+        # The complementarity conditions are expressed with nonlinear
+        # constraints that are bounded by rho
         #
-        xfrm = pe.TransformationFactory('mpec.simple_nonlinear')
-        xfrm.apply_to(M, mpec_bound=rho)
-
+        with timer('create_model'):
+            M = create_model_replacing_LL_with_kkt(repn, self.config.model_builder, encoding='regularized', rho=rho)
         return M
 
     def _debug(self):           # pragma: no cover
@@ -0,0 +1,192 @@
+#
+# Binary storage of multilevel problem representations
+#
+import json
+import struct
+import zipfile
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .repn import LinearMultilevelProblem, QuadraticMultilevelProblem, LinearLevelRepn, SparseMatrixStack
+
+_format_version = 1
+
+
+def _save_matrix(arrays, prefix, A):
+    A = csr_matrix(A, dtype=np.float64)
+    arrays[prefix+'.data'] = A.data
+    arrays[prefix+'.indices'] = A.indices
+    arrays[prefix+'.indptr'] = A.indptr
+    return list(A.shape)
+
+
+def _load_matrix(arrays, prefix, shape):
+    return csr_matrix((arrays[prefix+'.data'], arrays[prefix+'.indices'], arrays[prefix+'.indptr']), shape=tuple(shape), copy=False)
+
+
+def _problem_to_arrays(M):
+    """
+    Return a dictionary of numpy arrays that store a multilevel problem.
+    """
+    assert (type(M) in [LinearMultilevelProblem, QuadraticMultilevelProblem]), "Cannot save a problem of type %s" % str(type(M))
+    arrays = {}
+    levels = []
+    position = {L.id:n for n,L in enumerate(M.levels())}
+    for n,L in enumerate(M.levels()):
+        UL = L.UL()
+        prefix = 'L%d' % n
+        level = dict(id=L.id, parent=None if UL is None else position[UL.id], name=L.name,
+                     nxR=L.x.nxR, nxZ=L.x.nxZ, nxB=L.x.nxB,
+                     minimize=L.minimize, inequalities=L.inequalities, d=float(L.d),
+                     c=[], A={}, P=[], Q=[])
+        arrays[prefix+'.lb'] = L.x.lower_bounds
+        arrays[prefix+'.ub'] = L.x.upper_bounds
+        arrays[prefix+'.values'] = np.array([np.nan if v is None else v for v in L.x.values], dtype=np.float64)
+        arrays[prefix+'.b'] = np.asarray(L.b, dtype=np.float64)
+        for X in L.c:
+            if L.c[X] is not None:
+                level['c'].append(X)
+                arrays[prefix+'.c.%d' % X] = np.asarray(L.c[X], dtype=np.float64)
+        for X in L.A:
+            if L.A[X] is not None:
+                level['A'][X] = _save_matrix(arrays, prefix+'.A.%d' % X, L.A[X])
+        if type(M) is QuadraticMultilevelProblem:
+            for i,j in L.P:
+                if L.P[i,j] is not None:
+                    level['P'].append([i, j, _save_matrix(arrays, prefix+'.P.%d.%d' % (i,j), L.P[i,j])])
+            for i,j in L.Q:
+                Q = L.Q[i,j]
+                if Q is not None:
+                    _save_matrix(arrays, prefix+'.Q.%d.%d' % (i,j), Q.data)
+                    level['Q'].append([i, j, list(Q.shape)])
+        levels.append(level)
+    metadata = dict(format='pao.mpr', version=_format_version, type=type(M).__name__, name=M.name, levels=levels,
+                    bilinear=getattr(M, 'bilinear', False))
+    arrays['metadata'] = np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8)
+    return arrays
+
+
+def save_problem(M, filename):
+    """
+    Save a multilevel problem in a binary file.
+
+    The file is an uncompressed NumPy .npz archive.  The level tree and
+    scalar data are stored as JSON, and the bounds, variable values, c,
+    b, and the CSR arrays of the A, P and Q matrices are stored as arrays.
+
+    Args
+    ----
+    M : LinearMultilevelProblem or QuadraticMultilevelProblem
+        The multilevel problem.
+    filename : str
+        The name of the file that is created.
+    """
+    arrays = _problem_to_arrays(M)
+    with open(filename, 'wb') as OUTPUT:
+        np.savez(OUTPUT, **arrays)
+
+
+class _MemoryMappedArchive(object):
+    """
+    Access the arrays in an uncompressed .npz archive with memory maps.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with zipfile.ZipFile(filename) as zf:
+            self.members = {info.filename[:-4]:info for info in zf.infolist()}
+
+    def __getitem__(self, name):
+        info = self.members[name]
+        with open(self.filename, 'rb') as INPUT:
+            INPUT.seek(info.header_offset)
+            n, m = struct.unpack('<HH', INPUT.read(30)[26:30])
+            INPUT.seek(info.header_offset + 30 + n + m)
+            version = np.lib.format.read_magic(INPUT)
+            if version == (1,0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(INPUT)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(INPUT)
+            offset = INPUT.tell()
+            if info.compress_type != zipfile.ZIP_STORED or dtype.hasobject or np.prod(shape) == 0:
+                INPUT.seek(offset)
+                return np.fromfile(INPUT, dtype=dtype, count=int(np.prod(shape))).reshape(shape, order='F' if fortran_order else 'C')
+        return np.memmap(self.filename, dtype=dtype, mode='c', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+def load_problem(filename, mmap=False):
+    """
+    Load a multilevel problem from a file created by :func:`save_problem`.
+
+    Args
+    ----
+    filename : str
+        The name of the file.
+    mmap : bool, Default: False
+        If True, then the arrays in the problem are memory-mapped from
+        the file instead of being read into memory.  The arrays are
+        mapped copy-on-write, so changes to the problem do not modify
+        the file.
+
+    Returns
+    -------
+    LinearMultilevelProblem or QuadraticMultilevelProblem
+        The multilevel problem stored in the file.
+    """
+    if mmap:
+        arrays = _MemoryMappedArchive(filename)
+        metadata = json.loads(bytes(np.asarray(arrays['metadata'])).decode())
+    else:
+        with np.load(filename) as INPUT:
+            arrays = {name:INPUT[name] for name in INPUT.files}
+        metadata = json.loads(arrays['metadata'].tobytes().decode())
+    assert (metadata.get('format',None) == 'pao.mpr'), "File '%s' does not contain a multilevel problem" % filename
+    assert (metadata['version'] <= _format_version), "File '%s' has unknown format version %d" % (filename, metadata['version'])
+    return _problem_from_arrays(arrays, metadata)
+
+
+def _problem_from_arrays(arrays, metadata=None):
+    """
+    Create a multilevel problem from the arrays created by _problem_to_arrays().
+    """
+    if metadata is None:
+        metadata = json.loads(bytes(np.asarray(arrays['metadata'])).decode())
+    if metadata['type'] == 'QuadraticMultilevelProblem':
+        M = QuadraticMultilevelProblem(name=metadata['name'], bilinear=metadata['bilinear'])
+    else:
+        M = LinearMultilevelProblem(name=metadata['name'])
+    #
+    # Create the levels.  Parents are always stored before their children.
+    #
+    levels = []
+    for level in metadata['levels']:
+        if level['parent'] is None:
+            L = M.add_upper(nxR=level['nxR'], nxZ=level['nxZ'], nxB=level['nxB'], name=level['name'], id=level['id'])
+        else:
+            L = levels[level['parent']].add_lower(nxR=level['nxR'], nxZ=level['nxZ'], nxB=level['nxB'], name=level['name'], id=level['id'])
+        levels.append(L)
+    #
+    # Levels created later must not reuse the ids in the file
+    #
+    LinearLevelRepn._counter = max([LinearLevelRepn._counter]+[L.id+1 for L in levels])
+    #
+    # Initialize the level data
+    #
+    for n,(L,level) in enumerate(zip(levels, metadata['levels'])):
+        prefix = 'L%d' % n
+        L.x.lower_bounds = arrays[prefix+'.lb']
+        L.x.upper_bounds = arrays[prefix+'.ub']
+        L.x.values = [None if np.isnan(v) else v for v in arrays[prefix+'.values'].tolist()]
+        L.b = arrays[prefix+'.b']
+        L.minimize = level['minimize']
+        L.inequalities = level['inequalities']
+        L.d = level['d']
+        for X in level['c']:
+            L.c[X] = arrays[prefix+'.c.%d' % X]
+        for X,shape in level['A'].items():
+            L.A[int(X)] = _load_matrix(arrays, prefix+'.A.%s' % X, shape)
+        for i,j,shape in level['P']:
+            L.P[i,j] = _load_matrix(arrays, prefix+'.P.%d.%d' % (i,j), shape)
+        for i,j,shape in level['Q']:
+            L.Q[i,j] = SparseMatrixStack(tuple(shape), _load_matrix(arrays, prefix+'.Q.%d.%d' % (i,j), [shape[0], shape[1]*shape[2]]))
+    return M
@@ -0,0 +1,113 @@
+import os
+import pyutilib.th as unittest
+import pao.common
+from pao.mpr import *
+from pao.mpr import examples
+from pao.mpr.cache import canonical_hash
+from pao.mpr.solver import LinearMultilevelSolverBase, LinearMultilevelResults
+
+currdir = os.path.dirname(os.path.abspath(__file__))
+
+
+class CountingSolver(LinearMultilevelSolverBase):
+
+    config = LinearMultilevelSolverBase.config()
+    config.declare('x_value', pao.common.solver.ConfigValue(default=1.0))
+
+    def __init__(self):
+        super().__init__(name='counting')
+        self.count = 0
+
+    def solve(self, model, **options):
+        self._update_config(options)
+        self.count += 1
+        for L in model.levels():
+            L.x.values = [self.config.x_value]*len(L.x)
+        results = LinearMultilevelResults()
+        results.solver.termination_condition = pao.common.TerminationCondition.optimal
+        results.solver.best_feasible_objective = 3.0
+        results.timing.solve = 1.0
+        return results
+
+
+class Test_hash(unittest.TestCase):
+
+    def test_equal(self):
+        self.assertEqual(canonical_hash(examples.bard511.create()), canonical_hash(examples.bard511.create()))
+
+    def test_list_and_sparse(self):
+        # The same problem, defined with lists and with sparse matrices
+        self.assertEqual(canonical_hash(examples.bard511.create()), canonical_hash(examples.bard511_list.create()))
+
+    def test_different(self):
+        M = examples.bard511.create()
+        h = canonical_hash(M)
+        M.U.x.upper_bounds[0] = 10
+        self.assertNotEqual(canonical_hash(M), h)
+        self.assertNotEqual(canonical_hash(examples.bard511.create(), 'a'), h)
+
+
+class Test_CachedSolver(unittest.TestCase):
+
+    def test_memory(self):
+        solver = CountingSolver()
+        opt = CachedSolver(solver)
+
+        M = examples.bard511.create()
+        results = opt.solve(M)
+        self.assertFalse(results.solver.cache_hit)
+        self.assertEqual(solver.count, 1)
+
+        M = examples.bard511.create()
+        results = opt.solve(M)
+        self.assertTrue(results.solver.cache_hit)
+        self.assertEqual(solver.count, 1)
+        self.assertEqual(list(results.timing.keys()), ['cache_lookup'])
+        self.assertEqual(results.timing.cache_lookup, results.solver.wallclock_time)
+        self.assertEqual(results.solver.termination_condition, pao.common.TerminationCondition.optimal)
+        self.assertEqual(results.solver.best_feasible_objective, 3.0)
+        self.assertEqual(M.U.x.values, [1.0]*len(M.U.x))
+        self.assertEqual(M.U.LL.x.values, [1.0]*len(M.U.LL.x))
+
+        # Different solver options
+        results = opt.solve(M, x_value=2.0)
+        self.assertFalse(results.solver.cache_hit)
+        self.assertEqual(solver.count, 2)
+        self.assertEqual(M.U.x.values, [2.0]*len(M.U.x))
+
+        # The solution is not loaded, so the results are not cached
+        opt.solve(M, load_solutions=False)
+        opt.solve(M, load_solutions=False)
+        self.assertEqual(solver.count, 4)
+
+    def test_lru(self):
+        solver = CountingSolver()
+        opt = CachedSolver(solver, cache=ResultsCache(maxsize=1))
+        opt.solve(examples.bard511.create())
+        opt.solve(examples.besancon27.create())
+        opt.solve(examples.bard511.create())
+        self.assertEqual(solver.count, 3)
+        self.assertEqual(len(opt.cache), 1)
+
+    def test_disk(self):
+        directory = os.path.join(currdir, 'cache_test')
+        try:
+            solver = CountingSolver()
+            opt = CachedSolver(solver, cache=ResultsCache(directory=directory))
+            opt.solve(examples.bard511.create())
+            self.assertEqual(solver.count, 1)
+
+            opt = CachedSolver(solver, cache=ResultsCache(directory=directory))
+            M = examples.bard511.create()
+            results = opt.solve(M)
+            self.assertTrue(results.solver.cache_hit)
+            self.assertEqual(solver.count, 1)
+            self.assertEqual(M.U.x.values, [1.0]*len(M.U.x))
+        finally:
+            for fname in os.listdir(directory):
+                os.remove(os.path.join(directory, fname))
+            os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,15 @@
 import numpy as np
 import pyutilib.th as unittest
+from munch import Munch
+import pyomo.environ as pe
 from pao.mpr import *
-from pao.mpr.convert_repn import convert_to_standard_form, convert_binaries_to_integers
+from pao.mpr.convert_repn import convert_to_standard_form, convert_binaries_to_integers, _find_nonpositive_variables, VChanges
+
+
+def _terms(M):
+    # The (column, coefficient) terms in each row of a sparse matrix
+    M = M.tocsr()
+    return [[(int(j),v) for j,v in zip(M.indices[M.indptr[i]:M.indptr[i+1]], M.data[M.indptr[i]:M.indptr[i+1]])] for i in range(M.shape[0])]
 
 
 class Test_Trivial(unittest.TestCase):
@@ -1386,9 +1394,9 @@ class Test_NonTrivial(unittest.TestCase):
         self.assertEqual(list(ans.U.LL[0].b),    [-74, -75, -43, -83, 2])
         self.assertEqual(list(ans.U.LL[1].b),    [-61, -61, -97, -85,  4])
 
-        self.assertEqual(soln_manager.multipliers[U.id],  [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(8,-1)]])
-        self.assertEqual(soln_manager.multipliers[L0.id], [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(10,-1)], [(4,1)]])
-        self.assertEqual(soln_manager.multipliers[L1.id], [[(0,1)], [(1,1)], [(2,-1)], [(3,1)], [(4,1),(7,-1)], [(5,1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[U.id]),  [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(8,-1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[L0.id]), [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(10,-1)], [(4,1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[L1.id]), [[(0,1)], [(1,1)], [(2,-1)], [(3,1)], [(4,1),(7,-1)], [(5,1)]])
 
     def test_test1_inequality(self):
         mpr = self._create()
@@ -1485,9 +1493,9 @@ class Test_NonTrivial(unittest.TestCase):
         self.assertEqual(list(ans.U.LL[0].b), [-74, -75, -43, -83, 74, 75, 43, 83, 2])
         self.assertEqual(list(ans.U.LL[1].b), [-61, -61, -97, -85, 4])
 
-        self.assertEqual(soln_manager.multipliers[U.id],  [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(4,-1)]])
-        self.assertEqual(soln_manager.multipliers[L0.id], [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(5,-1)], [(4,1)]])
-        self.assertEqual(soln_manager.multipliers[L1.id], [[(0,1)], [(1,1)], [(2,-1)], [(3,1)], [(4,1),(6,-1)], [(5,1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[U.id]),  [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(4,-1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[L0.id]), [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(5,-1)], [(4,1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[L1.id]), [[(0,1)], [(1,1)], [(2,-1)], [(3,1)], [(4,1),(6,-1)], [(5,1)]])
 
     def test_test2(self):
         mpr = self._create()
@@ -1586,9 +1594,105 @@ class Test_NonTrivial(unittest.TestCase):
         self.assertEqual(list(ans.U.LL[0].b),    [-74, -75, -43, -83, 2])
         self.assertEqual(list(ans.U.LL[1].b),    [-61, -61, -97, -85,  4])
 
-        self.assertEqual(soln_manager.multipliers[U.id],  [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(8,-1)]])
-        self.assertEqual(soln_manager.multipliers[L0.id], [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(10,-1)], [(4,1)]])
-        self.assertEqual(soln_manager.multipliers[L1.id], [[(0,1)], [(1,1)], [(2,-1)], [(3,1)], [(4,1),(7,-1)], [(5,1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[U.id]),  [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(8,-1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[L0.id]), [[(0,1)], [(1,-1)], [(2,1)], [(3,1),(10,-1)], [(4,1)]])
+        self.assertEqual(_terms(soln_manager.multipliers[L1.id]), [[(0,1)], [(1,1)], [(2,-1)], [(3,1)], [(4,1),(7,-1)], [(5,1)]])
+
+
+    def test_range_without_matrix(self):
+        # Range constraints for variables are appended after the
+        # existing constraints, even if the level has no matrix for
+        # its own variables.
+        mpr = self._create()
+        U = mpr.add_upper(nxR=1)
+        L = U.add_lower(nxR=1)
+        U.x.lower_bounds = [1]
+        U.x.upper_bounds = [3]
+        L.x.lower_bounds = [0]
+        U.A[L] = [[1],[2]]
+        U.b = [5,6]
+        mpr.check()
+
+        ans, soln_manager = convert_to_standard_form(mpr, inequalities=True)
+        ans.check()
+
+        self.assertEqual(list(ans.U.b), [5, 6, 2])
+        self.assertEqual(ans.U.A[U].toarray().tolist(), [[0],[0],[1]])
+        self.assertEqual(ans.U.A[L].toarray().tolist(), [[1],[2],[0]])
+
+
+class Test_VChanges(unittest.TestCase):
+
+    def _create(self):
+        mpr = LinearMultilevelProblem()
+        U = mpr.add_upper(nxR=4, nxZ=2)
+        U.x.lower_bounds = [0, 1, np.NINF, np.NINF, np.NINF, 2]
+        U.x.upper_bounds = [np.PINF, 3, 4, np.PINF, np.PINF, np.PINF]
+        return U
+
+    def test_equalities(self):
+        U = self._create()
+        changes = _find_nonpositive_variables(U.x, False)
+
+        self.assertEqual(len(changes), 5)
+        self.assertEqual(changes.kind.tolist(), [VChanges.Range, VChanges.UpperBound, VChanges.Unbounded, VChanges.Unbounded, VChanges.LowerBound])
+        self.assertEqual(changes.v.tolist(), [1, 2, 3, 6, 7])
+        self.assertEqual(changes.w.tolist(), [4, -1, 5, 8, -1])
+        self.assertEqual(changes.lb.tolist(), [1, np.NINF, np.NINF, np.NINF, 2])
+        self.assertEqual(changes.ub.tolist(), [3, 4, np.PINF, np.PINF, np.PINF])
+        self.assertEqual((changes.nxR_old, changes.nxZ_old), (4, 2))
+        self.assertEqual((changes.nxR, changes.nxZ), (6, 3))
+
+    def test_inequalities(self):
+        U = self._create()
+        changes = _find_nonpositive_variables(U.x, True)
+
+        self.assertEqual(changes.v.tolist(), [1, 2, 3, 5, 6])
+        self.assertEqual(changes.w.tolist(), [-1, -1, 4, 7, -1])
+        self.assertEqual((changes.nxR, changes.nxZ), (5, 3))
+
+
+class Test_SolutionManager(unittest.TestCase):
+
+    def test_copy(self):
+        mpr = LinearMultilevelProblem()
+        U = mpr.add_upper(nxR=2, nxZ=2, nxB=1)
+        U.x.lower_bounds = [np.NINF, np.NINF, 1, np.NINF, 0]
+        U.x.upper_bounds = [np.PINF, 4, np.PINF, np.PINF, 1]
+
+        ans, soln_manager = convert_to_standard_form(mpr)
+        self.assertEqual((ans.U.x.nxR, ans.U.x.nxZ, ans.U.x.nxB), (3, 3, 1))
+        self.assertEqual(_terms(soln_manager.multipliers[U.id]), [[(0,1),(2,-1)], [(1,-1)], [(3,1)], [(4,1),(5,-1)], [(6,1)]])
+        self.assertEqual(list(soln_manager.offsets[U.id]), [0, 4, 1, 0, 0])
+
+        M = pe.ConcreteModel()
+        M.xR = pe.Var(range(3), initialize={0:3, 1:1, 2:1})
+        M.xZ = pe.Var(range(3), initialize={0:2, 1:5, 2:7})
+        M.xB = pe.Var(range(1), initialize=1)
+        soln_manager.copy(From=Munch(LxR={U.id:M.xR}, LxZ={U.id:M.xZ}, LxB={U.id:M.xB}), To=mpr)
+        self.assertEqual(U.x.values, [2, 3, 3, -2, 1])
+
+    def test_copy_slacks(self):
+        mpr = LinearMultilevelProblem()
+        U = mpr.add_upper(nxR=2, nxZ=2, nxB=1)
+        U.inequalities = True
+        U.x.lower_bounds = [0, np.NINF, np.NINF, 2, 0]
+        U.x.upper_bounds = [np.PINF, np.PINF, 3, np.PINF, 1]
+        U.A[U] = [[1, 1, 1, 1, 1], [1, 0, 2, 0, 0]]
+        U.b = [5, 4]
+
+        ans, soln_manager = convert_to_standard_form(mpr, inequalities=False)
+        self.assertEqual((ans.U.x.nxR, ans.U.x.nxZ, ans.U.x.nxB), (5, 2, 1))
+        self.assertEqual(_terms(soln_manager.multipliers[U.id]), [[(0,1)], [(1,1),(4,-1)], [(5,-1)], [(6,1)], [(7,1)]])
+        self.assertEqual(list(soln_manager.offsets[U.id]), [0, 0, 3, 2, 0])
+
+        M = pe.ConcreteModel()
+        M.xR = pe.Var(range(5), initialize={0:1.5, 1:2, 2:0.25, 3:0.5, 4:0.5})
+        M.xZ = pe.Var(range(2), initialize={0:1, 1:4})
+        M.xB = pe.Var(range(1), initialize=1)
+        soln_manager.copy(From=Munch(LxR={U.id:M.xR}, LxZ={U.id:M.xZ}, LxB={U.id:M.xB}), To=mpr)
+        self.assertEqual(U.x.values, [1.5, 1.5, 2, 6, 1])
+        self.assertEqual([type(v) for v in U.x.values], [float, float, int, int, int])
 
 
 class Test_Integers(unittest.TestCase):
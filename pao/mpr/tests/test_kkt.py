@@ -0,0 +1,97 @@
+import numpy as np
+import scipy.sparse
+import pyutilib.th as unittest
+import pyomo.environ as pe
+from pyomo.repn import generate_standard_repn
+from pyomo.mpec import Complementarity
+from pao.mpr import examples
+from pao.mpr.convert_repn import convert_to_standard_form
+from pao.mpr.solvers import kkt
+from pao.mpr.solvers.reg import create_model_replacing_LL_with_kkt
+
+
+def terms(c):
+    repn = generate_standard_repn(c.body)
+    return {v.name:coef for v, coef in zip(repn.linear_vars, repn.linear_coefs)}, repn.constant
+
+
+class Test_kkt(unittest.TestCase):
+
+    def create(self):
+        M = pe.ConcreteModel()
+        M.x = pe.Var(range(3), bounds=(0,None))
+        M.y = pe.Var(range(2))
+        return M
+
+    def test_stationarity(self):
+        M = self.create()
+        A = scipy.sparse.csr_matrix(np.array([[1,0,2],[0,0,3]]))
+        G = kkt.stationarity_matrix(A, -scipy.sparse.identity(3))
+        duals = list(M.y.values()) + list(M.x.values())
+        con = kkt.add_stationarity(M, 'c', G, duals, d=[1,2,3], terms=[[],[],[M.x[0]]])
+        self.assertIs(M.c, con)
+        self.assertEqual(list(M.c.keys()), [0,1,2])
+        self.assertEqual(terms(M.c[0]), ({'y[0]':1, 'x[0]':-1}, 1))
+        self.assertEqual(terms(M.c[1]), ({'x[1]':-1}, 2))
+        self.assertEqual(terms(M.c[2]), ({'y[0]':2, 'y[1]':3, 'x[2]':-1, 'x[0]':1}, 3))
+
+    def test_stationarity_start(self):
+        M = self.create()
+        G = scipy.sparse.csc_matrix(np.array([[1.0],[2.0]]))
+        kkt.add_stationarity(M, 'c', G, list(M.y.values()), start=1)
+        self.assertEqual(list(M.c.keys()), [1])
+        self.assertEqual(terms(M.c[1]), ({'y[0]':1, 'y[1]':2}, 0))
+
+    def test_stationarity_unbounded(self):
+        M = self.create()
+        G = scipy.sparse.csc_matrix((2,1))
+        with self.assertRaises(IOError):
+            kkt.add_stationarity(M, 'c', G, list(M.y.values()), d=[1])
+
+    def test_complementarity(self):
+        M = self.create()
+        kkt.add_complementarity(M, 'c', [M.x[0] >= 0, M.x[1] + M.x[2] <= 4], list(M.y.values()), start=1)
+        self.assertTrue(isinstance(M.c, Complementarity))
+        self.assertEqual(list(M.c.keys()), [1,2])
+
+    def test_bigm(self):
+        M = self.create()
+        kkt.add_complementarity(M, 'c', [M.x[0] >= 0, M.x[1] + M.x[2] <= 4], list(M.y.values()), encoding='bigm', bigM=10)
+        self.assertEqual(len(M.c_z), 2)
+        self.assertTrue(M.c_z[0].is_binary())
+        self.assertEqual(len(M.c), 8)
+        self.assertEqual(terms(M.c[1,'primal']), ({'x[1]':-1, 'x[2]':-1}, 4))
+        self.assertEqual(M.c[1,'primal'].lower, 0)
+        self.assertEqual(terms(M.c[1,'primal_bigm']), ({'x[1]':-1, 'x[2]':-1, 'c_z[1]':-10}, 4))
+        self.assertEqual(M.c[1,'primal_bigm'].upper, 0)
+        self.assertEqual(terms(M.c[0,'dual_bigm']), ({'y[0]':1, 'c_z[0]':10}, 0))
+        self.assertEqual(M.c[0,'dual_bigm'].upper, 10)
+
+    def test_regularized(self):
+        M = self.create()
+        kkt.add_complementarity(M, 'c', [M.x[0] >= 0], [M.y[0]], encoding='regularized', rho=1e-4)
+        self.assertEqual(len(M.c), 3)
+        repn = generate_standard_repn(M.c[0,'product'].body, quadratic=True)
+        self.assertEqual([(v1.name, v2.name) for v1, v2 in repn.quadratic_vars], [('x[0]', 'y[0]')])
+        self.assertEqual(M.c[0,'product'].upper, 1e-4)
+
+    def test_errors(self):
+        M = self.create()
+        with self.assertRaises(AssertionError):
+            kkt.add_complementarity(M, 'c', [M.x[0] >= 0], [M.y[0]], encoding='unknown')
+        with self.assertRaises(AssertionError):
+            kkt.add_complementarity(M, 'c', [M.x[0] >= 0], [M.y[0]], encoding='bigm')
+        with self.assertRaises(ValueError):
+            kkt.add_complementarity(M, 'c', [M.x[0] == 0], [M.y[0]], encoding='bigm', bigM=10)
+
+    def test_bard511(self):
+        repn, soln = convert_to_standard_form(examples.bard511.create(), inequalities=False)
+        L = repn.U.LL[0]
+        for encoding, n in [(None, len(L.x)), ('bigm', 4*len(L.x)), ('regularized', 3*len(L.x))]:
+            M = create_model_replacing_LL_with_kkt(repn, encoding=encoding, bigM=1e5, rho=1e-7)
+            self.assertEqual(len(M.kkt[0].stationarity), len(L.x))
+            self.assertEqual(len(M.kkt[0].slackness), n)
+
+
+if __name__ == "__main__":
+    unittest.main()
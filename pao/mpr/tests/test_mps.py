@@ -0,0 +1,97 @@
+import os
+import tempfile
+import numpy as np
+import pyutilib.th as unittest
+from pyomo.common.log import LoggingIntercept
+from pao.mpr import *
+from pao.mpr import examples
+from pao.mpr.solvers.mps import write_mps
+
+
+class Test_MPS(unittest.TestCase):
+
+    def _write(self, mpr):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "test.mps")
+            write_mps(mpr, filename)
+            with open(filename, "r") as INPUT:
+                return INPUT.read().split("\n")
+
+    def test_bounds(self):
+        mpr = LinearMultilevelProblem()
+        U = mpr.add_upper(nxR=3, nxZ=1, nxB=1)
+        L = U.add_lower(nxR=1)
+        U.x.lower_bounds = [np.NINF, np.NINF, 1, 0, 0]
+        U.x.upper_bounds = [np.PINF, 2, 3, np.PINF, 1]
+        L.x.lower_bounds = [0]
+        U.minimize = False
+        U.c[U] = [1, 0, 2, 3, 4]
+        U.c[L] = [5]
+        U.d = 6
+        U.A[U] = [[1, 0, 0, 1, 0], [0, 0, 0, 0, 0]]
+        U.b = [7, 0]
+        L.inequalities = False
+        L.A[L] = [[2]]
+        L.b = [8]
+        mpr.check()
+
+        self.assertEqual(self._write(mpr), [
+            "NAME unknown",
+            "OBJSENSE",
+            " MAX",
+            "ROWS",
+            " N  OBJ",
+            " L  R0",
+            " L  R1",
+            " E  R2",
+            "COLUMNS",
+            "     C0 OBJ 1.0",
+            "     C0 R0 1.0",
+            "     C2 OBJ 2.0",
+            "    MARKER 'MARKER' 'INTORG'",
+            "     C3 OBJ 3.0",
+            "     C3 R0 1.0",
+            "    MARKER 'MARKER' 'INTEND'",
+            "     C4 OBJ 4.0",
+            "     C5 OBJ 5.0",
+            "     C5 R2 2.0",
+            "RHS",
+            "     RHS OBJ -6.0",
+            "     RHS R0 7.0",
+            "     RHS R2 8.0",
+            "BOUNDS",
+            " FR BOUND  C0",
+            " MI BOUND  C1",
+            " UP BOUND  C1 2.0",
+            " LO BOUND  C2 1.0",
+            " UP BOUND  C2 3.0",
+            " LO BOUND  C3 0.0",
+            " PL BOUND  C3",
+            " BV BOUND  C4",
+            " LO BOUND  C5 0.0",
+            "ENDATA",
+            ""])
+
+
+class Test_MibS_files(unittest.TestCase):
+
+    def _write(self, fn):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filenames = [os.path.join(tmpdir, "test.mps"), os.path.join(tmpdir, "test.aux")]
+            fn(examples.mibs.create(), *filenames)
+            ans = []
+            for filename in filenames:
+                with open(filename, "r") as INPUT:
+                    ans.append(INPUT.read())
+            return ans
+
+    def test_create_mibs_model(self):
+        opt = Solver('pao.mpr.MIBS')
+        expected = self._write(opt.write_mibs_files)
+        with LoggingIntercept() as LOG:
+            self.assertEqual(self._write(opt.create_mibs_model), expected)
+        self.assertIn("create_mibs_model() has been renamed write_mibs_files()", LOG.getvalue().replace("\n", " "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+import pyutilib.th as unittest
+from pyomo.environ import ConcreteModel, Block, Constraint, Var
+from pyomo.repn import generate_standard_repn
+from pyomo.gdp import Disjunct
+from pyomo.common.collections import ComponentSet
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+from pao.mpr import LinearMultilevelProblem
+from pao.mpr.solvers.pccg_solver import mat2rows, dot, create_pyomo_model, Master_add, transform_master, MasterSolver, SubproblemSolver
+
+
+class StubPersistentSolver(PersistentSolver):
+    """
+    A persistent solver that records the calls used to load a model.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def set_instance(self, model):
+        self.calls.append(('set_instance', model))
+
+    def add_var(self, var):
+        self.calls.append(('add_var', var))
+
+    def add_constraint(self, con):
+        self.calls.append(('add_constraint', con))
+
+    def remove_constraint(self, con):
+        self.calls.append(('remove_constraint', con))
+
+    def warm_start_capable(self):
+        return True
+
+    def solve(self, **kwds):
+        self.calls.append(('solve', kwds))
+
+    def names(self, kind):
+        return [obj.name for k, obj in self.calls if k == kind]
+
+
+def create_mpr():
+    """
+    A problem in the standard form used by PCCG, with empty rows and
+    columns in the constraint matrices.
+    """
+    mpr = LinearMultilevelProblem()
+    U = mpr.add_upper(nxR=2, nxZ=1)
+    L = U.add_lower(nxR=3, nxZ=1)
+    U.c[U] = [1, 2, 3]
+    U.c[L] = [4, 0, 5, 6]
+    U.A[U] = [[1, 0, 2], [0, 0, 0]]
+    U.A[L] = [[0, 1, 0, 0], [1, 0, 0, 3]]
+    U.b = [4, 5]
+    L.c[L] = [1, 1, 0, 2]
+    L.A[U] = [[1, 0, 0], [0, 0, 0], [0, 0, 3]]
+    L.A[L] = [[2, 0, 0, 1], [0, 0, 0, 0], [1, 0, 4, 0]]
+    L.b = [1, 2, 3]
+    return mpr
+
+
+def create():
+    return create_pyomo_model(create_mpr(), 100)
+
+
+def terms(e):
+    repn = generate_standard_repn(e)
+    return {v.name:coef for v, coef in zip(repn.linear_vars, repn.linear_coefs) if coef != 0}, repn.constant
+
+
+def within(obj, block):
+    parent = obj.parent_block()
+    while parent is not None:
+        if parent is block:
+            return True
+        parent = parent.parent_block()
+    return False
+
+
+class Test_rows(unittest.TestCase):
+
+    def test_mat2rows(self):
+        L = create_mpr().U.LL[0]
+        D = L.A[L].toarray()
+        self.assertEqual(mat2rows(L.A[L], 0, 3, 3), [[(0,2)], [], [(0,1),(2,4)]])
+        self.assertEqual(mat2rows(L.A[L], 3, 4, 3), [[(0,1)], [], []])
+        self.assertEqual(mat2rows(L.A[L], 0, 3, 3, transpose=True), [[(0,2),(2,1)], [], [(2,4)]])
+        for start, stop in [(0,3), (3,4), (0,4)]:
+            rows = mat2rows(L.A[L], start, stop, 3)
+            cols = mat2rows(L.A[L], start, stop, stop-start, transpose=True)
+            for i in range(3):
+                for j in range(stop-start):
+                    self.assertEqual(dict(rows[i]).get(j, 0), D[i,start+j])
+                    self.assertEqual(dict(cols[j]).get(i, 0), D[i,start+j])
+        self.assertEqual(mat2rows(None, 0, 3, 2), [[], []])
+
+    def test_dot(self):
+        M = ConcreteModel()
+        M.x = Var(range(3))
+        M.y = Var(range(3), [1,2])
+        self.assertEqual(terms(dot([(0,2),(2,4)], M.x)), ({'x[0]':2, 'x[2]':4}, 0))
+        self.assertEqual(terms(dot([(0,2),(2,4)], M.y, 2)), ({'y[0,2]':2, 'y[2,2]':4}, 0))
+        self.assertEqual(dot([], M.x), 0)
+
+    def test_master_add(self):
+        mpr = create_mpr()
+        U = mpr.U
+        L = U.LL[0]
+        mR, nR = U.x.nxR, L.x.nxR
+        PR = L.A[L].toarray()[:, :nR]
+        PZ = L.A[L].toarray()[:, nR:]
+        QR = L.A[U].toarray()[:, :mR]
+        QZ = L.A[U].toarray()[:, mR:]
+
+        Parent = create_pyomo_model(mpr, 100)
+        Master = Parent.Master
+        k = 1
+        Master.Y[(0,k)] = 2
+        Master_add(Parent, k, 1e-4)
+        #
+        # The rows of c_col using sums over the dense matrices
+        #
+        nL, nZ, mZ = PR.shape[0], PZ.shape[1], QZ.shape[1]
+        dense = []
+        for i in range(nL):
+            dense.append(Parent.s[i] -
+                         sum(float(QR[i,j])*Master.xu[j] for j in range(mR)) -
+                         sum(float(QZ[i,j])*Master.yu[j] for j in range(mZ)) -
+                         sum(float(PZ[i,j])*Master.Y[(j,k)] for j in range(nZ)) -
+                         sum(float(PR[i,j])*Master.x[(j,k)] for j in range(nR)) +
+                         Master.t[(i,k)])                                       #(79)
+        for i in range(nR):
+            dense.append(sum(float(PR[j,i])*Master.lam[(j,k)] for j in range(nL)))  #(83)
+        for i in range(nL):
+            dense.append(1 - Master.lam[(i,k)])                                 #(84)
+        #
+        # The trivial row for the empty column of PR is skipped
+        #
+        expected = [terms(e) for e in dense]
+        self.assertEqual(expected[nL+1], ({}, 0))
+        del expected[nL+1]
+        self.assertEqual([terms(c.body) for c in Master.c_col.values()], expected)
+        self.assertEqual(expected[0], ({'Master.xu[0]':-1, 'Master.x[0,1]':-2, 'Master.t[0,1]':1}, -1))
+
+
+class Test_MasterSolver(unittest.TestCase):
+
+    def test_persistent(self):
+        Parent = create()
+        Master = Parent.Master
+        transform_master(Master)
+        opt = StubPersistentSolver()
+        master = MasterSolver(opt, Master)
+        master.solve()
+        self.assertEqual(opt.calls, [('set_instance', Master), ('solve', {})])
+
+        for k in [1, 2]:
+            opt.calls = []
+            ncol = len(Master.c_col)
+            for i in Parent.nZset:
+                Master.Y[(i,k)] = 1
+            Master_add(Parent, k, 1e-4)
+            transform_master(Master, targets=[Master.CompBlock2[k], Master.DisjunctionBlock[k]])
+            master.solve()
+            #
+            # Only the variables and constraints for iteration k are added
+            #
+            blocks = [Master.CompBlock2[k], Master.DisjunctionBlock[k]]
+            growing = ComponentSet([Master.x, Master.pi, Master.t, Master.lam])
+            vars = [v.name for v in Master.component_data_objects(Var, descend_into=(Block, Disjunct))
+                    if (v.parent_component() in growing and v.index()[1] == k) or
+                       any(within(v, b) for b in blocks)]
+            cons = [Master.c_col[i].name for i in range(ncol+1, len(Master.c_col)+1)]
+            for b in blocks:
+                cons.extend(c.name for c in b.component_data_objects(Constraint, active=True, descend_into=(Block, Disjunct)))
+            self.assertTrue(len(Master.c_col) > ncol)
+            self.assertEqual(sorted(opt.names('add_var')), sorted(vars))
+            self.assertEqual(sorted(opt.names('add_constraint')), sorted(cons))
+            self.assertEqual(opt.names('set_instance'), [])
+            self.assertEqual(opt.calls[-1], ('solve', {}))
+
+
+class Test_SubproblemSolver(unittest.TestCase):
+
+    def test_persistent(self):
+        Parent = create()
+        params = [Parent.xu_star, Parent.yu_star, Parent.theta]
+        for block, cons in [(Parent.sub1, ['sub1.c1[0]', 'sub1.c1[2]']),
+                            (Parent.sub2, ['sub2.c1[0]', 'sub2.c1[2]', 'sub2.c2[0]', 'sub2.c3'])]:
+            opt = StubPersistentSolver()
+            sub = SubproblemSolver(opt, block, True, params)
+            sub.solve()
+            self.assertEqual(opt.calls, [('set_instance', block), ('solve', {'warmstart':True})])
+
+            opt.calls = []
+            sub.solve()
+            self.assertEqual(opt.names('remove_constraint'), cons)
+            self.assertEqual(opt.names('add_constraint'), cons)
+            self.assertEqual(opt.calls[-1], ('solve', {'warmstart':True}))
+
+    def test_warmstart(self):
+        Parent = create()
+        # Solvers without warm_start_capable() do not use warm starts
+        self.assertFalse(SubproblemSolver(object(), Parent.sub1, True).warmstart)
+        self.assertTrue(SubproblemSolver(StubPersistentSolver(), Parent.sub1, True).warmstart)
+        self.assertFalse(SubproblemSolver(StubPersistentSolver(), Parent.sub1, False).warmstart)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,8 @@ import numpy as np
 import scipy.sparse
 import pyutilib.th as unittest
 from pao.mpr import *
-from pao.mpr.repn import SimplifiedList, LinearLevelRepn, LevelVariable, LevelValues, LevelValueWrapper1, LevelValueWrapper2
+from pao.mpr.repn import SimplifiedList, LinearLevelRepn, LevelVariable, LevelValues, LevelValueWrapper1, LevelValueWrapper2, SparseMatrixStack, _update_matrix
+from pyutilib.misc import Bunch
 
 
 class A(object):
@@ -447,6 +448,28 @@ class Test_LevelValueWrapper2(unittest.TestCase):
         L[L0,L1] = None
         self.assertEqual(L[L0,L1], None)
 
+    def test_setgetitem_triplets(self):
+        L = LevelValueWrapper2('foo', matrix=False)
+        L0 = LinearLevelRepn(1,2,3)
+        L1 = L0.add_lower(nxR=1, nxZ=2, nxB=3, name="L1")
+        L[L0,L1] = (3,3,4), (np.array([0,2]), np.array([0,1]), np.array([0,3]), np.array([1.0,2.0]))
+        Q = L[L0,L1]
+        self.assertEqual(type(Q), SparseMatrixStack)
+        self.assertEqual(len(Q), 3)
+        self.assertEqual(Q.size, 2)
+        self.assertTrue( np.array_equal(Q[0].todense(), [[1,0,0,0],[0,0,0,0],[0,0,0,0]]) )
+        self.assertEqual(Q[1], None)
+        self.assertTrue( np.array_equal(Q[2].todense(), [[0,0,0,0],[0,0,0,2],[0,0,0,0]]) )
+        k, i, j, v = Q.triplets()
+        self.assertEqual(k.tolist(), [0,2])
+        self.assertEqual(i.tolist(), [0,1])
+        self.assertEqual(j.tolist(), [0,3])
+        self.assertEqual(v.tolist(), [1,2])
+
+        L = LevelValueWrapper2('foo', matrix=True)
+        L[L0,L1] = (6,6), ([0,5], [1,5], [3,4])
+        self.assertEqual(dict(L[L0,L1].todok()), {(0,1):3, (5,5):4})
+
     def test_clone(self):
         l = LevelValueWrapper2('foo', matrix=True)
         try:
@@ -469,6 +492,26 @@ class Test_LevelValueWrapper2(unittest.TestCase):
             pass
         
 
+class Test_update_matrix(unittest.TestCase):
+
+    def test_columns(self):
+        old = Bunch(nxR=3, nxZ=2, nxB=2)
+        new = Bunch(nxR=2, nxZ=3, nxB=1)
+        A = scipy.sparse.csr_matrix(np.array([[1,2,3,4,5,6,7],[0,0,3,0,5,0,7]]))
+        ans = _update_matrix(A=A, old=old, new=new)
+        self.assertEqual(type(ans), scipy.sparse.csr_matrix)
+        self.assertEqual(ans.shape, (2,6))
+        self.assertEqual(ans.toarray().tolist(), [[1,2,4,5,0,6],[0,0,0,5,0,0]])
+
+    def test_rows(self):
+        old = Bunch(nxR=3, nxZ=2, nxB=2)
+        new = Bunch(nxR=4, nxZ=1, nxB=2)
+        A = scipy.sparse.csr_matrix(np.array([[1,2,3,4,5,6,7],[0,0,3,0,5,0,7]]).transpose())
+        ans = _update_matrix(A=A, old=old, new=new, update_columns=False)
+        self.assertEqual(ans.shape, (7,2))
+        self.assertEqual(ans.toarray().transpose().tolist(), [[1,2,3,0,4,6,7],[0,0,3,0,0,0,7]])
+
+
 class Test_LinearLevelRepn(unittest.TestCase):
 
     def test_init(self):
@@ -22,6 +22,26 @@ class Test_bilevel_FA(unittest.TestCase):
         self.assertTrue(math.isclose(mpr.U.x.values[0], 4))
         self.assertTrue(math.isclose(mpr.U.LL.x.values[0], 4))
 
+    def test_bard511_sparse(self):
+        mpr = examples.bard511.create()
+        mpr.check()
+
+        opt = Solver('pao.mpr.FA')
+        opt.solve(mpr, model_builder='sparse')
+
+        self.assertTrue(math.isclose(mpr.U.x.values[0], 4))
+        self.assertTrue(math.isclose(mpr.U.LL.x.values[0], 4))
+
+    def test_bard511_timing(self):
+        mpr = examples.bard511.create()
+
+        phases = []
+        opt = Solver('pao.mpr.FA')
+        results = opt.solve(mpr, timing_callback=lambda phase, seconds: phases.append(phase))
+
+        self.assertEqual(phases, ['convert_to_standard_form', 'create_model', 'solve', 'load_solution'])
+        self.assertEqual(sorted(results.timing.keys()), sorted(phases))
+
     def test_bard511_list(self):
         mpr = examples.bard511_list.create()
         mpr.check()
@@ -116,6 +136,16 @@ class Test_bilevel_REG(unittest.TestCase):
         self.assertTrue(math.isclose(mpr.U.x.values[0], 4, abs_tol=1e-4))
         self.assertTrue(math.isclose(mpr.U.LL.x.values[0], 4, abs_tol=1e-4))
 
+    def test_bard511_sparse(self):
+        mpr = examples.bard511.create()
+        mpr.check()
+
+        opt = Solver('pao.mpr.REG')
+        opt.solve(mpr, model_builder='sparse')
+
+        self.assertTrue(math.isclose(mpr.U.x.values[0], 4, abs_tol=1e-4))
+        self.assertTrue(math.isclose(mpr.U.LL.x.values[0], 4, abs_tol=1e-4))
+
     def test_bard511_list(self):
         mpr = examples.bard511_list.create()
         mpr.check()
@@ -294,6 +324,16 @@ class Test_bilevel_PCCG(unittest.TestCase):
         self.assertEqual(mpr.U.x.values[0], 2)
         self.assertEqual(mpr.U.LL.x.values[0], 2)
 
+    def test_toyexample1_warmstart(self):
+        mpr = examples.toyexample1.create()
+        mpr.check()
+
+        opt = Solver('pao.mpr.PCCG')
+        opt.solve(mpr, mip_solver=self.solver, warmstart=True)
+
+        self.assertEqual(mpr.U.x.values[0], 2)
+        self.assertEqual(mpr.U.LL.x.values[0], 2)
+
     def test_toyexample2(self):
         mpr = examples.toyexample2.create()
         mpr.check()
@@ -416,6 +456,17 @@ class Test_bilevel_MIBS(unittest.TestCase):
         self.assertTrue(math.isclose(mpr.U.x.values[0], 6, abs_tol=1e-4))
         self.assertTrue(math.isclose(mpr.U.LL.x.values[0], 5, abs_tol=1e-4))
 
+    def test_mibs_batch(self):
+        mprs = [examples.mibs.create() for i in range(4)]
+
+        opt = Solver('pao.mpr.MIBS')
+        results = opt.solve_batch(mprs, workers=2)
+
+        self.assertEqual(len(results), 4)
+        for mpr in mprs:
+            self.assertTrue(math.isclose(mpr.U.x.values[0], 6, abs_tol=1e-4))
+            self.assertTrue(math.isclose(mpr.U.LL.x.values[0], 5, abs_tol=1e-4))
+
     def test_moore(self):
         mpr = examples.moore.create()
         mpr.check()
@@ -0,0 +1,61 @@
+import os
+import numpy as np
+import pyutilib.th as unittest
+from pao.mpr import *
+from pao.mpr import examples
+from pao.mpr.cache import canonical_hash
+
+currdir = os.path.dirname(os.path.abspath(__file__))
+
+
+class Test_storage(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(currdir, 'storage_test.npz')
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def _check(self, M, mmap):
+        M.U.x.values = list(range(len(M.U.x)))
+        save_problem(M, self.filename)
+        N = load_problem(self.filename, mmap=mmap)
+        self.assertEqual(type(N), type(M))
+        self.assertEqual(N.name, M.name)
+        self.assertEqual(canonical_hash(N), canonical_hash(M))
+        self.assertEqual([L.id for L in N.levels()], [L.id for L in M.levels()])
+        self.assertEqual([L.name for L in N.levels()], [L.name for L in M.levels()])
+        for L,K in zip(M.levels(), N.levels()):
+            self.assertEqual(K.x.values, L.x.values)
+        return N
+
+    def test_linear(self):
+        for mmap in [False, True]:
+            self._check(examples.bard511.create(), mmap)
+            self._check(examples.anadalingam.create(), mmap)
+            self._check(examples.besancon27.create(), mmap)
+            self._check(examples.toyexample3.create(), mmap)
+
+    def test_quadratic(self):
+        for mmap in [False, True]:
+            self._check(examples.barguel.create(), mmap)
+
+    def test_mmap(self):
+        M = self._check(examples.bard511.create(), True)
+        self.assertTrue(isinstance(M.U.x.upper_bounds, np.memmap))
+        # The arrays are copy-on-write
+        M.U.x.upper_bounds[0] = 10
+        N = load_problem(self.filename)
+        self.assertEqual(N.U.x.upper_bounds[0], np.PINF)
+
+    def test_new_levels(self):
+        M = examples.bard511.create()
+        save_problem(M, self.filename)
+        N = load_problem(self.filename)
+        L = N.U.add_lower(nxR=1)
+        self.assertTrue(L.id not in [K.id for K in M.levels()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,13 @@
 import copy
 import itertools
 import numpy as np
-from scipy.sparse import dok_matrix
+from scipy.sparse import csr_matrix
 
 import pyomo.environ as pe
 from pyomo.repn import generate_standard_repn
 from pyomo.core.base import SortComponents, is_fixed
+from pyomo.common.numeric_types import native_numeric_types
+from pyomo.common.collections import ComponentMap
 
 from pao.mpr import LinearMultilevelProblem, QuadraticMultilevelProblem
 from .components import SubModel
@@ -19,6 +21,15 @@ def _bound_equals(exp, num):
     return False                        # pragma: no cover
                                         # WEH - will we ever reach this point?  What if the LB is a mutable parameter?
 
+def _value(val):
+    #
+    # Coefficients in a standard repn are usually numeric, so
+    # avoid calling pe.value() on them
+    #
+    if val.__class__ in native_numeric_types:
+        return val
+    return pe.value(val)
+
 def offset(t,L):
     if t==0:
         return 0
@@ -27,6 +38,34 @@ def offset(t,L):
     else:
         return L.nxR+L.nxZ
 
+
+class ParametricValues(object):
+    """
+    Record the values in a multilevel problem that are computed from
+    mutable parameters or fixed variables, so they can be refreshed in place.
+    """
+
+    def __init__(self):
+        self.arrays = []        # (array, positions, expressions)
+        self.scalars = []       # (object, attribute, expression)
+        self.quadratic = []     # (node, level, levelmap, colmap)
+
+    def __len__(self):
+        return len(self.arrays) + len(self.scalars) + len(self.quadratic)
+
+    def add_array(self, array, positions, expressions):
+        if len(expressions) > 0:
+            self.arrays.append( (array, np.asarray(positions, dtype=np.int64), expressions) )
+
+    def update(self):
+        for array, positions, expressions in self.arrays:
+            array[positions] = [pe.value(e) for e in expressions]
+        for obj, name, expr in self.scalars:
+            setattr(obj, name, pe.value(expr))
+        for node, level, levelmap, colmap in self.quadratic:
+            node.initialize_level_quadratic(level, levelmap, colmap)
+
+
 class Node(object):
 
     global_list = []
@@ -100,28 +139,30 @@ class Node(object):
         Initialize the level object...
         """
         level.x._resize(nxR=len(self.xR), nxZ=len(self.xZ), nxB=len(self.xB))
+        self.update_level_bounds(level, var)
+
+    def update_level_bounds(self, level, var):
+        """
+        Set the bounds on the level variables from the Pyomo variables
+        """
         #
         # xR
         #
         for i in self.xR:
             vid = self.xR[i]
             val = var[vid].lb
-            if val is not None:
-                level.x.lower_bounds[i] = val
+            level.x.lower_bounds[i] = np.NINF if val is None else val
             val = var[vid].ub
-            if val is not None:
-                level.x.upper_bounds[i] = val
+            level.x.upper_bounds[i] = np.PINF if val is None else val
         #
         # xZ
         #
         for i in self.xZ:
             vid = self.xZ[i]
             val = var[vid].lb
-            if val is not None:
-                level.x.lower_bounds[i+level.x.nxR] = val
+            level.x.lower_bounds[i+level.x.nxR] = np.NINF if val is None else val
             val = var[vid].ub
-            if val is not None:
-                level.x.upper_bounds[i+level.x.nxR] = val
+            level.x.upper_bounds[i+level.x.nxR] = np.PINF if val is None else val
         #
         # xB
         #
@@ -129,7 +170,7 @@ class Node(object):
             level.x.lower_bounds[i+level.x.nxR+level.x.nxZ] = 0
             level.x.upper_bounds[i+level.x.nxR+level.x.nxZ] = 1
 
-    def initialize_level(self, level, inequalities, var, vidmap, levelmap):
+    def initialize_level(self, level, inequalities, var, levelmap, colmap, parametric=None):
         #
         # Objective
         #
@@ -144,47 +185,31 @@ class Node(object):
             #
             # d
             #
-            level.d = pe.value(repn.constant)
+            level.d = _value(repn.constant)
+            if parametric is not None and repn.constant.__class__ not in native_numeric_types:
+                parametric.scalars.append( (level, 'd', repn.constant) )
             #
             # c
             #
             c = {}
+            cparam = {}
             for j in levelmap:
-                node = levelmap[j]
-                c[j] = [0]*node.x.num
+                c[j] = np.zeros(levelmap[j].x.num)
+                cparam[j] = ([], [])
 
-            for i,val in enumerate(repn.linear_coefs):
-                vid = id(repn.linear_vars[i])
-                t, nid, j = vidmap[vid]
-                L = levelmap[nid]
-                c[nid][j+offset(t,L.x)] = pe.value(val)
+            for val, v in zip(repn.linear_coefs, repn.linear_vars):
+                nid, j = colmap[id(v)]
+                c[nid][j] += _value(val)
+                if val.__class__ not in native_numeric_types:
+                    cparam[nid][0].append(j)
+                    cparam[nid][1].append(val)
 
             # Add a non-null objective vector
             for j in levelmap:
-                for v in c[j]:
-                    if v != 0:
-                        level.c[j] = c[j]
-                        break
-            #
-            # P
-            #
-            P = {}
-            for i,val in enumerate(repn.quadratic_coefs):
-                v1,v2 = repn.quadratic_vars[i]
-                t1, nid1, j1 = vidmap[id(v1)]
-                t2, nid2, j2 = vidmap[id(v2)]
-                L1 = levelmap[nid1]
-                L2 = levelmap[nid2]
-                if nid1 <= nid2:
-                    if P.get((nid1,nid2),None) is None:
-                        P[nid1,nid2] = {}
-                    P[nid1,nid2][j1+offset(t1,L1.x), j2+offset(t2,L2.x)] = pe.value(val)
-                else:
-                    if P.get((nid2,nid1),None) is None:
-                        P[nid2,nid1] = {}
-                    P[nid2,nid1][j2+offset(t2,L2.x), j1+offset(t1,L1.x)] = pe.value(val)
-            for n1,n2 in P:
-                level.P[n1,n2] = (len(levelmap[n1].x),len(levelmap[n2].x)), P[n1,n2]
+                if np.any(c[j] != 0) or (parametric is not None and len(cparam[j][1]) > 0):
+                    level.c[j] = c[j]
+                    if parametric is not None:
+                        parametric.add_array(level.c[j], *cparam[j])
         #
         # Constraints
         #
@@ -192,58 +217,140 @@ class Node(object):
             #
             # A
             #
-            A = {}
-            for i in levelmap:
-                A[i] = {}
+            # Collect the (row, col, value) triplets in preallocated arrays,
+            # and then create the matrix for each level with a single call.
+            #
             nrows = len(self.crepn)
-
-            for k in range(len(self.crepn)):
+            nnz = sum(len(repn.linear_coefs) for repn,_ in self.crepn)
+            row = np.empty(nnz, dtype=np.int64)
+            nids = np.empty(nnz, dtype=np.int64)
+            col = np.empty(nnz, dtype=np.int64)
+            data = np.empty(nnz, dtype=np.float64)
+            param = np.zeros(nnz, dtype=bool)
+            pexpr = {}
+
+            n = 0
+            for k in range(nrows):
                 repn = self.crepn[k][0]
-                for i,c  in enumerate(repn.linear_coefs):
-                    vid = id(repn.linear_vars[i])
-                    t, nid, j = vidmap[vid]
-                    L = levelmap[nid]
-                    c_ = pe.value(c)
-                    if c_ != 0:
-                        A[nid][k,j+offset(t,L.x)] = c_
-
+                for c, v in zip(repn.linear_coefs, repn.linear_vars):
+                    row[n] = k
+                    nids[n], col[n] = colmap[id(v)]
+                    data[n] = _value(c)
+                    if c.__class__ not in native_numeric_types:
+                        param[n] = True
+                        pexpr[n] = c
+                    n += 1
+
+            keep = data != 0
+            if parametric is not None:
+                keep |= param
             for j in levelmap:
-                if len(A[j]) > 0:
+                mask = (nids == j) & keep
+                if mask.any():
                     L = levelmap[j]
-                    mat = dok_matrix((nrows, L.x.num))
-                    for key, val in A[j].items():
-                        mat[key] = val
+                    if parametric is None:
+                        level.A[L.id] = csr_matrix((data[mask], (row[mask], col[mask])), shape=(nrows, L.x.num))
+                        continue
+                    #
+                    # Find the position of each triplet in the CSR data array,
+                    # so parametric coefficients can be updated in place.
+                    #
+                    mat = csr_matrix((np.arange(1, mask.sum()+1, dtype=np.float64), (row[mask], col[mask])), shape=(nrows, L.x.num))
+                    order = mat.data.astype(np.int64) - 1
+                    position = np.empty(order.size, dtype=np.int64)
+                    position[order] = np.arange(order.size)
+                    mat.data = data[mask][order]
                     level.A[L.id] = mat
+                    parametric.add_array(level.A[L.id].data, position[np.flatnonzero(param[mask])], [pexpr[i] for i in np.flatnonzero(mask & param)])
+            #
+            # b
+            #
+            b = []
+            brows = []
+            bexpr = []
+            for k in range(len(self.crepn)):
+                repn, rhs = self.crepn[k]
+                b.append(_value(rhs) - _value(repn.constant))
+                if rhs.__class__ not in native_numeric_types or repn.constant.__class__ not in native_numeric_types:
+                    brows.append(k)
+                    bexpr.append(rhs - repn.constant)
+            level.b = b
+            if parametric is not None:
+                parametric.add_array(level.b, brows, bexpr)
+        #
+        # P and Q
+        #
+        if self.initialize_level_quadratic(level, levelmap, colmap) and parametric is not None:
+            parametric.quadratic.append( (self, level, levelmap, colmap) )
+
+    def initialize_level_quadratic(self, level, levelmap, colmap):
+        """
+        Initialize the quadratic terms in the level objective and constraints.
+
+        Returns True if a quadratic coefficient is not a numeric value.
+        """
+        parametric = False
+        if len(self.orepn) == 1:
+            repn = self.orepn[0][0]
+            #
+            # P
+            #
+            P = {}
+            for val, (v1,v2) in zip(repn.quadratic_coefs, repn.quadratic_vars):
+                parametric = parametric or val.__class__ not in native_numeric_types
+                nid1, j1 = colmap[id(v1)]
+                nid2, j2 = colmap[id(v2)]
+                if nid1 <= nid2:
+                    if P.get((nid1,nid2),None) is None:
+                        P[nid1,nid2] = []
+                    P[nid1,nid2].append( (j1, j2, _value(val)) )
+                else:
+                    if P.get((nid2,nid1),None) is None:
+                        P[nid2,nid1] = []
+                    P[nid2,nid1].append( (j2, j1, _value(val)) )
+            for n1,n2 in P:
+                level.P[n1,n2] = (len(levelmap[n1].x),len(levelmap[n2].x)), tuple(zip(*P[n1,n2]))
+        if len(self.crepn) > 0:
             #
             # Q
             #
             Q = {}
             for k in range(len(self.crepn)):
                 repn = self.crepn[k][0]
-                for i,val in enumerate(repn.quadratic_coefs):
-                    v1,v2 = repn.quadratic_vars[i]
-                    t1, nid1, j1 = vidmap[id(v1)]
-                    t2, nid2, j2 = vidmap[id(v2)]
-                    L1 = levelmap[nid1]
-                    L2 = levelmap[nid2]
+                for val, (v1,v2) in zip(repn.quadratic_coefs, repn.quadratic_vars):
+                    parametric = parametric or val.__class__ not in native_numeric_types
+                    nid1, j1 = colmap[id(v1)]
+                    nid2, j2 = colmap[id(v2)]
                     if nid1 <= nid2:
                         if Q.get((nid1,nid2),None) is None:
-                            Q[nid1,nid2] = {}
-                        Q[nid1,nid2][k, j1+offset(t1,L1.x), j2+offset(t2,L2.x)] = pe.value(val)
+                            Q[nid1,nid2] = []
+                        Q[nid1,nid2].append( (k, j1, j2, _value(val)) )
                     else:
                         if Q.get((nid2,nid1),None) is None:
-                            Q[nid2,nid1] = {}
-                        Q[nid2,nid1][k, j2+offset(t2,L2.x), j1+offset(t1,L1.x)] = pe.value(val)
+                            Q[nid2,nid1] = []
+                        Q[nid2,nid1].append( (k, j2, j1, _value(val)) )
             for n1,n2 in Q:
-                level.Q[n1,n2] = (len(self.crepn), len(levelmap[n1].x),len(levelmap[n2].x)), Q[n1,n2]
-            #
-            # b
-            #
-            b = []
-            for k in range(len(self.crepn)):
-                repn = self.crepn[k][0]
-                b.append(self.crepn[k][1] - repn.constant)
-            level.b = b
+                level.Q[n1,n2] = (len(self.crepn), len(levelmap[n1].x),len(levelmap[n2].x)), tuple(zip(*Q[n1,n2]))
+        return parametric
+
+
+def slack_variable(block, cdata, bound):
+    """
+    Return the slack variable for the 'lower' or 'upper' bound of a constraint
+    in a block.  The slack variables are registered on the block, so they
+    are reused when the model is converted again.
+    """
+    slacks = block.component('zzz_PAO_SlackVariables')
+    if slacks is None:
+        block.zzz_PAO_SlackVariables = pe.VarList(domain=pe.NonNegativeReals)
+        block._zzz_PAO_SlackMap = ComponentMap()
+        slacks = block.zzz_PAO_SlackVariables
+    if cdata not in block._zzz_PAO_SlackMap:
+        block._zzz_PAO_SlackMap[cdata] = {}
+    cslacks = block._zzz_PAO_SlackMap[cdata]
+    if bound not in cslacks:
+        cslacks[bound] = slacks.add()
+    return cslacks[bound]
 
 
 def negate_repn(repn):
@@ -256,10 +363,14 @@ def negate_repn(repn):
     return trepn
 
 
-def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unsorted, fixed=set(), inequalities=None):
+def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unsorted, fixed=set(), inequalities=None, compute_values=True):
     """
     Traverse the model and generate a tree of the SubModel components
+
+    If compute_values is False, then coefficients and right-hand-sides that
+    depend on mutable parameters are collected as expressions.
     """
+    value = pe.value if compute_values else lambda exp: exp
     #
     # Roof of the current subtree, defined by the block
     #
@@ -269,7 +380,7 @@ def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unso
     #
     fixedvars = fixed | curr.fixedvars
     curr.children = \
-        [collect_multilevel_tree(submodel, var, vidmap, fixed=fixedvars, inequalities=inequalities) 
+        [collect_multilevel_tree(submodel, var, vidmap, fixed=fixedvars, inequalities=inequalities, compute_values=compute_values) 
          for submodel in block.component_objects(SubModel, active=True, descend_into=True, sort=sortOrder)]
     #
     # Collect objectives and constraints in the current submodel.
@@ -278,7 +389,7 @@ def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unso
     # Objectives
     #
     for odata in block.component_data_objects(pe.Objective, active=True, sort=sortOrder, descend_into=True):
-        repn = generate_standard_repn(odata.expr)
+        repn = generate_standard_repn(odata.expr, compute_values=compute_values)
         degree = repn.polynomial_degree()
         assert (degree is not None), "Objective '%s' has a body that is not linear or quadratic" % odata.name
         if degree == 0:
@@ -288,18 +399,14 @@ def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unso
             curr.linear = False
     #
     # Constraints
+    # If we call conversion twice, then we reuse the slack variables from the previous conversion
     #
-    # If we call conversion twice, then we delete the variables from the previous conversion
-    #
-    block.del_component('zzz_PAO_SlackVariables')
-    block.del_component('zzz_PAO_SlackVariables_index')
-    block.zzz_PAO_SlackVariables = pe.VarList(domain=pe.NonNegativeReals)
     for cdata in block.component_data_objects(pe.Constraint, active=True, sort=sortOrder, descend_into=True):
         if (not cdata.has_lb()) and (not cdata.has_ub()):
             assert not cdata.equality, "Constraint '%s' is an equality with an infinite right-hand-side" % cdata.name
             # non-binding, so skip
             continue                            # pragma: no cover
-        repn = generate_standard_repn(cdata.body)
+        repn = generate_standard_repn(cdata.body, compute_values=compute_values)
         degree = repn.polynomial_degree()
         assert (degree is not None), "Constraint '%s' has a body that is not linear or quadratic " % cdata.name
         if degree == 0:
@@ -317,7 +424,7 @@ def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unso
                 curr.linear = False
             if inequalities:
                 if cdata.equality:
-                    val = pe.value(cdata.lower)
+                    val = value(cdata.lower)
                     curr.crepn.append( (repn, val) )
                     curr.crepn.append( (negate_repn(repn), -val) )
                 else:
@@ -325,12 +432,12 @@ def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unso
                         # unbounded constraint
                         continue
                     if cdata.lower is not None:
-                        curr.crepn.append( (negate_repn(repn), -pe.value(cdata.lower)) )
+                        curr.crepn.append( (negate_repn(repn), -value(cdata.lower)) )
                     if cdata.upper is not None:
-                        curr.crepn.append( (repn, pe.value(cdata.upper)) )
+                        curr.crepn.append( (repn, value(cdata.upper)) )
             else:
                 if cdata.equality:
-                    curr.crepn.append( (repn, pe.value(cdata.lower)) )
+                    curr.crepn.append( (repn, value(cdata.lower)) )
                 else:
                     if cdata.lower is None and cdata.upper is None:             #pragma: no cover
                         # unbounded constraint
@@ -338,14 +445,14 @@ def collect_multilevel_tree(block, var, vidmap={}, sortOrder=SortComponents.unso
                     if cdata.lower is not None:
                         trepn = negate_repn(repn)
                         trepn.linear_coefs.append(1)
-                        trepn.linear_vars.append(block.zzz_PAO_SlackVariables.add())
-                        curr.crepn.append( (trepn, -pe.value(cdata.lower)) )
+                        trepn.linear_vars.append(slack_variable(block, cdata, 'lower'))
+                        curr.crepn.append( (trepn, -value(cdata.lower)) )
                     if cdata.upper is not None:
                         repn.linear_coefs = list(repn.linear_coefs)
                         repn.linear_vars = list(repn.linear_vars)
                         repn.linear_coefs.append(1)
-                        repn.linear_vars.append(block.zzz_PAO_SlackVariables.add())
-                        curr.crepn.append( (repn, pe.value(cdata.upper)) )
+                        repn.linear_vars.append(slack_variable(block, cdata, 'upper'))
+                        curr.crepn.append( (repn, value(cdata.upper)) )
     #
     # Collect the variables used by the children
     #
@@ -507,6 +614,11 @@ def convert_pyomo2MultilevelProblem(model, *, determinism=1, inequalities=True,
     LinearMultilevelProblem or QuadraticMultilevelProblem
         This object corresponds to the problem in **model**.
     """
+    M, soln_manager, _ = _convert_pyomo2MultilevelProblem(model, determinism=determinism, inequalities=inequalities, linear=linear)
+    return M, soln_manager
+
+
+def _convert_pyomo2MultilevelProblem(model, *, determinism, inequalities, linear, parametric=None):
     #
     # Cleanup global memory
     #
@@ -524,7 +636,7 @@ def convert_pyomo2MultilevelProblem(model, *, determinism=1, inequalities=True,
     #
     var = {}
     vidmap = {}
-    tree = collect_multilevel_tree(model, var, vidmap, sortOrder=sortOrder, inequalities=inequalities)
+    tree = collect_multilevel_tree(model, var, vidmap, sortOrder=sortOrder, inequalities=inequalities, compute_values=parametric is None)
     #
     # We must have a least one SubModel
     #
@@ -549,15 +661,59 @@ def convert_pyomo2MultilevelProblem(model, *, determinism=1, inequalities=True,
         node = treemap[L.id]
         node.initialize_level_vars(L, inequalities, var)
     
+    #
+    # Map each variable id to its level and column
+    #
+    colmap = {vid: (nid, j+offset(t,levelmap[nid].x)) for vid,(t,nid,j) in vidmap.items()}
+
     for L in M.levels():
         node = treemap[L.id]
-        node.initialize_level(L, inequalities, var, vidmap, levelmap)
+        node.initialize_level(L, inequalities, var, levelmap, colmap, parametric)
     #
     # Cleanup global memory
     #
     Node.global_list = []
 
-    return M, PyomoSubmodel_SolutionManager_LBP(var, vidmap, id(model))
+    return M, PyomoSubmodel_SolutionManager_LBP(var, vidmap, id(model)), [(treemap[L.id], L) for L in M.levels()]
+
+
+class PyomoMultilevelConversion(object):
+    """
+    The conversion of a Pyomo model to a LinearMultilevelProblem or
+    QuadraticMultilevelProblem, which can be updated in place after the
+    values of mutable parameters or variable bounds change in the model.
+
+    The update() method re-evaluates the coefficients that depend on
+    mutable parameters and fixed variables, and the variable bounds.
+    The variables, constraints and SubModel components in the model
+    are assumed to be unchanged since the conversion was created.
+
+    Args
+    ----
+    model
+        A Pyomo model object.
+    determinism: int, Default: 1
+        See convert_pyomo2MultilevelProblem().
+    inequalities: bool, Default: True
+        See convert_pyomo2MultilevelProblem().
+    linear: bool
+        See convert_pyomo2MultilevelProblem().
+    """
+
+    def __init__(self, model, *, determinism=1, inequalities=True, linear=None):
+        self.model = model
+        self.parametric = ParametricValues()
+        self.mp, self.solution_manager, self._levels = \
+            _convert_pyomo2MultilevelProblem(model, determinism=determinism, inequalities=inequalities, linear=linear, parametric=self.parametric)
+        self._var = self.solution_manager.var
+
+    def update(self):
+        """
+        Refresh the values in the multilevel problem from the Pyomo model.
+        """
+        for node, L in self._levels:
+            node.update_level_bounds(L, self._var)
+        self.parametric.update()
     
 
 convert_pyomo2lmp = convert_pyomo2LinearMultilevelProblem
@@ -15,6 +15,7 @@ pao.pyomo.plugins.dual
 from pyomo.core import Objective, Block, Var, Set, Constraint
 from pyomo.core.base.block import _BlockData
 from pyomo.core import TransformationFactory
+from pao.duality.collect import _collect_fixed_modelvars, _collect_linear_dual, _create_linear_dual_block
 from .transform import BaseBilevelTransformation
 import logging
 
@@ -30,6 +31,10 @@ class LinearDualBilevelTransformation(BaseBilevelTransformation):
     The use_dual_objective can be used to simplify the final problem 
     representation sligthly, in the case where there are no constraints in the 
     upper-level problem.
+
+    The dual representations of all submodels are collected before the
+    dual blocks are created, and the dual blocks are added to the model
+    in the order of the submodels.
     """
 
     def _apply_to(self, model, **kwds):
@@ -41,17 +46,29 @@ class LinearDualBilevelTransformation(BaseBilevelTransformation):
         #
         self._preprocess('pao.pyomo.linear_dual', model)
         self._fix_all()
+        #
+        # Collect the dual representations of the submodels while the
+        # upper variables are fixed
+        #
+        submodels = list(self.submodel.items())
+        data = []
+        for key, sub in submodels:
+            fixed_modelvars = _collect_fixed_modelvars(sub, fixed=self._fixed_vardata[sub.name])
+            data.append(_collect_linear_dual(sub, fixed_modelvars))
+        #
+        # Unfix the upper variables
+        #
+        self._unfix_all()
 
         _dual_obj = 0.
         _dual_sense = None
         _primal_obj = 0.
-        for key, sub in self.submodel.items():
+        for (key, sub), sub_data in zip(submodels, data):
             _parent = sub.parent_block()
             #
             # Generate the dual block
             #
-            transform = TransformationFactory('pao.duality.linear_dual')
-            dual = transform.create_using(sub, fixed=self._fixed_vardata[sub.name])
+            dual = _create_linear_dual_block(sub, sub_data)
             #
             # Figure out which objective is being used
             #
@@ -100,10 +117,6 @@ class LinearDualBilevelTransformation(BaseBilevelTransformation):
                 model.add_component(_dual_name, dual)
                 model.reclassify_component_type(_dual_name, Block)
 
-            #
-            # Unfix the upper variables
-            #
-            self._unfix_all()
             #
             # Disable the original submodel
             #
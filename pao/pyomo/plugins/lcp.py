@@ -13,18 +13,22 @@ pao.pyomo.plugins.lcp
 """
 
 import six
+import numpy as np
+import scipy.sparse
 
 from pyomo.core import Block, VarList, ConstraintList, Objective,\
                        Var, Constraint, maximize, ComponentUID, Set,\
                        TransformationFactory
+from pyomo.core.expr.numvalue import native_numeric_types
 from pyomo.repn import generate_standard_repn
 from pyomo.mpec import ComplementarityList, complements
+from pao.mpr.solvers import kkt
 from .transform import BaseBilevelTransformation
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_submodel_kkt_block(instance, submodel, deterministic, fixed_upper_vars):
+def create_submodel_kkt_block(instance, submodel, deterministic, fixed_upper_vars, builder='expression'):
     """
     Add optimality conditions for the submodel
 
@@ -38,7 +42,15 @@ def create_submodel_kkt_block(instance, submodel, deterministic, fixed_upper_var
                 y >= 0
 
     NOTE THE VARIABLE BOUNDS!
+
+    If builder is 'expression', then the dual variables and the optimality
+    conditions are added to the block one at a time.  If builder is
+    'sparse', then the coefficients of the submodel are collected in
+    sparse matrices, and the block is created with indexed components.
     """
+    assert (builder in ['expression', 'sparse']), "Unknown model builder: %s" % str(builder)
+    if builder == 'sparse':
+        return _create_sparse_submodel_kkt_block(instance, submodel, fixed_upper_vars)
     fixed_vars = {id(v) for v in fixed_upper_vars}
     #
     # Populate the block with the linear constraints.
@@ -272,6 +284,159 @@ quadratic terms where both variables are in the lower level.")
     return block
 
 
+def _collect_lower_terms(repn, fixed_vars, column, coef_multiplier=1):
+    """
+    Collect the terms of a standard repn that are linear in the
+    lower-level variables.  The coefficients of bilinear terms with
+    a fixed upper-level variable are Pyomo expressions.
+    """
+    terms = []
+    for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+        if id(var) in fixed_vars:
+            continue
+        terms.append((column(var), coef_multiplier*coef))
+    for (var0, var1), coef in zip(repn.quadratic_vars, repn.quadratic_coefs):
+        if id(var0) in fixed_vars:
+            if id(var1) in fixed_vars:
+                continue
+            terms.append((column(var1), coef_multiplier*coef*var0))
+        elif id(var1) in fixed_vars:
+            terms.append((column(var0), coef_multiplier*coef*var1))
+        else:
+            raise RuntimeError("Cannot apply this transformation to a problem with \
+quadratic terms where both variables are in the lower level.")
+    return terms
+
+
+def _create_sparse_submodel_kkt_block(instance, submodel, fixed_upper_vars):
+    """
+    Create the optimality conditions for the submodel with indexed
+    components.
+
+    The objective and constraint coefficients of the lower-level variables
+    are collected once.  The numeric coefficients are stored in a sparse
+    matrix whose rows are the dual variables and whose columns are the
+    lower-level variables, and the optimality conditions are created
+    with the functions in pao.mpr.solvers.kkt.  The components are indexed from one, and
+    the dual variables are indexed in the same order as in the
+    'expression' builder.
+    """
+    fixed_vars = {id(v) for v in fixed_upper_vars}
+    #
+    # The lower-level variables, in the order that their
+    # stationarity conditions are created
+    #
+    columns = {}
+    primal_vars = []
+
+    def column(var):
+        j = columns.get(id(var), None)
+        if j is None:
+            j = columns[id(var)] = len(primal_vars)
+            primal_vars.append(var)
+        return j
+    #
+    # Collect submodel objective terms
+    #
+    d2 = []
+    for odata in submodel.component_data_objects(Objective, active=True):
+        d_sense = -1 if odata.sense == maximize else 1
+        o_terms = generate_standard_repn(odata.expr, compute_values=False)
+        d2 = _collect_lower_terms(o_terms, fixed_vars, column, d_sense)
+        break
+    #
+    # Dual variables and complementarity conditions for the bounds
+    # of the lower-level variables
+    #
+    v_comps = []
+    v_rows = []
+    v_cols = []
+    v_vals = []
+    for vcomponent in instance.component_objects(Var, active=True):
+        for ndx in vcomponent:
+            vardata = vcomponent[ndx]
+            if id(vardata) in fixed_vars:
+                continue
+            lb, ub = vardata.bounds
+            if lb is not None:
+                v_rows.append(len(v_comps))
+                v_cols.append(column(vardata))
+                v_vals.append(-1.0)
+                v_comps.append(vardata >= lb)
+            if ub is not None:
+                v_rows.append(len(v_comps))
+                v_cols.append(column(vardata))
+                v_vals.append(1.0)
+                v_comps.append(vardata <= ub)
+    #
+    # Dual variables and complementarity conditions for the constraints.
+    # The triplets (dual variable, lower-level variable, coefficient)
+    # define B2 transpose.
+    #
+    u_comps = []
+    nu = 0
+    rows = []
+    cols = []
+    vals = []
+    nonnumeric = []
+    for cdata in submodel.component_data_objects(Constraint, active=True):
+        if cdata.equality:
+            duals = [(nu, 1)]
+            nu += 1
+        else:
+            duals = []
+            if cdata.lower is not None:
+                duals.append((nu, -1))
+                u_comps.append((nu, - cdata.body <= - cdata.lower))
+                nu += 1
+            if cdata.upper is not None:
+                duals.append((nu, 1))
+                u_comps.append((nu, cdata.body <= cdata.upper))
+                nu += 1
+        c_terms = generate_standard_repn(cdata.body, compute_values=False)
+        for j, coef in _collect_lower_terms(c_terms, fixed_vars, column):
+            for k, sign in duals:
+                if type(coef) in native_numeric_types:
+                    rows.append(k)
+                    cols.append(j)
+                    vals.append(sign*coef)
+                else:
+                    nonnumeric.append((j, k, sign*coef))
+    n = len(primal_vars)
+    B2T = scipy.sparse.csr_matrix((np.array(vals, dtype=np.float64), (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))), shape=(nu, n))
+    V = scipy.sparse.csr_matrix((np.array(v_vals, dtype=np.float64), (np.array(v_rows, dtype=np.int64), np.array(v_cols, dtype=np.int64))), shape=(len(v_comps), n))
+    #
+    # Create the block
+    #
+    block = Block(concrete=True)
+    block.u = Var(range(1, nu+1))               # Note: Dual variables associated to constraints in primal problem
+    block.v = Var(range(1, len(v_comps)+1))     # Note: Dual variables associated to bounds in primal problem
+    u = [block.u[k+1] for k in range(nu)]
+    v = [block.v[k+1] for k in range(len(v_comps))]
+    #
+    # Collect the terms that do not have numeric coefficients
+    #
+    d = [0.0]*n
+    terms = [[] for j in range(n)]
+    for j, coef in d2:
+        if type(coef) in native_numeric_types:
+            d[j] += coef
+        else:
+            terms[j].append(coef)
+    for j, k, coef in nonnumeric:
+        terms[j].append(coef*u[k])
+    #
+    # Generate stationarity equations
+    #
+    kkt.add_stationarity(block, 'c1', kkt.stationarity_matrix(B2T, V), u+v, d=d, terms=terms, start=1)
+    #
+    # Complementarity conditions for the constraints and variable bounds
+    #
+    kkt.add_complementarity(block, 'c2', [cond for k, cond in u_comps], [u[k] for k, cond in u_comps], start=1)
+    kkt.add_complementarity(block, 'c3', v_comps, v, start=1)
+    return block
+
+
 @TransformationFactory.register('pao.pyomo.linear_mpec',
                                 doc="Generate a linear MPEC from the optimality conditions \
 of the submodel")
@@ -280,11 +445,15 @@ class LinearComplementarityBilevelTransformation(BaseBilevelTransformation):
     This transformation creates a block using a SubModel object,
     which contains constraints describing the optimality conditions for that
     submodel.
+
+    The builder option specifies how the block is created (see
+    create_submodel_kkt_block).  The default is 'expression'.
     """
 
     def _apply_to(self, model, **kwds):
         deterministic = kwds.pop('deterministic', False)
         submodel_name = kwds.pop('submodel', None)
+        builder = kwds.pop('builder', 'expression')
 
         #
         # Process options
@@ -298,7 +467,7 @@ class LinearComplementarityBilevelTransformation(BaseBilevelTransformation):
             #
             setattr(model, key +'_kkt',
                     create_submodel_kkt_block(model, sub, deterministic,
-                                              self.fixed_vardata[key]))
+                                              self.fixed_vardata[key], builder))
             model._transformation_data['pao.pyomo.linear_mpec'].submodel_cuid =\
                 ComponentUID(sub)
             model._transformation_data['pao.pyomo.linear_mpec'].block_cuid =\
@@ -52,6 +52,9 @@ class BaseBilevelTransformation(Transformation):
 
         """
         var = {}
+        self._fixed_vardata = dict()
+        self._fixed_ids = set()
+        self._submodel = dict()
         instance._transformation_data[tname].submodel = list()
         for data in instance.component_objects(active=True, descend_into=True):
             name = data.name
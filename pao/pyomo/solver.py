@@ -1,7 +1,7 @@
 import time
 from pyomo.common.config import ConfigBlock, ConfigValue
 
-from .convert import convert_pyomo2MultilevelProblem
+from .convert import convert_pyomo2MultilevelProblem, PyomoMultilevelConversion
 import pao.common
 import pao.mpr
 
@@ -28,10 +28,16 @@ class PyomoSubmodelSolverBase_LBP(PyomoSubmodelSolverBase):
         default=None,
         description="The name of the big-M value used to linearize bilinear terms.  If this is not specified, then the solver will throw an error if bilinear terms exist in the model."
         ))
+    config.declare('reuse_conversion', ConfigValue(
+        default=False,
+        domain=bool,
+        description="If True, then the multilevel problem generated for a model is reused when the same model is solved again, and only the values that depend on mutable parameters and the variable bounds are updated.  This assumes that the variables, constraints and SubModel components in the model are unchanged."
+        ))
 
     def __init__(self, name, lmp_solver):
         super().__init__(name)
         self.lmp_solver = lmp_solver
+        self._conversion = None
 
     def solve(self, model, **options):
         #
@@ -41,10 +47,13 @@ class PyomoSubmodelSolverBase_LBP(PyomoSubmodelSolverBase):
         solver_options = {k:self.config[k] for k in self.config}
         solver_options['load_solutions'] = True
         linearize_bigm = solver_options.pop('linearize_bigm')
+        reuse_conversion = solver_options.pop('reuse_conversion')
+        timing_callback = solver_options.pop('timing_callback')
         #
         # Start the clock
         #
         start_time = time.time()
+        timer = pao.common.PhaseTimer(timing_callback)
         #
         # Convert the Pyomo model to a LBP
         #
@@ -52,27 +61,44 @@ class PyomoSubmodelSolverBase_LBP(PyomoSubmodelSolverBase):
         # This facilitates the linearization of bilinear terms.
         #
         try:
-            mp, soln_manager = convert_pyomo2MultilevelProblem(model, inequalities=True)
+            with timer('convert_model'):
+                if not reuse_conversion:
+                    mp, soln_manager = convert_pyomo2MultilevelProblem(model, inequalities=True)
+                else:
+                    if self._conversion is None or self._conversion.model is not model:
+                        self._conversion = PyomoMultilevelConversion(model, inequalities=True)
+                    else:
+                        self._conversion.update()
+                    mp, soln_manager = self._conversion.mp, self._conversion.solution_manager
         except RuntimeError as err:
             print("Cannot convert Pyomo model to a multilevel problem") 
             raise
         if linearize_bigm:
-            lmp, soln = pao.mpr.linearize_bilinear_terms(mp, linearize_bigm)
+            with timer('linearize_bilinear_terms'):
+                lmp, soln = pao.mpr.linearize_bilinear_terms(mp, linearize_bigm)
         else:
             lmp = mp
         #
         results = PyomoSubmodelResults(solution_manager=soln_manager)
         with pao.common.Solver(self.lmp_solver) as opt:
-            lmp_results = opt.solve(lmp, **solver_options)
+            with timer('solve'):
+                lmp_results = opt.solve(lmp, **solver_options)
+            #
+            # Include the phases of the solver for the multilevel problem
+            #
+            for phase, seconds in lmp_results.timing.items():
+                timer.add('solve.'+phase, seconds)
 
             self._initialize_results(results, lmp_results, model, lmp, options)
             results.solver.rc = getattr(opt, '_rc', None)
-            if linearize_bigm:
-                soln.copy(From=lmp, To=mp)
-                results.copy(From=mp, To=model)
-            else:
-                results.copy(From=lmp, To=model)
+            with timer('load_solution'):
+                if linearize_bigm:
+                    soln.copy(From=lmp, To=mp)
+                    results.copy(From=mp, To=model)
+                else:
+                    results.copy(From=lmp, To=model)
             
+        results.timing = timer.timing
         results.solver.wallclock_time = time.time() - start_time
         return results
 
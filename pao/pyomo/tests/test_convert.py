@@ -1,7 +1,7 @@
 import numpy as np
 import pyutilib.th as unittest
 import pyomo.environ as pe
-from pao.pyomo.convert import collect_multilevel_tree, convert_pyomo2LinearMultilevelProblem, convert_pyomo2MultilevelProblem
+from pao.pyomo.convert import collect_multilevel_tree, convert_pyomo2LinearMultilevelProblem, convert_pyomo2MultilevelProblem, PyomoMultilevelConversion
 from pao.pyomo import SubModel
 from pao.mpr import LinearMultilevelProblem, QuadraticMultilevelProblem
 
@@ -541,5 +541,75 @@ class TestMultilevelTree(unittest.TestCase):
         self.assertEqual(L.Q[U,L][1].toarray().tolist(),
 [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, -11.0]])
 
+
+class TestConversionUpdate(unittest.TestCase):
+
+    def create(self):
+        M = pe.ConcreteModel()
+        M.p = pe.Param(mutable=True, initialize=2)
+        M.q = pe.Param(mutable=True, initialize=0)
+        M.x = pe.Var(bounds=(0,M.p))
+        M.y = pe.Var(bounds=(0,None))
+        M.z = pe.Var([1,2], within=pe.Integers, bounds=(0,10))
+        M.o = pe.Objective(expr=M.p*M.x + 3*M.y + M.q)
+        M.c = pe.Constraint(expr=M.p*M.x + M.q*M.y <= 2*M.p)
+
+        M.s = SubModel(fixed=M.x)
+        M.s.o = pe.Objective(expr=M.z[1] + M.p*M.z[2])
+        M.s.c = pe.Constraint(expr=M.x + M.z[1] - M.q*M.z[2] == M.p)
+        return M
+
+    def check_equal(self, mp1, mp2):
+        for L1, L2 in zip(mp1.levels(), mp2.levels()):
+            self.assertEqual(L1.d, L2.d)
+            self.assertEqual(list(L1.x.lower_bounds), list(L2.x.lower_bounds))
+            self.assertEqual(list(L1.x.upper_bounds), list(L2.x.upper_bounds))
+            self.assertEqual(list(L1.b), list(L2.b))
+            for X1, X2 in zip(mp1.levels(), mp2.levels()):
+                c1 = np.zeros(len(X1.x)) if L1.c[X1] is None else L1.c[X1]
+                c2 = np.zeros(len(X2.x)) if L2.c[X2] is None else L2.c[X2]
+                self.assertEqual(list(c1), list(c2))
+                A1 = np.zeros((len(L1.b), len(X1.x))) if L1.A[X1] is None else L1.A[X1].toarray()
+                A2 = np.zeros((len(L2.b), len(X2.x))) if L2.A[X2] is None else L2.A[X2].toarray()
+                self.assertEqual(A1.tolist(), A2.tolist())
+
+    def test_initial(self):
+        M = self.create()
+        conversion = PyomoMultilevelConversion(M, inequalities=True)
+        mp, _ = convert_pyomo2MultilevelProblem(M, inequalities=True)
+        self.check_equal(conversion.mp, mp)
+
+    def test_update(self):
+        M = self.create()
+        conversion = PyomoMultilevelConversion(M, inequalities=False)
+        A = conversion.mp.U.A[conversion.mp.U]
+
+        M.p = 5
+        M.q = 1
+        M.y.setub(4)
+        M.z[2].setlb(None)
+        conversion.update()
+
+        mp, _ = convert_pyomo2MultilevelProblem(M, inequalities=False)
+        self.check_equal(conversion.mp, mp)
+        self.assertEqual(conversion.mp.U.d, 1)
+        self.assertIs(conversion.mp.U.A[conversion.mp.U], A)
+
+    def test_slack_variables(self):
+        M = self.create()
+        mp1, _ = convert_pyomo2MultilevelProblem(M, inequalities=False)
+        slacks = M.zzz_PAO_SlackVariables
+        self.assertEqual(len(slacks), 1)
+        self.assertIsNone(M.s.component("zzz_PAO_SlackVariables"))
+
+        mp2, _ = convert_pyomo2MultilevelProblem(M, inequalities=False)
+        self.assertIs(M.zzz_PAO_SlackVariables, slacks)
+        self.assertEqual(len(slacks), 1)
+        self.check_equal(mp1, mp2)
+
+        M.d = pe.Constraint(expr=M.x + M.y >= 1)
+        convert_pyomo2MultilevelProblem(M, inequalities=False)
+        self.assertEqual(len(slacks), 2)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,39 @@
+import pyutilib.th as unittest
+import pyomo.environ as pe
+from pao.pyomo import SubModel
+import pao.pyomo.plugins.dual
+
+
+def create(n):
+    """
+    A model with n independent submodels
+    """
+    M = pe.ConcreteModel()
+    M.x = pe.Var(range(n), bounds=(0,10))
+    M.o = pe.Objective(expr=sum(M.x[i] for i in range(n)))
+    for i in range(n):
+        S = SubModel(fixed=[M.x[i]])
+        setattr(M, 'sub%d' % i, S)
+        S.y = pe.Var(within=pe.NonNegativeReals)
+        S.o = pe.Objective(expr=-S.y)
+        S.c = pe.Constraint(expr=S.y <= M.x[i] + 2*i)
+        S.d = pe.Constraint(expr=2*S.y + M.x[i] >= 1)
+    return M
+
+
+class Test_linear_dual(unittest.TestCase):
+
+    def test_submodels(self):
+        M = create(3)
+        pe.TransformationFactory('pao.pyomo.linear_dual').apply_to(M)
+        for i in range(3):
+            sub = getattr(M, 'sub%d' % i)
+            dual = getattr(M, 'sub%d_dual' % i)
+            self.assertFalse(sub.active)
+            self.assertEqual(sorted(v.local_name for v in dual.component_objects(pe.Var)), ['c', 'd'])
+            self.assertEqual(sorted(c.local_name for c in dual.component_objects(pe.Constraint, active=True)), ['y'] if i < 2 else ['equiv_objs', 'y'])
+        self.assertEqual([M.x[i].fixed for i in M.x], [False]*3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import pyutilib.th as unittest
+import pyomo.environ as pe
+from pyomo.repn import generate_standard_repn
+from pao.pyomo import SubModel
+import pao.pyomo.plugins.lcp
+
+
+def create():
+    M = pe.ConcreteModel()
+    M.x = pe.Var(bounds=(0,10))
+    M.o = pe.Objective(expr=M.x)
+    M.L = SubModel(fixed=[M.x])
+    M.L.y = pe.Var(range(3), bounds=(0,None))
+    M.L.z = pe.Var(bounds=(-1,4))
+    M.L.o = pe.Objective(expr=-M.L.y[0] + 2*M.L.y[1] + M.x*M.L.z, sense=pe.maximize)
+    M.L.c = pe.Constraint(expr=M.L.y[0] + M.L.y[1] + M.x*M.L.y[2] <= 4)
+    M.L.d = pe.Constraint(expr=pe.inequality(1, M.L.y[0] - M.L.z + 3*M.x, 5))
+    M.L.e = pe.Constraint(expr=M.L.y[2] + M.L.z == 1)
+    return M
+
+
+def summarize(block):
+    """
+    Summarize the KKT conditions using the names of the variables.
+    """
+    ans = {}
+    for c in block.c1.values():
+        repn = generate_standard_repn(c.body, compute_values=False, quadratic=True)
+        terms = {v.name:float(coef) for v, coef in zip(repn.linear_vars, repn.linear_coefs)}
+        terms.update({(v1.name, v2.name):float(coef) for (v1, v2), coef in zip(repn.quadratic_vars, repn.quadratic_coefs)})
+        ans['c1', c.index()] = (terms, float(repn.constant))
+    for name in ['c2', 'c3']:
+        for ndx, c in getattr(block, name).items():
+            ans[name, ndx] = (str(c._args[0]), str(c._args[1]))
+    ans['u'] = sorted(block.u.keys())
+    ans['v'] = sorted(block.v.keys())
+    return ans
+
+
+class Test_linear_mpec(unittest.TestCase):
+
+    def test_builders(self):
+        M = create()
+        pe.TransformationFactory('pao.pyomo.linear_mpec').apply_to(M)
+        expected = summarize(M.L_kkt)
+
+        M = create()
+        pe.TransformationFactory('pao.pyomo.linear_mpec').apply_to(M, builder='sparse')
+        self.assertEqual(summarize(M.L_kkt), expected)
+        self.assertEqual(len(M.L_kkt.c1), 4)
+        self.assertEqual(len(M.L_kkt.c2), 3)
+        self.assertEqual(len(M.L_kkt.c3), 5)
+        self.assertFalse(M.L.c.active)
+
+    def test_unbounded(self):
+        M = pe.ConcreteModel()
+        M.x = pe.Var()
+        M.o = pe.Objective(expr=M.x)
+        M.L = SubModel(fixed=[M.x])
+        M.L.y = pe.Var()
+        M.L.o = pe.Objective(expr=M.L.y)
+        with self.assertRaises(IOError):
+            pe.TransformationFactory('pao.pyomo.linear_mpec').apply_to(M, builder='sparse')
+
+    def test_unknown_builder(self):
+        with self.assertRaises(AssertionError):
+            pe.TransformationFactory('pao.pyomo.linear_mpec').apply_to(create(), builder='unknown')
+
+
+if __name__ == "__main__":
+    unittest.main()